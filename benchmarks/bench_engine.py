@@ -0,0 +1,132 @@
+"""Per-URL latency of yt-dlp as a process per URL versus the in-process LibraryEngine.
+
+A local extractor plugin and HTTP server stand in for a real site, so
+the numbers are dominated by startup rather than the network. Each mode
+fetches metadata for every URL, then downloads every URL through a
+one-worker JobQueue. Requires the yt_dlp package.
+
+    python benchmarks/bench_engine.py [url_count] [media_kib]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+from statistics import mean, median
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PLUGIN_SOURCE = '''
+from yt_dlp.extractor.common import InfoExtractor
+
+
+class BenchLocalIE(InfoExtractor):
+    _VALID_URL = r'https?://127\\.0\\.0\\.1:\\d+/video/(?P<id>\\w+)'
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        return {"id": video_id, "title": f"bench {video_id}", "ext": "mp4",
+                "url": url.replace("/video/", "/media/")}
+'''
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    payload = b""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(self.payload)))
+        self.end_headers()
+        self.wfile.write(self.payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def write_plugin(root):
+    """Installs the test extractor as a yt-dlp plugin package under root."""
+    plugin_dir = os.path.join(root, "yt_dlp_plugins", "extractor")
+    os.makedirs(plugin_dir)
+    with open(os.path.join(plugin_dir, "bench_local.py"), "w", encoding="utf-8") as f:
+        f.write(PLUGIN_SOURCE)
+
+def stats(values):
+    return f"mean {mean(values) * 1000:7.1f} ms  median {median(values) * 1000:7.1f} ms  max {max(values) * 1000:7.1f} ms"
+
+def run_queue(urls, options, engine=None):
+    """Downloads urls one at a time and returns each job's total time."""
+    from ytdl_core.commands import build_command
+    from ytdl_core.jobs import JobQueue
+    from ytdl_core.progress import parse_progress_line
+
+    # "python -m yt_dlp" rather than the executable, so both modes run the same installation.
+    queue = JobQueue(lambda url, opts: [sys.executable, "-m"] + build_command(url, opts, executable="yt_dlp"),
+                     parse_progress_line, max_workers=1, engine=engine)
+    jobs = queue.submit_many(urls, options)
+    queue.wait()
+    failed = [job for job in jobs if job.returncode != 0]
+    if failed:
+        raise SystemExit(f"{len(failed)} download(s) failed in {'library' if engine else 'subprocess'} mode")
+    return [job.timeline.summary()["total"] for job in jobs]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    media_kib = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+
+    root = tempfile.mkdtemp(prefix="bench-engine-")
+    write_plugin(root)
+    # Plugins are found on sys.path: set it up before yt_dlp is imported here or in a child.
+    sys.path.insert(0, root)
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))
+
+    from ytdl_core.commands import make_options
+    from ytdl_core.engine import LibraryEngine, library_available
+    if not library_available():
+        print("The yt_dlp package is not installed (pip install yt-dlp).", file=sys.stderr)
+        return 1
+
+    MediaHandler.payload = os.urandom(media_kib * 1024)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MediaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}/video/"
+    urls = [f"{base}v{i:04d}" for i in range(count)]
+
+    try:
+        start = time.perf_counter()
+        engine = LibraryEngine()
+        engine.warmup.result()
+        print(f"{count} URLs, {media_kib} KiB each; in-process warm-up {time.perf_counter() - start:.3f}s (once)")
+
+        metadata = {"subprocess": [], "library": []}
+        for url in urls:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-m", "yt_dlp", "--dump-single-json", url], capture_output=True, check=True)
+            metadata["subprocess"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            engine.extract_info(url)
+            metadata["library"].append(time.perf_counter() - start)
+
+        downloads = {}
+        for mode, mode_engine in (("subprocess", None), ("library", engine)):
+            out_dir = os.path.join(root, mode)
+            options = make_options(output_dir=out_dir, template="%(id)s.%(ext)s")
+            downloads[mode] = run_queue(urls, options, mode_engine)
+
+        for label, results in (("metadata", metadata), ("download", downloads)):
+            for mode in ("subprocess", "library"):
+                print(f"{label:<9}{mode:<11}{stats(results[mode])}")
+            speedup = mean(results["subprocess"]) / mean(results["library"])
+            print(f"{label:<9}{'speedup':<11}{speedup:.1f}x")
+        engine.shutdown()
+    finally:
+        server.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Times format parsing and selection on synthetic DASH and live-stream format lists.
+
+Compares select_format() with scoring every video+audio pair, the obvious
+way to honour a size limit, and checks both pick the same format.
+
+    python benchmarks/bench_formats.py [format_count]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ytdl_core.formats import parse_formats, select_format, compatible, FormatSelection, _video_key, _audio_key
+from ytdl_core.progress import format_bytes
+
+HEIGHTS = (144, 240, 360, 480, 720, 1080, 1440, 2160, 4320)
+VIDEO_CODECS = (("avc1.640028", "mp4"), ("vp09.00.40.08", "webm"), ("av01.0.08M.08", "mp4"))
+AUDIO_CODECS = (("mp4a.40.2", "m4a"), ("opus", "webm"))
+LANGUAGES = ("en", "de", "fr", "es", "ja", "pt", "it", "ko", "hi", "ru")
+
+
+def synthetic_info(count, live=False, seed=1):
+    """Returns an info dict with about ``count`` formats: DASH video, per-language audio and muxed HLS."""
+    rng = random.Random(seed)
+    duration = None if live else 3 * 3600
+    formats = []
+    while len(formats) < count:
+        n = len(formats)
+        kind = n % 5
+        if kind == 0:
+            height = rng.choice(HEIGHTS[:6])
+            formats.append({"format_id": f"hls-{n}", "ext": "mp4", "protocol": "m3u8_native",
+                            "vcodec": "avc1.4d401f", "acodec": "mp4a.40.2", "height": height,
+                            "width": height * 16 // 9, "tbr": height * 4.5, "fps": 30})
+        elif kind in (1, 2, 3):
+            height = rng.choice(HEIGHTS)
+            vcodec, ext = rng.choice(VIDEO_CODECS)
+            tbr = height * rng.uniform(2, 12)
+            fmt = {"format_id": f"v{n}", "ext": ext, "protocol": "https", "vcodec": vcodec, "acodec": "none",
+                   "height": height, "width": height * 16 // 9, "fps": rng.choice((24, 30, 60)), "tbr": tbr}
+            if duration and rng.random() < 0.6:
+                fmt["filesize"] = int(tbr * 125 * duration)
+            formats.append(fmt)
+        else:
+            acodec, ext = rng.choice(AUDIO_CODECS)
+            abr = rng.choice((48, 64, 128, 160, 256))
+            fmt = {"format_id": f"a{n}-{rng.choice(LANGUAGES)}", "ext": ext, "protocol": "https", "vcodec": "none",
+                   "acodec": acodec, "abr": abr, "tbr": abr}
+            if duration:
+                fmt["filesize_approx"] = int(abr * 125 * duration)
+            formats.append(fmt)
+    formats.append({"format_id": "sb0", "ext": "mhtml", "vcodec": "none", "acodec": "none"})
+    return {"id": "synthetic", "duration": duration, "is_live": live, "formats": formats}
+
+
+def select_all_pairs(formats, max_height=None, max_bytes=None, codec_preference=None):
+    """Reference implementation: enumerate every candidate, keep the best that fits."""
+    preference = list(codec_preference or ())
+    best = best_key = None
+    audios = [f for f in formats if f.has_audio and not f.has_video]
+    for video in formats:
+        if not video.has_video or (max_height is not None and (video.height or 0) > max_height):
+            continue
+        pairs = [FormatSelection(video)] if video.has_audio else \
+            [FormatSelection(video, a) for a in audios if compatible(video, a)]
+        for pair in pairs:
+            size = pair.size
+            if max_bytes is not None and (size is None or size > max_bytes):
+                continue
+            key = (_video_key(video, preference),
+                   _audio_key(pair.audio, preference) if pair.audio else (float("inf"), 0))
+            if best_key is None or key > best_key:
+                best, best_key = pair, key
+    return best
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    cases = (
+        ("best", {}),
+        ("<=1080p", {"max_height": 1080}),
+        ("<=720p, 1 GiB", {"max_height": 720, "max_bytes": 1 << 30}),
+        ("av1>vp9, 2 GiB", {"max_bytes": 2 << 30, "codec_preference": ("av1", "vp9", "h264")}),
+    )
+    for live in (False, True):
+        info = synthetic_info(count, live=live)
+        parse_time, formats = timed(lambda: parse_formats(info), 20)
+        print(f"{'live' if live else 'vod'}: {len(info['formats'])} formats, parse {parse_time * 1000:.2f} ms")
+        for name, limits in cases:
+            engine_time, pick = timed(lambda: select_format(formats, **limits), 20)
+            naive_time, naive = timed(lambda: select_all_pairs(formats, **limits), 3)
+            same = (pick and pick.format_spec) == (naive and naive.format_spec) or \
+                (pick is not None and naive is not None and pick.size == naive.size)
+            size = format_bytes(pick.size) if pick and pick.size else "-"
+            print(f"  {name:16} engine {engine_time * 1000:7.3f} ms  all-pairs {naive_time * 1000:8.2f} ms  "
+                  f"pick {pick.format_spec if pick else None} ({size}){'' if same else '  MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
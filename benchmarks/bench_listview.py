@@ -0,0 +1,180 @@
+"""Filter, sort and redraw latency of the virtual list views with 10k synthetic entries.
+
+Loads entries with a title, resolution, size, codec and status into a
+ListModel and times: the initial load, sorting by each column, typing a
+filter query one character at a time (each keystroke only re-checks the
+rows the previous one left) against filtering from scratch, a status
+filter from the facet index, and moving single rows when their status
+changes. With a display, it also times VirtualTreeview redraws and
+scrolling against filling a plain Treeview with every row; without one,
+it times the work a redraw does apart from Tk (reading a page of rows and
+formatting them).
+
+    python benchmarks/bench_listview.py [entries]
+"""
+import os
+import sys
+import time
+import random
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ytdl_core.listmodel import ListModel  # noqa: E402
+from ytdl_core.progress import format_bytes  # noqa: E402
+
+HEIGHT = 20
+WORDS = ("live", "official", "remix", "lecture", "trailer", "cover", "tutorial", "interview", "highlights", "review")
+CODECS = ("h264", "vp9", "av1", "h265")
+STATUSES = ("pending", "loading", "loaded", "failed")
+HEIGHTS = (None, 144, 360, 480, 720, 1080, 1440, 2160)
+
+
+class Entry:
+    __slots__ = ("index", "title", "height", "size", "codec", "status")
+
+    def __init__(self, index, rng):
+        self.index = index
+        self.title = f"{rng.choice(WORDS)} {rng.choice(WORDS)} #{index}"
+        self.height = rng.choice(HEIGHTS)
+        self.size = rng.randrange(1 << 20, 4 << 30) if rng.random() > 0.05 else None
+        self.codec = rng.choice(CODECS) if self.height else "opus"
+        self.status = rng.choice(STATUSES)
+
+
+def make_model():
+    return ListModel({"index": lambda e: e.index, "resolution": lambda e: e.height, "size": lambda e: e.size,
+                      "codec": lambda e: e.codec, "status": lambda e: e.status},
+                     facets={"status": lambda e: e.status, "codec": lambda e: e.codec},
+                     search=lambda e: e.title, sort="index")
+
+def row_values(key, entry):
+    return str(key), (entry.title, f"{entry.height}p" if entry.height else "audio", entry.codec,
+                      format_bytes(entry.size), entry.status)
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"  {name:<48} median {statistics.median(samples):8.3f} ms   p95 {p95:8.3f} ms   max {samples[-1]:8.3f} ms")
+
+def bench_model(entries, rng):
+    model = make_model()
+    print(f"model, {len(entries)} entries:")
+    report("load", [timed(model.load, [(e.index, e) for e in entries])])
+    for column in ("resolution", "size", "codec", "status", "index"):
+        report(f"sort by {column}", [timed(model.sort_by, column, descending) for descending in (True, False)])
+
+    query = "official remix #12"
+    typed = [timed(model.set_filter, query[:n]) for n in range(1, len(query) + 1)]
+    report(f"type {query!r}, per keystroke", typed)
+    scratch = []
+    for n in range(1, len(query) + 1):
+        model.set_filter("")
+        scratch.append(timed(model.set_filter, query[:n]))
+    report("same queries, each from scratch", scratch)
+    print(f"    {len(model)} rows match {query!r}")
+    model.set_filter("")
+    report("status filter (facet index)", [timed(model.set_filter, "", status=status) for status in STATUSES])
+    report("status + codec filter", [timed(model.set_filter, "", status="failed", codec=codec) for codec in CODECS])
+    model.set_filter("")
+    report("clear filter", [timed(model.set_filter, "")])
+
+    model.sort_by("status")
+    moves = []
+    for _ in range(2000):
+        entry = entries[rng.randrange(len(entries))]
+        entry.status = rng.choice(STATUSES)
+        moves.append(timed(model.update, entry.index))
+    report("status change moving one row (sorted by status)", moves)
+    return model
+
+def bench_redraw_headless(model, rng):
+    print(f"redraw without Tk (page of {HEIGHT} rows read and formatted):")
+    size = len(model)
+
+    def page(top):
+        for key in model.keys(top, top + HEIGHT):
+            row_values(key, model.rows[key])
+    report("page at a random offset", [timed(page, rng.randrange(size - HEIGHT)) for _ in range(2000)])
+    print("  (no display: VirtualTreeview and a plain Treeview were not measured)")
+
+def bench_redraw_tk(model, entries, root, rng):
+    from tkinter import ttk
+    from ytdl_core.listview import VirtualTreeview
+
+    columns = ("title", "resolution", "codec", "size", "status")
+    print(f"redraw with Tk ({HEIGHT} visible rows):")
+    view = VirtualTreeview(root, model, row_values, columns, height=HEIGHT)
+    view.pack()
+    root.update()
+    report("first redraw", [timed(view.redraw)])
+    scrolls = []
+    for _ in range(300):
+        view.top = rng.randrange(len(model))
+        scrolls.append(timed(view.redraw))
+    report("jump to a random offset", scrolls)
+    steps = []
+    for _ in range(300):
+        view.top += 1
+        steps.append(timed(view.redraw))
+    report("scroll by one row", steps)
+    model.sort_by("status")
+    updates = []
+    for _ in range(300):
+        entry = entries[model.key_at(view.top + rng.randrange(HEIGHT))]
+        entry.status = rng.choice(STATUSES)
+        updates.append(timed(lambda: (model.update(entry.index), view.redraw())))
+    report("visible row changes status, then redraw", updates)
+    filters = [timed(lambda q=q: (view.set_filter(q), view.redraw())) for q in ("o", "of", "off", "offi", "")]
+    report("filter keystroke, then redraw", filters)
+    root.update()
+    view.destroy()
+
+    tree = ttk.Treeview(root, columns=columns, height=HEIGHT)
+    tree.pack()
+
+    def fill():
+        for key in model.keys():
+            text, values = row_values(key, model.rows[key])
+            tree.insert("", "end", text=text, values=values)
+        root.update()
+    report(f"plain Treeview, insert all {len(model)} rows", [timed(fill)])
+
+    def resort():
+        model.sort_by("size")
+        tree.delete(*tree.get_children())
+        fill()
+    report("plain Treeview, re-sort by rebuilding", [timed(resort)])
+    tree.destroy()
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(42)
+    entries = [Entry(index, rng) for index in range(count)]
+    model = bench_model(entries, rng)
+    model.set_filter("")
+    model.sort_by("index")
+    root = None
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        pass  # No display (or no Tk).
+    if root is None:
+        bench_redraw_headless(model, rng)
+    else:
+        try:
+            bench_redraw_tk(model, entries, root, rng)
+        finally:
+            root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
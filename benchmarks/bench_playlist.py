@@ -0,0 +1,80 @@
+"""Times flat extraction and lazy detail loading over a synthetic playlist.
+
+Runs the fake yt-dlp from tests/fake_playlist.py, whose playlist includes
+entries without IDs, with a shared ID and unavailable ones. Reports time
+to the first and last flat entry, then loads every entry's details cold
+(each URL costs EXTRACT_TIME in the fake) and warm from a fresh
+MetadataCache, with how long request() held the calling thread each time.
+
+    python benchmarks/bench_playlist.py [entries] [batch_size]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+from fake_playlist import write_executable  # noqa: E402
+from ytdl_core.metadata_cache import MetadataCache  # noqa: E402
+from ytdl_core.playlist import DETAIL_BATCH_SIZE, PlaylistDetailLoader, iter_flat_playlist  # noqa: E402
+
+EXTRACT_TIME = 0.005
+
+
+def load_details(loader, entries):
+    """Requests every entry's details; returns (seconds in request(), seconds until all settled, loaded, failed)."""
+    loaded, failed = [], []
+    lock = threading.Lock()
+    settled = threading.Event()
+
+    def finish(results, entry):
+        with lock:
+            results.append(entry)
+            if len(loaded) + len(failed) == count:
+                settled.set()
+    start = time.perf_counter()
+    count = len(entries)
+    requested = loader.request(entries, lambda entry: finish(loaded, entry), lambda entry: finish(failed, entry))
+    blocked = time.perf_counter() - start
+    if requested != count:
+        raise SystemExit(f"only {requested} of {count} entries were requested")
+    settled.wait()
+    return blocked, time.perf_counter() - start, len(loaded), len(failed)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else DETAIL_BATCH_SIZE
+    folder = tempfile.mkdtemp(prefix="bench-playlist-")
+    os.environ["FAKE_EXTRACT_TIME"] = str(EXTRACT_TIME)
+    try:
+        executable = write_executable(folder)
+        start = time.perf_counter()
+        first = None
+        for entry in iter_flat_playlist(f"https://list.test/{count}", executable):
+            first = first or time.perf_counter() - start
+        flat = time.perf_counter() - start
+        print(f"flat extraction of {count} entries: first after {first * 1000:.1f} ms, all after {flat * 1000:.1f} ms")
+
+        cache = MetadataCache(os.path.join(folder, "cache"))
+        for label in ("cold", "warm"):
+            entries = list(iter_flat_playlist(f"https://list.test/{count}", executable))
+            loader = PlaylistDetailLoader(executable, cache, batch_size=batch_size)
+            try:
+                blocked, total, loaded, failed = load_details(loader, entries)
+            finally:
+                loader.shutdown()
+            print(f"{label} details, batches of {batch_size}: {loaded} loaded, {failed} unavailable in "
+                  f"{total:.2f}s; request() held the caller {blocked * 1000:.2f} ms")
+        cache.close()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
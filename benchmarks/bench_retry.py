@@ -0,0 +1,107 @@
+"""Retry policy against a fake yt-dlp that fails on script.
+
+Each URL names the outcome of each attempt, e.g. https://a.test/429,429,ok/3
+fails twice with HTTP 429 and then succeeds. The fake (tests/fake_ytdlp.py)
+sleeps like a short download, prints what real yt-dlp prints for that
+failure and exits 1.
+Retry delays are scaled down so the run takes seconds. Reports the
+failure histogram, attempts per scenario, the options each retry was run
+with, and how many jobs ran at once on the rate-limited host before and
+shortly after its first 429.
+
+    python benchmarks/bench_retry.py [jobs] [workers]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+FAKE_YTDLP = os.path.join(ROOT, "tests", "fake_ytdlp.py")
+
+from ytdl_core.jobs import JobQueue, DONE  # noqa: E402
+from ytdl_core.progress import parse_progress_line  # noqa: E402
+from ytdl_core.retry import RETRY_RULES, RetryPolicy, RetryRule  # noqa: E402
+
+DELAY_SCALE = 0.01
+ATTEMPT_TIME = 0.2
+SCENARIOS = ("ok", "429,ok", "429,429,ok", "403,ok", "timeout,timeout,ok", "frag,ok", "merge,ok", "416,ok",
+             "gone", "merge,merge")
+
+
+def peak_overlap(events, host, start=0.0, end=float("inf")):
+    """Most jobs running at once on host between start and end."""
+    running = peak = 0
+    for event in events:
+        if event["host"] != host:
+            continue
+        running += 1 if event["event"] == "start" else -1
+        if start <= event["time"] < end:
+            peak = max(peak, running)
+    return peak
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    state = tempfile.mkdtemp(prefix="bench-retry-")
+    os.environ["FAKE_ATTEMPT_TIME"] = str(ATTEMPT_TIME)
+
+    # Rate-limited and plain jobs share one host, so its throttling shows; the rest use another.
+    urls = []
+    for n in range(jobs):
+        script = SCENARIOS[n % len(SCENARIOS)]
+        host = "limited.test" if script.startswith("429") or script == "ok" else "other.test"
+        urls.append(f"https://{host}/{script}/{n}")
+    urls.sort(key=lambda url: "limited.test" not in url)
+    rules = {name: RetryRule(rule.retries, rule.base_delay * DELAY_SCALE, rule.throttle_host, rule.overrides)
+             for name, rule in RETRY_RULES.items()}
+    policy = RetryPolicy(rules=rules)
+    queue = JobQueue(lambda url, options: [sys.executable, FAKE_YTDLP,
+                                           *([] if options.get("resume_partial", True) else ["--no-continue"]),
+                                           *(["--load-info-json", "x.json"] if options.get("reuse_metadata", True)
+                                             else []), url, state],
+                     parse_progress_line, max_workers=workers, retry=policy)
+    start = time.perf_counter()
+    try:
+        queue.submit_many(urls, {})
+        queue.wait()
+        wall = time.perf_counter() - start
+        with open(os.path.join(state, "events.jsonl")) as f:
+            events = sorted((json.loads(line) for line in f), key=lambda e: (e["time"], e["event"] == "start"))
+    finally:
+        shutil.rmtree(state, ignore_errors=True)
+
+    done = sum(job.status == DONE for job in queue.jobs.values())
+    print(f"{jobs} jobs, {workers} workers: {done} done, {jobs - done} failed in {wall:.2f}s "
+          f"({sum(job.attempts for job in queue.jobs.values())} attempts; delays scaled by {DELAY_SCALE})")
+    print("failure histogram:")
+    for name, counts in policy.histogram().items():
+        print(f"  {name:<16}" + "  ".join(f"{key} {value:3d}" for key, value in counts.items()))
+    attempts = Counter()
+    for job in queue.jobs.values():
+        attempts[job.url.split("/")[3], job.attempts, job.status] += 1
+    print("attempts per scenario:")
+    for (script, count, status), n in sorted(attempts.items()):
+        print(f"  {script:<20} {count} attempt(s) -> {status} x{n}")
+    starts = [e for e in events if e["event"] == "start"]
+    scripts = Counter(url.split("/")[3] for url in urls)
+    print(f"attempts with --no-continue: {sum(e['no_continue'] for e in starts)} (one per 416 job: "
+          f"{scripts['416,ok']}); re-extracted: {sum(e['reextract'] for e in starts)} "
+          f"(one per 403 job: {scripts['403,ok']})")
+    first_429 = min((e["time"] for e in starts if e["outcome"] == "429"), default=None)
+    if first_429 is not None:
+        # The first 429 is reported when that attempt ends; attempts already in flight are not stopped.
+        reported = first_429 + ATTEMPT_TIME
+        settled = reported + ATTEMPT_TIME
+        print(f"limited.test concurrency: peak {peak_overlap(events, 'limited.test', end=reported)} before the "
+              f"first 429, {peak_overlap(events, 'limited.test', start=settled, end=settled + 1.0)} in the "
+              f"second after the attempts in flight ended; limit at the end {policy.hosts.limit('limited.test')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""API server under load: many jobs, many event-stream clients.
+
+Starts ytdl_core.server's ApiServer over a JobQueue whose "yt-dlp" is a
+fake that prints a progress line every 50 ms, opens many SSE clients from
+a separate process, submits a batch of jobs in one request and polls
+/api/status while they run. Reports submit time, API latency under load,
+events each client received (against the progress lines printed, to show
+the coalescing) and how long after the last job finished the slowest
+client had seen every job done.
+
+    python benchmarks/bench_server.py [jobs] [clients] [workers]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import subprocess
+import statistics
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ytdl_core.jobs import JobQueue  # noqa: E402
+from ytdl_core.progress import parse_progress_line  # noqa: E402
+from ytdl_core.server import ApiServer  # noqa: E402
+
+PROGRESS_STEPS = 20
+FAKE_YTDLP = f"""
+import time
+for i in range({PROGRESS_STEPS} + 1):
+    print(f"[download] {{100 * i / {PROGRESS_STEPS}:.1f}}% of 10.00MiB at 2.00MiB/s ETA 00:01", flush=True)
+    time.sleep(0.05)
+"""
+
+
+async def sse_client(port, jobs, results):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /api/events HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n\r\n".encode())
+    events = 0
+    done = set()
+    async for line in reader:
+        if line.startswith(b"data:"):
+            events += 1
+            if b'"status": "done"' in line:
+                # Only job events can report done here; the snapshot is taken before the submit.
+                done.add(json.loads(line[5:])["id"])
+                if len(done) == jobs:
+                    break
+    results.append((events, time.time()))
+    writer.close()
+
+async def run_clients(port, clients, jobs):
+    results = []
+    tasks = [asyncio.create_task(sse_client(port, jobs, results)) for _ in range(clients)]
+    await asyncio.sleep(0.5)
+    print("ready", flush=True)
+    await asyncio.gather(*tasks)
+    events = [n for n, _ in results]
+    print(json.dumps({"clients": len(results), "events": [min(events), max(events)],
+                      "last": max(t for _, t in results)}), flush=True)
+
+def request(url, method="GET", body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def main():
+    if sys.argv[1:2] == ["--clients"]:
+        asyncio.run(run_clients(*map(int, sys.argv[2:5])))
+        return 0
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    root = tempfile.mkdtemp(prefix="bench-server-")
+    fake = os.path.join(root, "fake_ytdlp.py")
+    with open(fake, "w") as f:
+        f.write(FAKE_YTDLP)
+
+    server = ApiServer(port=0, output_root=root)
+    server.queue = JobQueue(lambda url, options: [sys.executable, fake], parse_progress_line, max_workers=workers,
+                            on_update=server.on_update, on_output=server.on_output)
+    server.start()
+    watcher = subprocess.Popen([sys.executable, __file__, "--clients", str(server.port), str(clients), str(jobs)],
+                               stdout=subprocess.PIPE, text=True)
+    watcher.stdout.readline()
+    start = time.perf_counter()
+    request(server.url + "/api/jobs", "POST", {"urls": [f"https://bench.test/{n}" for n in range(jobs)]})
+    submitted = time.perf_counter() - start
+    latencies = []
+    while not server.queue.wait(timeout=0.2):
+        tick = time.perf_counter()
+        request(server.url + "/api/status")
+        latencies.append(time.perf_counter() - tick)
+    finished = time.time()
+    wall = time.perf_counter() - start
+    report = json.loads(watcher.stdout.readline())
+    watcher.wait()
+    server.stop()
+
+    print(f"{jobs} jobs, {workers} workers, {report['clients']} SSE clients: ran in {wall:.2f}s, "
+          f"submit request took {submitted * 1000:.0f}ms")
+    if latencies:
+        latencies.sort()
+        print(f"/api/status while streaming: median {statistics.median(latencies) * 1000:.1f}ms, "
+              f"max {latencies[-1] * 1000:.1f}ms over {len(latencies)} requests")
+    print(f"events per client: {report['events'][0]}-{report['events'][1]} for about {jobs * (PROGRESS_STEPS + 3)} job "
+          f"updates ({PROGRESS_STEPS + 1} progress lines per job)")
+    print(f"slowest client saw every job done {max(0.0, report['last'] - finished) * 1000:.0f}ms after the last one "
+          f"finished")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Time-to-first-frame of download-gui.py.
+
+Launches the GUI with --startup-benchmark several times in a scratch
+folder; each run prints its startup spans once the first frame is drawn
+and exits. Reports the wall time from process spawn to that point (which
+includes interpreter startup) and the GUI's own breakdown. The first run
+starts without caches or databases. Needs a display.
+
+    python benchmarks/bench_startup.py [runs]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+from statistics import mean, median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_SCRIPT = os.path.join(ROOT, "download-gui.py")
+RUN_TIMEOUT = 60
+
+
+def launch(workdir):
+    """Runs the GUI once; returns (wall seconds to first frame, reported timings)."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, GUI_SCRIPT, "--startup-benchmark"], cwd=workdir, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        if line.startswith("{"):
+            wall = time.perf_counter() - start
+            break
+    else:
+        raise SystemExit(f"GUI exited without reporting a first frame:\n{process.stderr.read()}")
+    process.wait(RUN_TIMEOUT)
+    return wall, json.loads(line)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+        print("No display available (set DISPLAY, or run under xvfb-run).", file=sys.stderr)
+        return 1
+
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    try:
+        results = [launch(workdir) for _ in range(runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    cold_wall, cold = results[0]
+    print(f"cold run: {cold_wall * 1000:7.1f} ms from spawn, first frame {cold['first_frame'] * 1000:7.1f} ms after the first import")
+    warm = results[1:] or results
+    walls = [wall for wall, _ in warm]
+    frames = [report["first_frame"] for _, report in warm]
+    print(f"warm runs ({len(warm)}): from spawn mean {mean(walls) * 1000:7.1f} ms, median {median(walls) * 1000:7.1f} ms; "
+          f"first frame mean {mean(frames) * 1000:7.1f} ms")
+    for name in warm[0][1]["spans"]:
+        values = [report["spans"].get(name, 0.0) for _, report in warm]
+        print(f"  {name:<12}{mean(values) * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
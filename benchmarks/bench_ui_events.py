@@ -0,0 +1,117 @@
+"""Replays a synthetic 100k-line yt-dlp log through the UI event pipeline.
+
+Reports how much time the UI thread spends applying updates when worker
+output is coalesced per frame, compared with one widget update per line.
+Uses a real Tk Text widget when a display is available.
+
+    python benchmarks/bench_ui_events.py [line_count]
+"""
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ytdl_core.ui_events import UIEventPump, UI_FRAME_MS
+
+
+def synthetic_log(count):
+    for i in range(count):
+        if i % 50 == 0:
+            yield f"[youtube] abc{i:08d}: Downloading webpage"
+        else:
+            pct = (i % 1000) / 10
+            yield f"[download]  {pct:5.1f}% of ~ 512.00MiB at  8.21MiB/s ETA 00:{i % 60:02d} (frag {i % 400}/400)"
+
+
+class ListSink:
+    """Stand-in for the log widget and progress bar when Tk is unavailable."""
+
+    def __init__(self):
+        self.chunks = []
+        self.progress = 0.0
+
+    def append_log(self, text):
+        self.chunks.append(text)
+
+    def erase_log(self):
+        self.chunks.clear()
+
+    def set_progress(self, value):
+        self.progress = value
+
+
+class TkSink(ListSink):
+    def __init__(self, root):
+        super().__init__()
+        import tkinter as tk
+        self.tk = tk
+        self.root = root
+        self.text = tk.Text(root)
+        self.text.pack()
+
+    def append_log(self, text):
+        self.text.insert(self.tk.END, text)
+        self.text.see(self.tk.END)
+
+    def erase_log(self):
+        self.text.delete(1.0, self.tk.END)
+
+    def set_progress(self, value):
+        self.progress = value
+        self.root.update_idletasks()
+
+
+def make_sink():
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        return TkSink(root), "tk"
+    except Exception:
+        return ListSink(), "list"
+
+
+def bench_pipeline(lines, sink):
+    pump = UIEventPump()
+
+    def produce():
+        for line in lines:
+            pump.log(line)
+            if line.startswith("[download]"):
+                pump.latest("progress", sink.set_progress, float(line.split()[1].rstrip("%")))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    while producer.is_alive() or pump.pump(sink.append_log, sink.erase_log):
+        time.sleep(UI_FRAME_MS / 1000)
+    return pump
+
+
+def bench_direct(lines, sink):
+    start = time.perf_counter()
+    for line in lines:
+        sink.append_log(line + "\n")
+        if line.startswith("[download]"):
+            sink.set_progress(float(line.split()[1].rstrip("%")))
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    lines = list(synthetic_log(count))
+
+    sink, kind = make_sink()
+    pump = bench_pipeline(lines, sink)
+    print(f"sink: {kind}, lines: {count}")
+    print(f"pipeline: {pump.frames} frames, UI-thread time {pump.ui_time * 1000:.1f} ms, "
+          f"worst frame {pump.max_frame_time * 1000:.2f} ms")
+
+    sink, kind = make_sink()
+    direct = bench_direct(lines, sink)
+    print(f"direct:   {count} updates, UI-thread time {direct * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,74 @@
+import time
+STARTED = time.time()  # Taken before the other imports so the startup timeline includes them.
+
 import os
 import re
 import sys
-import json
-import time
-import shutil
 import threading
 import subprocess
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from urllib.request import urlopen
-from io import BytesIO
 
-try:
-    from PIL import Image, ImageTk
-except ImportError:
-    messagebox.showerror("Missing Dependency", "Please install Pillow:\n\npip install pillow")
-    sys.exit(1)
+from ytdl_core.commands import (YTDLP_EXECUTABLE, CACHE_DIR, DEFAULT_TEMPLATE, MAX_RES_CHOICES, SUBTITLE_LANGS,
+                                build_command)
+from ytdl_core.bandwidth import BandwidthScheduler, parse_rate, parse_schedule
+from ytdl_core.dependencies import DependencyProbe, describe_tools
+from ytdl_core.engine import LibraryEngine
+from ytdl_core.formats import parse_formats, select_format
+from ytdl_core.jobs import JobQueue, parse_url_list, FINISHED_STATES, SKIPPED, hidden_startupinfo
+from ytdl_core.listmodel import ListModel
+from ytdl_core.listview import VirtualTreeview
+from ytdl_core.retry import RetryPolicy
+from ytdl_core.playlist import PlaylistDetailLoader, ExtractionError, iter_flat_playlist
+from ytdl_core.thumbnails import ThumbnailLoader, pick_thumbnail
+from ytdl_core.ui_events import UIEventPump, UI_FRAME_MS
+from ytdl_core.logs import LOGS_DIR, UI_LOG_LINES, open_job_log
+from ytdl_core.progress import parse_progress_line, format_bytes, format_eta
+from ytdl_core.timeline import Timeline, UIStallMonitor, write_timeline
 
 # --- Constants ---
-YTDLP_EXECUTABLE = "yt-dlp.exe" if os.name == 'nt' else "yt-dlp"
-FFMPEG_EXECUTABLE = "ffmpeg.exe" if os.name == 'nt' else "ffmpeg"
 INVALID_FN_CHARS = r'<>:"/\|?*'
-LOGS_DIR = "logs"
+MAX_PARALLEL_DOWNLOADS = 8
+ANY_STATUS = "all"
+JOB_STATUS_FILTERS = (ANY_STATUS, "queued", "running", "done", "failed", "cancelled", "skipped")
+ENTRY_STATUS_FILTERS = (ANY_STATUS, "pending", "loading", "loaded", "failed")
+# The window starts no taller than the screen minus this (title bar, taskbar); the rest scrolls.
+SCREEN_MARGIN = 80
+MIN_WINDOW_SIZE = (640, 400)
+# Row key of the automatic best pair in the format list.
+BEST_FORMAT_KEY = "best"
+# Prints startup timings as JSON once the first frame is drawn, then exits (see benchmarks/bench_startup.py).
+STARTUP_BENCHMARK_FLAG = "--startup-benchmark"
+# Followed by an API server URL (see ytdl_core/server.py): queue downloads there instead of in this window.
+SERVER_FLAG = "--server"
 
 # --- Helper Functions ---
 def sanitize_filename(name):
     """Removes invalid characters from a filename."""
     return re.sub(f"[{re.escape(INVALID_FN_CHARS)}]", "", name)
 
-def ensure_logs_dir():
-    """Creates the logs directory if it doesn't exist."""
-    if not os.path.exists(LOGS_DIR):
-        os.makedirs(LOGS_DIR)
-
-def save_log(log_text):
-    """Saves the download log to a timestamped file."""
-    ensure_logs_dir()
-    timestamp = time.strftime("%Y%m%d-%H%M%S")
-    path = os.path.join(LOGS_DIR, f"log-{timestamp}.txt")
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(log_text)
-    return path
-
 # --- Main Application ---
 class YTDLPDownloaderGUI(tk.Tk):
-    def __init__(self):
+    def __init__(self, startup_benchmark=False, server=None):
+        # Spans from the first import to the first drawn frame; see finish_startup.
+        self.startup = Timeline("startup")
+        self.startup.add_span("imports", STARTED, self.startup.start)
+        self.startup_benchmark = startup_benchmark
+        self.startup.begin("window")
         super().__init__()
 
         self.title("🎬 YouTube Downloader Pro")
-        self.geometry("800x750")
-        self.resizable(False, False)
+        self.minsize(*MIN_WINDOW_SIZE)
         self.configure(bg="#1e1e1e")
+        self.startup.end("window")
 
         # --- Style Configuration ---
+        # Stays ahead of the first frame: restyling visible widgets would flash.
+        self.startup.begin("styles")
         self.style = ttk.Style(self)
         self.style.theme_use('clam')
         self.configure_styles()
+        self.startup.end("styles")
 
         # --- Tkinter Variables ---
         self.url_var = tk.StringVar()
@@ -64,17 +77,80 @@ class YTDLPDownloaderGUI(tk.Tk):
         self.audio_only_var = tk.BooleanVar(value=False)
         self.subtitles_var = tk.BooleanVar(value=False)
         self.embed_subtitles_var = tk.BooleanVar(value=False)
+        self.subtitle_langs_var = tk.StringVar(value=SUBTITLE_LANGS)
+        self.thumbnail_var = tk.BooleanVar(value=False)
+        self.embed_thumbnail_var = tk.BooleanVar(value=False)
+        self.sidecars_var = tk.BooleanVar(value=False)
+        self.skip_archived_var = tk.BooleanVar(value=True)
+        self.compress_var = tk.BooleanVar(value=False)
+        self.store_var = tk.BooleanVar(value=False)
         self.max_res_var = tk.StringVar(value="none")
-        self.custom_template_var = tk.StringVar(value="%(title)s [%(id)s].%(ext)s")
+        self.custom_template_var = tk.StringVar(value=DEFAULT_TEMPLATE)
         self.status_var = tk.StringVar(value="Ready")
+        self.workers_var = tk.IntVar(value=2)
+        self.rate_limit_var = tk.StringVar()
+        self.schedule_var = tk.StringVar()
+        self.in_process_var = tk.BooleanVar(value=False)
+        self.playlist_filter_var = tk.StringVar()
+        self.playlist_status_var = tk.StringVar(value=ANY_STATUS)
+        self.format_filter_var = tk.StringVar()
+        self.job_filter_var = tk.StringVar()
+        self.job_status_var = tk.StringVar(value=ANY_STATUS)
 
         # --- Internal State ---
-        self.thumbnail_image = None
+        self.startup.begin("state")
+        self.thumbnail_images = {}
+        self.thumbnail_keys = {}
         self.metadata = {}
-        self.download_in_progress = False
-
+        self.fetched_url = None
+        self.fetched_formats = []
+        self.job_logs = {}
+        # Opened by open_services after the first frame; the controls that need them start disabled.
+        self.thumbnails = None
+        self.metadata_cache = None
+        self.archive = None
+        self.journal = None
+        self.detail_loader = None
+        self.sidecars = None
+        self.queue = None
+        self.services_opened = threading.Event()
+        self.services_thread = None
+        self.service_controls = []
+        self.bandwidth = BandwidthScheduler()
+        self.engine = None
+        self.compress_stage = None
+        self.store = None
+        self.compress_lock = threading.Lock()
+        # Rows behind the virtual list views; only the rows on screen become Tk items.
+        self.entry_states = {}
+        self.playlist_rows = ListModel({"index": lambda e: e.index, "title": lambda e: e.title.lower(),
+                                        "duration": lambda e: e.duration, "formats": self.entry_height},
+                                       facets={"status": self.entry_status}, search=lambda e: e.title, sort="index")
+        self.format_rows = ListModel({"id": lambda f: f.format_id, "ext": lambda f: f.ext,
+                                      "resolution": lambda f: f.height, "codecs": lambda f: f.codecs,
+                                      "size": lambda f: f.filesize},
+                                     search=lambda f: f"{f.format_id} {f.ext} {f.resolution} {f.note} {f.codecs}",
+                                     sort="resolution", descending=True)
+        self.job_rows = ListModel({"id": lambda j: j.id, "url": lambda j: j.url, "status": lambda j: j.status,
+                                   "progress": lambda j: j.percent},
+                                  facets={"status": lambda j: j.status}, search=lambda j: j.url, sort="id")
+        self.ui_events = UIEventPump()
+        self.ui_stalls = UIStallMonitor(UI_FRAME_MS / 1000)
+        self.server = server
+        # Last launch's probe results; re-checked in the background after the first frame.
+        self.dependency_probe = DependencyProbe(CACHE_DIR)
+        self.dependencies = self.dependency_probe.cached()
+        self.startup.end("state")
+
+        self.startup.begin("widgets")
         self.create_widgets()
-        self.check_dependencies()
+        self.show_dependencies(self.dependencies)
+        self.fit_to_screen()
+        self.startup.end("widgets")
+        self.startup.begin("first-frame")
+        self.bind("<Map>", self.on_first_map)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(UI_FRAME_MS, self.pump_ui_events)
 
     def configure_styles(self):
         """Configures the modern look and feel of the application."""
@@ -114,8 +190,18 @@ class YTDLPDownloaderGUI(tk.Tk):
                                borderwidth=0)
     def create_widgets(self):
         """Creates and lays out the widgets in the main window."""
-        main_frame = ttk.Frame(self, padding="20")
-        main_frame.pack(fill=tk.BOTH, expand=True)
+        # The content scrolls when the window is shorter than it (small screens).
+        self.scroll_canvas = tk.Canvas(self, bg="#1e1e1e", highlightthickness=0, bd=0)
+        self.window_scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.scroll_canvas.yview)
+        self.scroll_canvas.configure(yscrollcommand=self.window_scrollbar.set)
+        self.window_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.scroll_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        main_frame = self.main_frame = ttk.Frame(self.scroll_canvas, padding="20")
+        self.main_window = self.scroll_canvas.create_window(0, 0, window=main_frame, anchor="nw")
+        main_frame.bind("<Configure>", self.on_content_resized)
+        self.scroll_canvas.bind("<Configure>", self.on_content_resized)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.bind_all(sequence, self.on_mouse_wheel)
 
         # --- URL and Fetch Section ---
         url_frame = ttk.Frame(main_frame)
@@ -126,13 +212,16 @@ class YTDLPDownloaderGUI(tk.Tk):
 
         fetch_btn = ttk.Button(url_frame, text="Fetch Info", command=self.fetch_metadata_thread, style="Accent.TButton")
         fetch_btn.pack(side=tk.LEFT)
+        self.service_controls.append(fetch_btn)
 
         # --- Metadata Display ---
         meta_frame = ttk.Frame(main_frame, style="Card.TFrame")
         meta_frame.pack(fill=tk.X, pady=10)
-        self.thumb_label = ttk.Label(meta_frame)
+        self.video_card = ttk.Frame(meta_frame)
+        self.video_card.pack(fill=tk.X)
+        self.thumb_label = ttk.Label(self.video_card)
         self.thumb_label.pack(side=tk.LEFT, padx=15, pady=15)
-        info_frame = ttk.Frame(meta_frame)
+        info_frame = ttk.Frame(self.video_card)
         info_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 15))
 
         self.title_label = ttk.Label(info_frame, text="Title: N/A", font=("Segoe UI", 12, "bold"), wraplength=550)
@@ -142,6 +231,34 @@ class YTDLPDownloaderGUI(tk.Tk):
         self.duration_label = ttk.Label(info_frame, text="Duration: N/A", font=("Segoe UI", 9))
         self.duration_label.pack(anchor="w")
 
+        # Playlist view, shown instead of the video card in playlist mode
+        self.playlist_frame = ttk.Frame(meta_frame)
+        self.playlist_view = VirtualTreeview(self.playlist_frame, self.playlist_rows, self.playlist_row_values,
+                                             ("title", "duration", "details"), height=6,
+                                             on_select=self.on_playlist_select)
+        self.playlist_view.heading("#0", "#", sort="index")
+        self.playlist_view.heading("title", "Title", sort="title")
+        self.playlist_view.heading("duration", "Duration", sort="duration")
+        self.playlist_view.heading("details", "Formats", sort="formats")
+        self.playlist_view.column("#0", width=50, stretch=False)
+        self.playlist_view.column("title", width=430)
+        self.playlist_view.column("duration", width=90, stretch=False)
+        self.playlist_view.column("details", width=120, stretch=False)
+        self.playlist_view.pack(fill=tk.X)
+        playlist_actions = ttk.Frame(self.playlist_frame)
+        playlist_actions.pack(fill=tk.X, pady=(8, 0))
+        self.playlist_thumb_label = ttk.Label(playlist_actions)
+        self.playlist_thumb_label.pack(side=tk.LEFT)
+        ttk.Label(playlist_actions, text="Filter:").pack(side=tk.LEFT, anchor="s", padx=(10, 5))
+        ttk.Entry(playlist_actions, textvariable=self.playlist_filter_var, width=20).pack(side=tk.LEFT, anchor="s")
+        ttk.Combobox(playlist_actions, textvariable=self.playlist_status_var, state="readonly", width=8,
+                     values=ENTRY_STATUS_FILTERS).pack(side=tk.LEFT, anchor="s", padx=(5, 0))
+        for var in (self.playlist_filter_var, self.playlist_status_var):
+            var.trace_add("write", lambda *args: self.apply_playlist_filter())
+        queue_selected_btn = ttk.Button(playlist_actions, text="Queue Selected", command=self.queue_selected_entries)
+        queue_selected_btn.pack(side=tk.RIGHT, anchor="s")
+        self.service_controls.append(queue_selected_btn)
+
         # --- Download Options ---
         options_frame = ttk.LabelFrame(main_frame, text="Download Options", padding=15)
         options_frame.pack(fill=tk.X, pady=10)
@@ -152,7 +269,10 @@ class YTDLPDownloaderGUI(tk.Tk):
         ttk.Checkbutton(check_frame, text="Download Playlist", variable=self.playlist_var).pack(side=tk.LEFT, padx=(0, 20))
         ttk.Checkbutton(check_frame, text="Audio Only (mp3)", variable=self.audio_only_var).pack(side=tk.LEFT, padx=(0, 20))
         ttk.Checkbutton(check_frame, text="Subtitles", variable=self.subtitles_var).pack(side=tk.LEFT, padx=(0, 20))
-        ttk.Checkbutton(check_frame, text="Embed Subtitles", variable=self.embed_subtitles_var).pack(side=tk.LEFT)
+        ttk.Checkbutton(check_frame, text="Embed Subtitles", variable=self.embed_subtitles_var).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(check_frame, text="Skip Downloaded", variable=self.skip_archived_var).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(check_frame, text="Compress", variable=self.compress_var).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(check_frame, text="Link Duplicates", variable=self.store_var).pack(side=tk.LEFT)
 
         # Other options
         other_options_frame = ttk.Frame(options_frame)
@@ -160,13 +280,37 @@ class YTDLPDownloaderGUI(tk.Tk):
 
         ttk.Label(other_options_frame, text="Max Resolution:").pack(side=tk.LEFT, padx=(0, 5))
         maxres_combo = ttk.Combobox(other_options_frame, textvariable=self.max_res_var, state="readonly", width=10,
-                                    values=("none", "1080p", "720p", "480p", "360p"))
+                                    values=MAX_RES_CHOICES)
         maxres_combo.pack(side=tk.LEFT, padx=(0, 20))
+        maxres_combo.bind("<<ComboboxSelected>>", lambda e: self.refresh_format_choices())
 
         ttk.Label(other_options_frame, text="Filename Template:").pack(side=tk.LEFT, padx=(0, 5))
         filename_entry = ttk.Entry(other_options_frame, textvariable=self.custom_template_var, width=40)
         filename_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
+        # Subtitles, thumbnail and info JSON
+        sidecar_frame = ttk.Frame(options_frame)
+        sidecar_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Label(sidecar_frame, text="Subtitle Languages:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Entry(sidecar_frame, textvariable=self.subtitle_langs_var, width=16).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(sidecar_frame, text="Thumbnail", variable=self.thumbnail_var).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(sidecar_frame, text="Embed Thumbnail", variable=self.embed_thumbnail_var).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(sidecar_frame, text="Fetch Alongside Download",
+                        variable=self.sidecars_var).pack(side=tk.LEFT)
+
+        # Bandwidth budget shared by all downloads
+        bandwidth_frame = ttk.Frame(options_frame)
+        bandwidth_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Label(bandwidth_frame, text="Speed Limit:").pack(side=tk.LEFT, padx=(0, 5))
+        rate_entry = ttk.Entry(bandwidth_frame, textvariable=self.rate_limit_var, width=10)
+        rate_entry.pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Label(bandwidth_frame, text="Schedule:").pack(side=tk.LEFT, padx=(0, 5))
+        schedule_entry = ttk.Entry(bandwidth_frame, textvariable=self.schedule_var)
+        schedule_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        for entry in (rate_entry, schedule_entry):
+            entry.bind("<Return>", lambda e: self.apply_bandwidth())
+            entry.bind("<FocusOut>", lambda e: self.apply_bandwidth())
+
         # --- Output and Format Section ---
         output_frame = ttk.Frame(main_frame)
         output_frame.pack(fill=tk.X, pady=10)
@@ -179,118 +323,477 @@ class YTDLPDownloaderGUI(tk.Tk):
         # --- Format Selector ---
         format_frame = ttk.Frame(main_frame)
         format_frame.pack(fill=tk.X, pady=(5, 15))
-        ttk.Label(format_frame, text="Available Formats:", anchor="w").pack(fill=tk.X, pady=(0, 5))
-        self.format_combo = ttk.Combobox(format_frame, state="readonly")
-        self.format_combo.pack(fill=tk.X, ipady=4)
+        format_header = ttk.Frame(format_frame)
+        format_header.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(format_header, text="Available Formats:", anchor="w").pack(side=tk.LEFT)
+        ttk.Entry(format_header, textvariable=self.format_filter_var, width=24).pack(side=tk.RIGHT)
+        ttk.Label(format_header, text="Filter:").pack(side=tk.RIGHT, padx=(0, 5))
+        self.format_filter_var.trace_add("write", lambda *args: self.apply_format_filter())
+        self.format_view = VirtualTreeview(format_frame, self.format_rows, self.format_row_values,
+                                           ("ext", "resolution", "codecs", "size"), height=4, selectmode="browse")
+        self.format_view.heading("#0", "Format", sort="id")
+        self.format_view.heading("ext", "Ext", sort="ext")
+        self.format_view.heading("resolution", "Resolution", sort="resolution")
+        self.format_view.heading("codecs", "Codecs", sort="codecs")
+        self.format_view.heading("size", "Size", sort="size")
+        self.format_view.column("#0", width=110, stretch=False)
+        self.format_view.column("ext", width=60, stretch=False)
+        self.format_view.column("resolution", width=250)
+        self.format_view.column("codecs", width=130, stretch=False)
+        self.format_view.column("size", width=100, stretch=False, anchor="e")
+        self.format_view.pack(fill=tk.X)
+
+        # --- Download Queue ---
+        queue_frame = ttk.LabelFrame(main_frame, text="Download Queue", padding=10)
+        queue_frame.pack(fill=tk.X, pady=(0, 5))
+
+        queue_filter = ttk.Frame(queue_frame)
+        queue_filter.pack(fill=tk.X, pady=(0, 8))
+        ttk.Label(queue_filter, text="Filter:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Entry(queue_filter, textvariable=self.job_filter_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 20))
+        ttk.Label(queue_filter, text="Status:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Combobox(queue_filter, textvariable=self.job_status_var, state="readonly", width=10,
+                     values=JOB_STATUS_FILTERS).pack(side=tk.LEFT)
+        for var in (self.job_filter_var, self.job_status_var):
+            var.trace_add("write", lambda *args: self.apply_job_filter())
+
+        self.job_view = VirtualTreeview(queue_frame, self.job_rows, self.job_row_values, ("url", "status", "progress"),
+                                        height=5)
+        self.job_view.heading("#0", "#", sort="id")
+        self.job_view.heading("url", "URL", sort="url")
+        self.job_view.heading("status", "Status", sort="status")
+        self.job_view.heading("progress", "Progress", sort="progress")
+        self.job_view.column("#0", width=40, stretch=False)
+        self.job_view.column("url", width=280)
+        self.job_view.column("status", width=100, stretch=False)
+        self.job_view.column("progress", width=250, stretch=False, anchor="e")
+        self.job_view.pack(fill=tk.X)
+
+        queue_btns = ttk.Frame(queue_frame)
+        queue_btns.pack(fill=tk.X, pady=(8, 0))
+        ttk.Label(queue_btns, text="Parallel Downloads:").pack(side=tk.LEFT, padx=(0, 5))
+        workers_spin = ttk.Spinbox(queue_btns, from_=1, to=MAX_PARALLEL_DOWNLOADS, textvariable=self.workers_var,
+                                   width=4, state="readonly", command=self.on_workers_changed)
+        workers_spin.pack(side=tk.LEFT, padx=(0, 20))
+        # Enabled by update_engine_choice.
+        self.in_process_check = ttk.Checkbutton(queue_btns, text="In-process yt-dlp", variable=self.in_process_var,
+                                                command=self.on_engine_changed, state=tk.DISABLED)
+        self.in_process_check.pack(side=tk.LEFT, padx=(0, 20))
+        import_btn = ttk.Button(queue_btns, text="Import List...", command=self.import_url_list)
+        import_btn.pack(side=tk.LEFT)
+        clear_btn = ttk.Button(queue_btns, text="Clear Finished", command=self.clear_finished_jobs)
+        clear_btn.pack(side=tk.RIGHT)
+        retry_btn = ttk.Button(queue_btns, text="Retry", command=self.retry_selected_jobs)
+        retry_btn.pack(side=tk.RIGHT, padx=5)
+        cancel_btn = ttk.Button(queue_btns, text="Cancel", command=self.cancel_selected_jobs)
+        cancel_btn.pack(side=tk.RIGHT)
+        self.service_controls.extend([workers_spin, import_btn, clear_btn, retry_btn, cancel_btn])
 
         # --- Progress and Log ---
         self.progress = ttk.Progressbar(main_frame, length=760, mode='determinate', style="Gradient.Horizontal.TProgressbar")
         self.progress.pack(fill=tk.X, pady=5)
 
-        self.log_box = tk.Text(main_frame, height=8, bg="#111", fg="#ddd", wrap=tk.WORD, relief="flat",
+        self.log_box = tk.Text(main_frame, height=6, bg="#111", fg="#ddd", wrap=tk.WORD, relief="flat",
                                font=("Consolas", 9), yscrollcommand=True, bd=0)
         self.log_box.pack(fill=tk.BOTH, expand=True, pady=10)
 
         # --- Download Button and Status Bar ---
         bottom_frame = ttk.Frame(main_frame)
         bottom_frame.pack(fill=tk.X, pady=(10, 0))
-        self.download_btn = ttk.Button(bottom_frame, text="⬇  Download", command=self.download_thread, style="Accent.TButton")
+        self.download_btn = ttk.Button(bottom_frame, text="⬇  Download", command=self.enqueue_downloads, style="Accent.TButton")
         self.download_btn.pack(side=tk.RIGHT)
+        self.service_controls.append(self.download_btn)
+        # Enabled by services_ready once the queue and stores are open.
+        for widget in self.service_controls:
+            widget.state(["disabled"])
 
         self.status_label = ttk.Label(bottom_frame, textvariable=self.status_var, font=("Segoe UI", 9))
         self.status_label.pack(side=tk.LEFT, anchor="w", pady=(5,0))
 
 
+    def fit_to_screen(self):
+        """Sizes the window to its content, no taller than the screen allows."""
+        self.update_idletasks()
+        width = self.main_frame.winfo_reqwidth() + self.window_scrollbar.winfo_reqwidth()
+        height = min(self.main_frame.winfo_reqheight(), self.winfo_screenheight() - SCREEN_MARGIN)
+        self.geometry(f"{width}x{height}")
+
+    def on_content_resized(self, event=None):
+        """Keeps the content as wide as the window and the scroll region as tall as the content."""
+        canvas = self.scroll_canvas
+        canvas.itemconfigure(self.main_window, width=canvas.winfo_width())
+        canvas.configure(scrollregion=canvas.bbox("all"))
+
+    def on_mouse_wheel(self, event):
+        """Scrolls the window when it is shorter than its content; the lists and the log scroll themselves."""
+        widget = event.widget
+        if isinstance(widget, str) or isinstance(widget, tk.Text) or widget.winfo_toplevel() is not self:
+            return
+        if self.scroll_canvas.winfo_height() >= self.main_frame.winfo_reqheight():
+            return
+        up = event.num == 4 or (event.delta or 0) > 0
+        self.scroll_canvas.yview_scroll(-1 if up else 1, "units")
+
     def browse_output_folder(self):
         folder = filedialog.askdirectory()
         if folder:
             self.output_dir_var.set(folder)
 
+    # --- Startup ---
+    def on_first_map(self, event):
+        if event.widget is self and self.startup.is_open("first-frame"):
+            # <Map> arrives before the window is painted; an idle callback queued now runs after the drawing.
+            self.unbind("<Map>")
+            self.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """Records time-to-first-frame, then starts the work that was kept off the startup path."""
+        self.startup.end("first-frame")
+        self.startup.close()
+        first_frame = self.startup.info["first_frame"] = round(self.startup.end_time - STARTED, 3)
+        if self.startup_benchmark:
+            import json
+            spans = {name: round(seconds, 4) for name, seconds in self.startup.durations().items()}
+            print(json.dumps({"first_frame": first_frame, "spans": spans}), flush=True)
+            self.on_close()
+            return
+        write_timeline(self.startup, LOGS_DIR)
+        self.log(f"Started in {first_frame * 1000:.0f} ms.")
+        self.check_dependencies()
+        self.services_thread = threading.Thread(target=self.open_services, args=(self.workers_var.get(),),
+                                                daemon=True)
+        self.services_thread.start()
+
+    def open_services(self, workers):
+        """Opens the caches, archive, journal, worker pools and queue; runs on a worker thread after the first frame."""
+        started = time.perf_counter()
+        try:
+            # The SQLite-backed modules are imported here, off the startup path, like the client below.
+            from ytdl_core.archive import ARCHIVE_DB, DownloadArchive
+            from ytdl_core.journal import JOURNAL_DB, JobJournal
+            from ytdl_core.metadata_cache import MetadataCache
+            from ytdl_core.pipeline import SidecarStage
+            self.thumbnails = ThumbnailLoader(os.path.join(CACHE_DIR, "thumbnails"))
+            self.metadata_cache = MetadataCache(CACHE_DIR)
+            self.archive = DownloadArchive(ARCHIVE_DB)
+            self.journal = JobJournal(JOURNAL_DB)
+            self.detail_loader = PlaylistDetailLoader(YTDLP_EXECUTABLE, self.metadata_cache)
+            self.sidecars = SidecarStage(CACHE_DIR, metadata_cache=self.metadata_cache, archive=self.archive)
+            if self.server:
+                # Imported here, as most launches run their own queue.
+                from ytdl_core.client import TOKEN_ENV, RemoteJobQueue
+                self.queue = RemoteJobQueue(self.server, os.environ.get(TOKEN_ENV), on_update=self.on_job_update,
+                                            on_output=self.on_job_output, on_error=self.on_server_error)
+            else:
+                self.queue = JobQueue(self.build_command, parse_progress_line, max_workers=workers,
+                                      on_update=self.on_job_update, on_output=self.on_job_output,
+                                      archive=self.archive, on_file=self.on_job_file, journal=self.journal,
+                                      bandwidth=self.bandwidth, sidecars=self.sidecars, retry=RetryPolicy())
+        except Exception as e:
+            self.log(f"❌ Could not open the download queue: {e}")
+            self.update_status("Error: downloads are unavailable.")
+            return
+        finally:
+            self.services_opened.set()
+        self.ui_events.call(self.services_ready, time.perf_counter() - started)
+        if not self.server:
+            # The server journals its own jobs; this window only follows them.
+            self.scan_journal()
+
+    def services_ready(self, seconds):
+        """Enables the controls that need the queue and stores."""
+        for widget in self.service_controls:
+            widget.state(["!disabled"])
+        self.update_engine_choice()
+        self.log(f"Download queue ready in {seconds * 1000:.0f} ms.")
+        if self.server:
+            self.queue.start()
+            self.log(f"Queueing downloads on {self.server}.")
+
     def check_dependencies(self):
-        if not shutil.which(YTDLP_EXECUTABLE):
+        """Probes yt-dlp, ffmpeg and the optional packages in the background; see show_dependencies."""
+        self.dependency_probe.start(lambda tools: self.ui_events.call(self.show_dependencies, tools))
+
+    def show_dependencies(self, tools):
+        self.dependencies = tools
+        self.update_engine_choice()
+        if self.status_var.get().startswith("Ready") and tools:
+            self.status_var.set(f"Ready ({describe_tools(tools)})")
+        if not tools or any(info.cached for info in tools.values()):
+            return  # Only warn about fresh results.
+        if not tools["yt-dlp"].found:
             self.log(f"⚠️ {YTDLP_EXECUTABLE} not found. Please place it in the same folder as the script or in your system's PATH.")
             self.status_var.set(f"Error: {YTDLP_EXECUTABLE} not found.")
-        if not shutil.which(FFMPEG_EXECUTABLE):
+            messagebox.showerror("Dependency Error", f"{YTDLP_EXECUTABLE} not found. Please place it in the application's directory or in your system's PATH.")
+        elif not tools["ffmpeg"].found:
             self.log("⚠️ ffmpeg not found. Merging video/audio may fail if required.")
         else:
-            self.log("✅ yt-dlp and ffmpeg detected.")
-            
+            self.log(f"✅ {describe_tools(tools)} detected.")
+        if not tools["Pillow"].found:
+            self.log("⚠️ Pillow is not installed (pip install pillow); thumbnails are disabled.")
+
+    def update_engine_choice(self):
+        """Offers the in-process engine once the queue is open and a probe has found the yt_dlp package."""
+        usable = self.queue is not None and self.package_found("yt_dlp")
+        self.in_process_check.config(state=tk.NORMAL if usable else tk.DISABLED)
+
+    def package_found(self, name, unknown=False):
+        """Whether the last probe found an optional package; ``unknown`` before any probe has run."""
+        info = self.dependencies.get(name)
+        return unknown if info is None else info.found
+
+
+    # --- Thread-safe UI Updates ---
+    # Worker threads only post events; pump_ui_events applies them on the Tk
+    # main loop once per frame, coalescing progress and batching log text.
     def update_status(self, text):
-        self.status_var.set(text)
-        self.update_idletasks()
+        self.ui_events.latest("status", self.status_var.set, text)
+
+    def set_progress(self, value):
+        self.ui_events.latest("progress", self.progress.configure, {"value": value})
 
     def log(self, text):
-        self.log_box.insert(tk.END, text + "\n")
-        self.log_box.see(tk.END)
+        self.ui_events.log(text)
 
     def clear_log(self):
+        self.ui_events.clear_log()
+
+    def pump_ui_events(self):
+        self.ui_stalls.tick()
+        try:
+            self.ui_events.pump(self.append_log, self.erase_log)
+        finally:
+            self.after(UI_FRAME_MS, self.pump_ui_events)
+
+    def append_log(self, text):
+        self.log_box.insert(tk.END, text)
+        # Keep the widget to the same number of lines as the ring buffer.
+        line_count = int(self.log_box.index("end-1c").split(".")[0])
+        if line_count > UI_LOG_LINES:
+            self.log_box.delete("1.0", f"{line_count - UI_LOG_LINES}.0")
+        self.log_box.see(tk.END)
+
+    def erase_log(self):
         self.log_box.delete(1.0, tk.END)
 
     def fetch_metadata_thread(self):
-        threading.Thread(target=self.fetch_metadata, daemon=True).start()
-
-    def fetch_metadata(self):
         url = self.url_var.get().strip()
         if not url:
             messagebox.showwarning("Input Error", "Please enter a video or playlist URL.")
             return
+        target = self.fetch_playlist if self.playlist_var.get() else self.fetch_metadata
+        threading.Thread(target=target, args=(url,), daemon=True).start()
 
+    def fetch_metadata(self, url):
+        self.ui_events.call(self.show_video_card)
         self.clear_log()
         self.update_status("Fetching video info...")
         self.log("Fetching metadata...")
 
         try:
-            # Hide console window on Windows
-            startupinfo = None
-            if os.name == 'nt':
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                
-            cmd = [YTDLP_EXECUTABLE, "--dump-single-json", "--no-playlist", url]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=20, startupinfo=startupinfo, encoding='utf-8')
-            
-            if result.returncode != 0:
-                self.log(f"Failed to fetch metadata: {result.stderr}")
-                self.update_status("Error fetching info.")
-                return
-
-            meta_json = json.loads(result.stdout)
+            meta_json = self.metadata_cache.get(url)
+            if meta_json is not None:
+                self.log("Loaded metadata from cache.")
+            elif (engine := self.queue.engine) is not None:
+                meta_json = engine.extract_info(url, timeout=20)
+                self.metadata_cache.put(url, meta_json)
+            else:
+                cmd = [YTDLP_EXECUTABLE, "--dump-single-json", "--no-playlist", url]
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=20, startupinfo=hidden_startupinfo(), encoding='utf-8')
+
+                if result.returncode != 0:
+                    self.log(f"Failed to fetch metadata: {result.stderr}")
+                    self.update_status("Error fetching info.")
+                    return
+
+                import json
+                meta_json = json.loads(result.stdout)
+                self.metadata_cache.put(url, meta_json)
             self.metadata = meta_json
+            self.ui_events.call(self.show_metadata, meta_json, url)
+
+            if thumbnail_url := pick_thumbnail(meta_json):
+                self.load_thumbnail(self.thumb_label, meta_json.get("id"), thumbnail_url)
 
-            # Update UI with metadata
-            self.title_label.config(text=meta_json.get("title", "N/A"))
-            self.channel_label.config(text=f"Channel: {meta_json.get('uploader', 'N/A')}")
-            duration = self.seconds_to_hms(meta_json.get("duration", 0))
-            self.duration_label.config(text=f"Duration: {duration}")
-
-            if thumbnail_url := meta_json.get("thumbnail"):
-                self.load_thumbnail(thumbnail_url)
-
-            # Populate formats
-            formats = [
-                f"{f['format_id']} | {f['ext']} | {f.get('resolution', 'audio')} | {f.get('format_note', '')} | {(f.get('filesize') or f.get('filesize_approx', 0)) / (1024*1024):.2f}MB"
-                for f in meta_json.get('formats', [])
-            ]
-            self.format_combo['values'] = formats
-            if formats:
-                self.format_combo.current(len(formats) - 1) # Select best by default
-
-            self.log("Metadata and formats fetched successfully.")
+            stats = self.metadata_cache.stats()
+            self.log(f"Metadata and formats fetched successfully. (cache: {stats['hits']} hits, {stats['misses']} misses)")
             self.update_status("Ready to download.")
 
         except Exception as e:
             self.log(f"Error fetching metadata: {e}")
             self.update_status("Error fetching info.")
 
-    def load_thumbnail(self, url):
+    def show_metadata(self, meta_json, url):
+        self.title_label.config(text=meta_json.get("title", "N/A"))
+        self.channel_label.config(text=f"Channel: {meta_json.get('uploader', 'N/A')}")
+        duration = self.seconds_to_hms(meta_json.get("duration", 0))
+        self.duration_label.config(text=f"Duration: {duration}")
+        self.show_formats(meta_json, url)
+
+    def show_formats(self, meta_json, url):
+        """Fills the format selector from an info dict fetched for url."""
+        self.fetched_formats = parse_formats(meta_json)
+        self.fetched_url = url
+        self.refresh_format_choices()
+
+    def refresh_format_choices(self):
+        """Lists the fetched formats and the best pair under the current resolution limit, which starts selected."""
+        max_res = self.max_res_var.get()
+        max_height = int(max_res.rstrip("p")) if max_res != "none" else None
+        rows = [(f.format_id, f) for f in self.fetched_formats]
+        if best := select_format(self.fetched_formats, max_height=max_height):
+            rows.append((BEST_FORMAT_KEY, best))
+            self.log(f"Best format: {best.describe()}")
+        self.format_rows.load(rows)
+        if best is not None:
+            self.format_view.selection_set([BEST_FORMAT_KEY])
+            self.format_view.see(BEST_FORMAT_KEY)
+        else:
+            self.format_view.selection_set(self.format_rows.keys(0, 1))
+
+    def apply_format_filter(self):
+        self.format_view.set_filter(self.format_filter_var.get())
+
+    def format_row_values(self, key, f):
+        size = format_bytes(f.filesize) if f.filesize else "?"
+        if f.filesize and not f.size_exact:
+            size = "~" + size
+        resolution = f"{f.resolution} {f.note}" if f.note else f.resolution
+        return ("Best: " if key == BEST_FORMAT_KEY else "") + f.format_id, (f.ext, resolution, f.codecs, size)
+
+    # --- Playlist Mode ---
+    def show_video_card(self):
+        self.playlist_frame.pack_forget()
+        self.video_card.pack(fill=tk.X)
+
+    def show_playlist_view(self):
+        self.video_card.pack_forget()
+        self.playlist_frame.pack(fill=tk.X, padx=10, pady=10)
+
+    def reset_playlist_view(self):
+        self.show_playlist_view()
+        self.playlist_rows.clear()
+        self.entry_states = {}
+        self.thumbnail_keys.pop(self.playlist_thumb_label, None)
+        self.playlist_thumb_label.config(image="")
+        self.format_rows.clear()
+        self.fetched_url = None
+        self.fetched_formats = []
+
+    def add_playlist_entry(self, entry):
+        self.playlist_rows.put(entry.index, entry)
+
+    def set_entry_state(self, entry, state):
+        self.entry_states[entry.index] = state
+        self.playlist_rows.update(entry.index)
+
+    def entry_status(self, entry):
+        return "loaded" if entry.loaded else self.entry_states.get(entry.index, "pending")
+
+    def entry_height(self, entry):
+        """Tallest format of a loaded entry (0 for audio only); None until its formats are loaded."""
+        if not entry.loaded:
+            return None
+        return max((f.get('height') or 0 for f in entry.info.get('formats') or ()), default=0)
+
+    def playlist_row_values(self, index, entry):
+        status = self.entry_status(entry)
+        if status == "loaded":
+            count = len(entry.info.get('formats') or ())
+            height = self.entry_height(entry)
+            details = f"{count} ({height}p)" if height else f"{count} (audio)"
+        else:
+            details = {"loading": "loading...", "failed": "failed"}.get(status, "")
+        return str(index), (entry.title, self.seconds_to_hms(entry.duration), details)
+
+    def apply_playlist_filter(self):
+        status = self.playlist_status_var.get()
+        self.playlist_view.set_filter(self.playlist_filter_var.get(), status=None if status == ANY_STATUS else status)
+
+    def fetch_playlist(self, url):
+        """Streams a flat playlist extraction into the playlist view."""
+        self.ui_events.call(self.reset_playlist_view)
+        self.clear_log()
+        self.update_status("Fetching playlist...")
+        self.log("Fetching playlist entries...")
+
+        start = time.perf_counter()
+        count = 0
         try:
-            with urlopen(url) as u:
-                raw_data = u.read()
-            im = Image.open(BytesIO(raw_data)).resize((160, 90), Image.Resampling.LANCZOS)
-            self.thumbnail_image = ImageTk.PhotoImage(im)
-            self.thumb_label.config(image=self.thumbnail_image)
+            for entry in iter_flat_playlist(url, YTDLP_EXECUTABLE):
+                count = entry.index
+                self.ui_events.call(self.add_playlist_entry, entry)
+                # Warm the thumbnail cache so selecting an entry shows its picture at once.
+                self.thumbnails.preload([(entry.id, entry.thumbnail)])
+                if entry.index == 1:
+                    self.log(f"First entry after {time.perf_counter() - start:.2f}s.")
+                if entry.index % 50 == 0:
+                    self.update_status(f"Fetching playlist... {entry.index} entries")
+        except ExtractionError as e:
+            self.log(f"Failed to fetch playlist: {e}")
+            self.update_status("Error fetching playlist.")
+            return
         except Exception as e:
-            self.log(f"Failed to load thumbnail: {e}")
+            self.log(f"Error fetching playlist: {e}")
+            self.update_status("Error fetching playlist.")
+            return
+
+        self.log(f"Loaded {count} entries in {time.perf_counter() - start:.2f}s. "
+                 "Select entries to load their formats.")
+        self.update_status(f"Playlist ready: {count} entries.")
+
+    def selected_entries(self):
+        return [self.playlist_rows.rows[index] for index in self.playlist_view.selection()]
+
+    def on_playlist_select(self, event=None):
+        entries = self.selected_entries()
+        if len(entries) == 1 and entries[0].thumbnail:
+            self.load_thumbnail(self.playlist_thumb_label, entries[0].id, entries[0].thumbnail)
+        if len(entries) == 1 and entries[0].loaded:
+            self.show_formats(entries[0].info, entries[0].url)
+        for entry in entries:
+            if not entry.loaded:
+                self.set_entry_state(entry, "loading")
+        self.detail_loader.request(entries, self.on_entry_loaded, self.on_entry_failed)
+
+    def on_entry_loaded(self, entry):
+        self.ui_events.call(self.show_entry_details, entry)
+
+    def on_entry_failed(self, entry):
+        self.ui_events.call(self.set_entry_state, entry, "failed")
+
+    def show_entry_details(self, entry):
+        self.playlist_rows.update(entry.index)
+        if self.playlist_view.selection() == [entry.index]:
+            self.show_formats(entry.info, entry.url)
+
+    def queue_selected_entries(self):
+        entries = self.selected_entries()
+        if not entries:
+            messagebox.showwarning("No Selection", "Select one or more playlist entries first.")
+            return
+        self.queue.submit_many([entry.url for entry in entries],
+                               lambda url: dict(self.collect_options(url), playlist=False))
+        self.update_status(f"Queued {len(entries)} download(s).")
+
+    def load_thumbnail(self, label, video_id, url):
+        """Shows a thumbnail in label once the loader has fetched and resized it."""
+        if not self.package_found("Pillow", unknown=True):
+            return
+        key = (video_id, url)
+        self.thumbnail_keys[label] = key
+        self.thumbnails.request(video_id, url,
+                                lambda im: self.ui_events.call(self.show_thumbnail, label, key, im),
+                                lambda e: self.log(f"Failed to load thumbnail: {e}"))
+
+    def show_thumbnail(self, label, key, im):
+        if self.thumbnail_keys.get(label) != key:
+            return  # A newer request replaced this one while it was loading.
+        # PhotoImage is a Tk object and must be created on the main thread. Imported here, as
+        # Pillow is only needed once the first thumbnail arrives.
+        from PIL import ImageTk
+        self.thumbnail_images[label] = ImageTk.PhotoImage(im)
+        label.config(image=self.thumbnail_images[label])
 
     def seconds_to_hms(self, s):
         if not s: return "N/A"
@@ -298,121 +801,244 @@ class YTDLPDownloaderGUI(tk.Tk):
         m, sec = divmod(rem, 60)
         return f"{int(h)}h {int(m):02d}m {int(sec):02d}s" if h else f"{int(m)}m {int(sec):02d}s"
 
-    def set_ui_state(self, enabled):
-        """Enable or disable UI elements during download."""
-        self.download_in_progress = not enabled
-        state = tk.NORMAL if enabled else tk.DISABLED
-        for child in self.winfo_children():
-            if isinstance(child, ttk.Frame):
-                for widget in child.winfo_children():
-                    if 'state' in widget.keys():
-                        widget.configure(state=state)
-        self.download_btn.configure(state=state)
-
-    def download_thread(self):
-        if self.download_in_progress:
-            messagebox.showwarning("In Progress", "A download is already running.")
-            return
-        threading.Thread(target=self.download, daemon=True).start()
-
-    def download(self):
-        url = self.url_var.get().strip()
-        if not url:
+    # --- Download Queue ---
+    def collect_options(self, url):
+        """Snapshots the UI options for one queued URL."""
+        options = {
+            "output_dir": self.output_dir_var.get(),
+            "playlist": self.playlist_var.get(),
+            "audio_only": self.audio_only_var.get(),
+            "subtitles": self.subtitles_var.get(),
+            "embed_subtitles": self.embed_subtitles_var.get(),
+            "subtitle_langs": self.subtitle_langs_var.get().strip() or SUBTITLE_LANGS,
+            "thumbnail": self.thumbnail_var.get() or self.embed_thumbnail_var.get(),
+            "embed_thumbnail": self.embed_thumbnail_var.get(),
+            "sidecars": self.sidecars_var.get(),
+            "max_res": self.max_res_var.get(),
+            "template": self.custom_template_var.get().strip(),
+            "format_id": None,
+            "skip_archived": self.skip_archived_var.get(),
+            "compress": self.compress_var.get(),
+            "store": self.store_var.get(),
+        }
+        if options["store"]:
+            self.open_store()
+        # The format list belongs to the fetched video only.
+        selected = self.format_view.selection()
+        if selected and url == self.fetched_url:
+            options["format_id"] = self.format_rows.rows[selected[0]].format_id
+        return options
+
+    def enqueue_downloads(self):
+        urls = parse_url_list(self.url_var.get())
+        if not urls:
             messagebox.showerror("Error", "Please enter a valid URL.")
             return
+        self.queue.submit_many(urls, self.collect_options)
+        self.update_status(f"Queued {len(urls)} download(s).")
+
+    def scan_journal(self):
+        """Looks for downloads left by an earlier session; runs on a worker thread, as PID checks can be slow."""
+        entries = self.journal.unfinished()
+        if killed := self.journal.reap_orphans(entries):
+            self.log(f"Stopped {killed} leftover download process(es) from the last session.")
+        if entries:
+            self.ui_events.call(self.recover_jobs, entries, sum(entry.part_bytes for entry in entries))
+
+    def recover_jobs(self, entries, partial):
+        """Offers to resume downloads left unfinished by a crash or an earlier session."""
+        if messagebox.askyesno("Resume Downloads",
+                               f"{len(entries)} download(s) did not finish last time "
+                               f"({format_bytes(partial)} already downloaded).\n\nResume them now?"):
+            self.queue.resume(entries)
+            self.update_status(f"Resumed {len(entries)} download(s).")
+        else:
+            for entry in entries:
+                self.journal.remove(entry.entry)
 
-        self.set_ui_state(False)
-        self.clear_log()
-        self.progress['value'] = 0
-
+    def import_url_list(self):
+        path = filedialog.askopenfilename(filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        if not path:
+            return
+        with open(path, encoding="utf-8") as f:
+            urls = parse_url_list(f.read())
+        self.queue.submit_many(urls, self.collect_options)
+        self.log(f"Imported {len(urls)} URL(s) from {path}")
+        self.update_status(f"Queued {len(urls)} download(s).")
+
+    def selected_job_ids(self):
+        return self.job_view.selection()
+
+    def cancel_selected_jobs(self):
+        for job_id in self.selected_job_ids():
+            self.queue.cancel(job_id)
+
+    def retry_selected_jobs(self):
+        for job_id in self.selected_job_ids():
+            self.queue.retry(job_id)
+
+    def clear_finished_jobs(self):
+        for job_id in self.queue.clear_finished():
+            self.job_rows.remove(job_id)
+        self.set_progress(self.queue.overall_percent())
+
+    def apply_bandwidth(self):
+        """Applies the speed limit (e.g. 4M, blank for none) and schedule (e.g. 09:00-17:00=1M) to all jobs."""
         try:
-            cmd = self.build_command()
-            self.log(f"Running command:\n{' '.join(cmd)}\n")
-            self.update_status("Downloading...")
-
-            # Hide console window on Windows
-            startupinfo = None
-            if os.name == 'nt':
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, encoding='utf-8', errors='replace', startupinfo=startupinfo)
-            full_log = ""
-            for line in process.stdout:
-                full_log += line
-                self.log(line.strip())
-                self.parse_progress(line)
-            process.wait()
-
-            if process.returncode == 0:
-                self.log("\n✅ Download completed successfully.")
-                self.update_status("Download finished.")
-                self.progress['value'] = 100
-            else:
-                self.log(f"\n❌ Download failed with code {process.returncode}.")
-                self.update_status("Download failed.")
-
-            log_path = save_log(full_log)
-            self.log(f"\nLog saved to: {log_path}")
-
-        except Exception as e:
-            self.log(f"Error during download: {e}")
-            self.update_status("Download error.")
-        finally:
-            self.set_ui_state(True)
-            
-    def build_command(self):
-        """Builds the yt-dlp command list from UI options."""
-        url = self.url_var.get().strip()
-        out_dir = self.output_dir_var.get()
-        
-        cmd = [YTDLP_EXECUTABLE]
-
-        cmd.append("--progress")
-        cmd.append("--no-warnings")
-
-        if self.playlist_var.get():
-            cmd.extend(["--yes-playlist"])
+            budget = parse_rate(self.rate_limit_var.get())
+            schedule = parse_schedule(self.schedule_var.get())
+        except ValueError as e:
+            messagebox.showerror("Invalid Speed Limit", str(e))
+            return
+        self.bandwidth.set_budget(budget, schedule)
+        now = self.bandwidth.budget_now()
+        self.update_status(f"Speed limit now: {format_bytes(now) + '/s' if now else 'unlimited'}")
+
+    def on_engine_changed(self):
+        """Switches new jobs and metadata fetches between yt-dlp processes and the in-process engine."""
+        if self.in_process_var.get():
+            if self.engine is None:
+                self.engine = LibraryEngine(self.metadata_cache, self.archive, store=self.store)
+            self.queue.engine = self.engine
+            self.log("Using the in-process yt-dlp engine.")
         else:
-            cmd.extend(["--no-playlist"])
-
-        if self.audio_only_var.get():
-            cmd.extend(["-x", "--audio-format", "mp3"])
+            self.queue.engine = None
+            self.log(f"Using {YTDLP_EXECUTABLE} processes.")
+
+    def open_store(self):
+        """Opens the output store the first time a download asks for it."""
+        if self.store is None:
+            from ytdl_core.store import STORE_DIR, OutputStore
+            self.store = OutputStore(STORE_DIR)
+            self.queue.store = self.store
+            if self.engine is not None:
+                self.engine.store = self.store
+
+    def on_workers_changed(self):
+        self.queue.set_max_workers(self.workers_var.get())
+
+    def on_server_error(self, message):
+        self.log(f"⚠️ Server: {message}")
+        self.update_status(f"Server: {message}")
+
+    def on_job_update(self, job):
+        if job.status == SKIPPED:
+            self.log(f"[{job.id}] ⏭️ Already in the download archive, skipped: {job.url}")
+        if job.status in FINISHED_STATES and job.id in self.job_logs:
+            job_log = self.job_logs.pop(job.id)
+            job_log.write_line(self.finish_message(job))
+            job_log.close()
+            self.log(f"[{job.id}] {self.finish_message(job)}")
+            self.log(f"[{job.id}] Log saved to: {job_log.path}")
+        if job.status in FINISHED_STATES and job.timeline is not None:
+            write_timeline(job.timeline, LOGS_DIR)
+            self.log(f"[{job.id}] Timing: {job.timeline.describe()}")
+
+        self.ui_events.latest(("job", job.id), self.refresh_job_row, job)
+        self.set_progress(self.queue.overall_percent())
+        counts = self.queue.counts()
+        if job.timeline is not None and job.finished and not counts.get('running'):
+            stalls = self.ui_stalls
+            self.update_status(f"[{job.id}] {job.timeline.describe()} | UI stalls: {stalls.stall_time:.2f}s "
+                               f"(worst {stalls.max_stall * 1000:.0f} ms)")
+            return
+        achieved, allotted = self.queue.throughput()
+        rate = f"{format_bytes(achieved)}/s" + (f" of {format_bytes(allotted)}/s" if allotted else "")
+        self.update_status(f"Downloading... {counts.get('running', 0)} running, {counts.get('queued', 0)} queued, "
+                           f"{counts.get('done', 0)} done, {counts.get('failed', 0)} failed | {rate}")
+
+    def refresh_job_row(self, job):
+        if job.id not in self.queue.jobs:
+            return  # Cleared while the update was in flight.
+        self.job_rows.put(job.id, job)
+
+    def job_row_values(self, job_id, job):
+        return str(job_id), (job.url, self.job_status_text(job), self.job_progress_text(job))
+
+    def apply_job_filter(self):
+        status = self.job_status_var.get()
+        self.job_view.set_filter(self.job_filter_var.get(), status=None if status == ANY_STATUS else status)
+
+    def on_job_file(self, job, info):
+        """Hands a finished file to the compression stage; may block while it is full."""
+        if not job.options["compress"] or job.options["audio_only"] or not info.get("filepath"):
+            return
+        with self.compress_lock:
+            if self.compress_stage is None:
+                from ytdl_core.pipeline import CompressStage
+                self.compress_stage = CompressStage(on_update=self.on_compress_update)
+        if self.compress_stage.pending() >= self.compress_stage.max_pending:
+            self.log(f"[{job.id}] ⏸ Waiting for a free encoder...")
+        self.compress_stage.offer(info["filepath"])
+
+    def on_compress_update(self, task):
+        if task.status == "encoding":
+            self.update_status(task.describe())
         else:
-            selected_format = self.format_combo.get()
-            max_res = self.max_res_var.get()
-            
-            if max_res != "none":
-                res_val = max_res.replace("p", "")
-                cmd.extend(["-f", f"bestvideo[height<={res_val}]+bestaudio/best[height<={res_val}]"])
-            elif selected_format:
-                fmt_code = selected_format.split('|')[0].strip()
-                cmd.extend(["-f", fmt_code])
-
-        if self.subtitles_var.get():
-            cmd.extend(["--write-sub", "--sub-lang", "en,en-US,en-GB"])
-            if self.embed_subtitles_var.get():
-                cmd.append("--embed-subs")
-
-        out_template = self.custom_template_var.get().strip() or "%(title)s.%(ext)s"
-        out_path = os.path.join(out_dir, out_template)
-        cmd.extend(["-o", out_path])
-
-        cmd.append(url)
-        return cmd
-
-    def parse_progress(self, line):
-        m = re.search(r'\[download\]\s+([\d\.]+)%', line)
-        if m:
-            percent = float(m.group(1))
-            self.progress['value'] = percent
-            self.update_status(f"Downloading... {percent:.1f}%")
-            self.update_idletasks()
+            self.log(task.describe())
+
+    def job_status_text(self, job):
+        if job.status == "running" and job.progress is not None:
+            return job.progress.phase
+        if job.status == "queued" and job.retry_at:
+            return f"retrying ({job.failures[-1]})"
+        return job.status
+
+    def job_progress_text(self, job):
+        text = f"{job.percent:.1f}%"
+        record = job.progress
+        if job.status == "running" and record is not None and record.speed is not None:
+            text += f" {format_bytes(record.speed)}/s"
+            allotment = self.bandwidth.allotment(job.id)
+            if allotment and allotment[0]:
+                text += f" of {format_bytes(allotment[0])}/s"
+            text += f" ETA {format_eta(record.eta)}"
+        return text
+
+    def on_job_output(self, job, line):
+        job_log = self.job_logs.get(job.id)
+        if job_log is None:
+            job_log = self.job_logs[job.id] = open_job_log(job.id, LOGS_DIR)
+        job_log.write_line(line)
+        self.log(f"[{job.id}] {line.strip()}")
+
+    def finish_message(self, job):
+        if job.status == "done":
+            return "✅ Download completed successfully."
+        if job.status == "cancelled":
+            return "⏹ Download cancelled."
+        reason = f" ({job.failure})" if job.failure else ""
+        return f"❌ Download failed{reason} with code {job.returncode}."
+
+    def on_close(self):
+        if self.services_thread is not None:
+            self.services_opened.wait()  # Closed while they were still opening.
+        # Unlike Cancel, this keeps running and queued jobs in the journal for the next launch.
+        if self.queue is not None:
+            self.queue.shutdown()
+        if self.compress_stage is not None:
+            self.compress_stage.cancel_all()
+            self.compress_stage.shutdown(wait=False)
+        for job_log in self.job_logs.values():
+            job_log.close()
+        for pool in (self.detail_loader, self.thumbnails, self.engine):
+            if pool is not None:
+                pool.shutdown()
+        if self.sidecars is not None:
+            self.sidecars.shutdown(wait=False)
+        if self.ui_stalls.timeline.spans:
+            self.ui_stalls.timeline.close()
+            write_timeline(self.ui_stalls.timeline, LOGS_DIR)
+        for resource in (self.metadata_cache, self.archive, self.journal, self.store):
+            if resource is not None:
+                resource.close()
+        self.destroy()
+
+    def build_command(self, url, options):
+        """Builds the yt-dlp command list from a snapshot of the UI options."""
+        return build_command(url, options, self.metadata_cache, archive=self.archive, store=self.store)
 
 if __name__ == "__main__":
-    if not shutil.which(YTDLP_EXECUTABLE):
-        messagebox.showerror("Dependency Error", f"{YTDLP_EXECUTABLE} not found. Please place it in the application's directory or in your system's PATH.")
-        sys.exit(1)
-        
-    app = YTDLPDownloaderGUI()
+    server = sys.argv[sys.argv.index(SERVER_FLAG) + 1] if SERVER_FLAG in sys.argv[1:-1] else None
+    app = YTDLPDownloaderGUI(startup_benchmark=STARTUP_BENCHMARK_FLAG in sys.argv, server=server)
     app.mainloop()
\ No newline at end of file
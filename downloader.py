@@ -5,8 +5,21 @@ import threading
 import os
 import json
 
+from ytdl_core.engine import LibraryEngine, library_available
+from ytdl_core.formats import parse_formats
+from ytdl_core.progress import parse_progress_line, progress_args
+
 YTDLP_EXECUTABLE = "yt-dlp.exe" if os.name == 'nt' else "yt-dlp"
 
+# Format menu entries as yt-dlp arguments and as the matching YoutubeDL params.
+FORMAT_CHOICES = {
+    "Audio Only (MP3)": (["-f", "bestaudio", "--extract-audio", "--audio-format", "mp3"],
+                         {"format": "bestaudio", "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "mp3"}]}),
+    "Audio Only (WAV)": (["-f", "bestaudio", "--extract-audio", "--audio-format", "wav"],
+                         {"format": "bestaudio", "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "wav"}]}),
+    "Best Video + Audio": (["-f", "bv*+ba/b"], {"format": "bv*+ba/b"}),
+}
+
 class YTDLPDownloader(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -17,6 +30,9 @@ class YTDLPDownloader(tk.Tk):
         self.url = tk.StringVar()
         self.output_dir = tk.StringVar(value=os.getcwd())
         self.format = tk.StringVar(value="best")
+        # Opt-in: runs yt-dlp in-process, saving its startup per action; needs the yt_dlp package.
+        self.in_process = tk.BooleanVar(value=False)
+        self.engine = None
 
         self.create_widgets()
 
@@ -40,6 +56,8 @@ class YTDLPDownloader(tk.Tk):
             "Manual Selection (see below)"
         ]
         self.format_menu.pack()
+        ttk.Checkbutton(self, text="In-process yt-dlp", variable=self.in_process,
+                        state=tk.NORMAL if library_available() else tk.DISABLED).pack(pady=(5, 0))
 
         ttk.Button(self, text="🔍 List Available Formats", command=self.list_formats).pack(pady=5)
 
@@ -56,6 +74,14 @@ class YTDLPDownloader(tk.Tk):
         if folder:
             self.output_dir.set(folder)
 
+    def active_engine(self):
+        """The in-process engine when it is ticked, created on first use; None for yt-dlp processes."""
+        if not self.in_process.get():
+            return None
+        if self.engine is None:
+            self.engine = LibraryEngine()
+        return self.engine
+
     def list_formats(self):
         video_url = self.url.get().strip()
         if not video_url:
@@ -67,6 +93,10 @@ class YTDLPDownloader(tk.Tk):
         self.update()
 
         try:
+            if (engine := self.active_engine()) is not None:
+                info = engine.extract_info(video_url)
+                self.output_box.insert(tk.END, "\n".join(f.label() for f in parse_formats(info)) + "\n")
+                return
             result = subprocess.run(
                 [YTDLP_EXECUTABLE, "-F", video_url],
                 capture_output=True, text=True
@@ -91,36 +121,34 @@ class YTDLPDownloader(tk.Tk):
         self.progress['value'] = 0
         self.output_box.insert(tk.END, "Starting download...\n\n")
 
-        cmd = [YTDLP_EXECUTABLE, video_url, "-o", os.path.join(out_dir, "%(title)s.%(ext)s")]
+        out_template = os.path.join(out_dir, "%(title)s.%(ext)s")
+        cmd = [YTDLP_EXECUTABLE, video_url, "-o", out_template]
 
-        if fmt == "Audio Only (MP3)":
-            cmd += ["-f", "bestaudio", "--extract-audio", "--audio-format", "mp3"]
-        elif fmt == "Audio Only (WAV)":
-            cmd += ["-f", "bestaudio", "--extract-audio", "--audio-format", "wav"]
-        elif fmt == "Best Video + Audio":
-            cmd += ["-f", "bv*+ba/b"]
-        elif fmt == "Manual Selection (see below)":
+        if fmt == "Manual Selection (see below)":
             messagebox.showinfo("Use CLI", "Use the format code from above in terminal with yt-dlp -f code")
             return
-        else:
-            # Best (auto) — do NOT specify format; yt-dlp picks best combo
-            pass
+        # Best (auto) — do NOT specify format; yt-dlp picks best combo
+        format_args, format_params = FORMAT_CHOICES.get(fmt, ([], {}))
+        cmd += format_args
+
+        if (engine := self.active_engine()) is not None:
+            self.download_in_process(engine, video_url, dict(format_params, outtmpl=out_template, noprogress=True))
+            return
 
-        cmd += ["--progress-template", "download:%(progress._percent_str)s"]  # For clean parsing
+        cmd += progress_args()  # JSON progress lines, parsed by the shared progress engine
 
         try:
             process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
             for line in process.stdout:
+                record = parse_progress_line(line)
+                if record is not None and record.structured:
+                    line = record.describe() + "\n"
                 self.output_box.insert(tk.END, line)
                 self.output_box.see(tk.END)
 
                 # Parse progress
-                if "download:" in line and "%" in line:
-                    percent = line.split("download:")[1].strip().replace("%", "")
-                    try:
-                        self.progress['value'] = float(percent)
-                    except:
-                        pass
+                if record is not None and record.percent is not None:
+                    self.progress['value'] = record.percent
 
             process.wait()
             if process.returncode == 0:
@@ -131,6 +159,22 @@ class YTDLPDownloader(tk.Tk):
             self.output_box.insert(tk.END, "\nError: yt-dlp.exe not found.")
             messagebox.showerror("Missing yt-dlp", "Place yt-dlp.exe in the same folder.")
 
+    def download_in_process(self, engine, video_url, params):
+        def on_record(record):
+            self.output_box.insert(tk.END, record.describe() + "\n")
+            self.output_box.see(tk.END)
+            if record.percent is not None:
+                self.progress['value'] = record.percent
+
+        def on_output(line):
+            self.output_box.insert(tk.END, line + "\n")
+            self.output_box.see(tk.END)
+
+        if engine.run(video_url, params, on_record, on_output) == 0:
+            self.output_box.insert(tk.END, "\n✅ Download completed.\n")
+        else:
+            self.output_box.insert(tk.END, "\n❌ Download failed. Check logs.\n")
+
 if __name__ == "__main__":
     app = YTDLPDownloader()
     app.mainloop()
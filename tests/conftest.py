@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import time
+
+import pytest
+
+# The package is run from a checkout, not installed.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FAKE_YTDLP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_ytdlp.py")
+TIMEOUT = 20
+
+
+def fake_command(state):
+    """A JobQueue build_command running fake_ytdlp.py with the options real yt-dlp would get as arguments."""
+    def build(url, options):
+        cmd = [sys.executable, FAKE_YTDLP]
+        if options.get("rate_limit"):
+            cmd += ["--limit-rate", str(options["rate_limit"])]
+        if options.get("concurrent_fragments"):
+            cmd += ["--concurrent-fragments", str(options["concurrent_fragments"])]
+        if not options.get("resume_partial", True):
+            cmd.append("--no-continue")
+        if options.get("reuse_metadata", True):
+            cmd += ["--load-info-json", "x.json"]
+        return cmd + [url, state]
+    return build
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    """Builds JobQueues over fake_ytdlp.py with tmp_path as its state directory, shut down after the test."""
+    from ytdl_core.jobs import JobQueue
+    from ytdl_core.progress import parse_progress_line
+    queues = []
+
+    def make(**kwargs):
+        queue = JobQueue(fake_command(str(tmp_path)), parse_progress_line, **kwargs)
+        queues.append(queue)
+        return queue
+    yield make
+    for queue in queues:
+        queue.shutdown()
+
+@pytest.fixture
+def wait_for():
+    def wait(predicate, timeout=TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            assert time.monotonic() < deadline, "timed out"
+            time.sleep(0.02)
+    return wait
+
+@pytest.fixture
+def fake_playlist_ytdlp(tmp_path):
+    """Path of a yt-dlp executable running fake_playlist.py."""
+    if os.name == "nt":
+        pytest.skip("the fake yt-dlp is a shell script")
+    from fake_playlist import write_executable
+    return write_executable(str(tmp_path))
+
+@pytest.fixture
+def fake_events(tmp_path):
+    """Reads the start and end events fake_ytdlp.py logged, in order."""
+    def read():
+        path = tmp_path / "events.jsonl"
+        if not path.exists():
+            return []
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+    return read
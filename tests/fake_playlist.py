@@ -0,0 +1,80 @@
+"""Stands in for yt-dlp's metadata extraction over a synthetic playlist in the tests and benchmarks.
+
+    python tests/fake_playlist.py --flat-playlist --dump-json https://list.test/500
+    python tests/fake_playlist.py --dump-json --no-playlist URL [URL ...]
+
+A flat extraction of https://list.test/<count> prints <count> entries the
+way real yt-dlp does, including the awkward ones: every NO_ID_EVERY-th
+entry has no ID, every DUPLICATE_EVERY-th shares the ID "dup", and every
+GONE_EVERY-th is unavailable. Detail extraction prints full info JSON
+(with formats and original_url) for each URL, after $FAKE_EXTRACT_TIME
+seconds per URL (default 0), and appends the number of URLs it was given
+to $FAKE_PLAYLIST_LOG when that is set.
+
+PlaylistDetailLoader runs a single executable, so write_executable() puts
+a shell script that runs this file beside the test's other files.
+"""
+import os
+import sys
+import json
+import time
+
+NO_ID_EVERY = 50
+DUPLICATE_EVERY = 97
+GONE_EVERY = 125
+
+
+def entry_url(n):
+    return f"https://list.test/{'gone' if n % GONE_EVERY == 0 else 'v'}/{n}"
+
+def flat_entry(n):
+    if n % NO_ID_EVERY == 0:
+        video_id = None
+    elif n % DUPLICATE_EVERY == 0:
+        video_id = "dup"
+    else:
+        video_id = f"v{n}"
+    return {"_type": "url", "ie_key": "Fake", "id": video_id, "url": entry_url(n), "title": f"Video {n}",
+            "duration": 60 + n, "uploader": "Fake", "thumbnails": [{"url": f"https://list.test/img/{n}.jpg"}]}
+
+def full_info(url):
+    n = int(url.rsplit("/", 1)[1])
+    return {"id": "dup" if n % DUPLICATE_EVERY == 0 else f"v{n}", "title": f"Video {n}", "extractor_key": "Fake",
+            "webpage_url": url, "original_url": url, "duration": 60 + n,
+            "formats": [{"format_id": "18", "ext": "mp4", "height": 360, "vcodec": "avc1.42001E",
+                         "acodec": "mp4a.40.2", "filesize": 1000 * n},
+                        {"format_id": "137", "ext": "mp4", "height": 1080, "vcodec": "avc1.640028",
+                         "acodec": "none", "filesize": 4000 * n},
+                        {"format_id": "140", "ext": "m4a", "vcodec": "none", "acodec": "mp4a.40.2",
+                         "filesize": 500 * n}]}
+
+def write_executable(folder):
+    """Writes a 'yt-dlp' script running this file with the current interpreter; returns its path."""
+    path = os.path.join(folder, "yt-dlp")
+    with open(path, "w") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" "$@"\n')
+    os.chmod(path, 0o755)
+    return path
+
+def main(argv):
+    urls = [arg for arg in argv if not arg.startswith("-")]
+    if "--flat-playlist" in argv:
+        for n in range(1, int(urls[0].rsplit("/", 1)[1]) + 1):
+            print(json.dumps(flat_entry(n)), flush=True)
+        return 0
+    if log := os.environ.get("FAKE_PLAYLIST_LOG"):
+        with open(log, "a") as f:
+            f.write(f"{len(urls)}\n")
+    failed = False
+    for url in urls:
+        time.sleep(float(os.environ.get("FAKE_EXTRACT_TIME", 0)))
+        if "/gone/" in url:
+            print(f"ERROR: [Fake] {url}: Video unavailable", file=sys.stderr, flush=True)
+            failed = True
+            continue
+        print(json.dumps(full_info(url)), flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,112 @@
+"""Stands in for yt-dlp in the tests and benchmarks, failing or succeeding on script.
+
+    python tests/fake_ytdlp.py [--limit-rate N] [--concurrent-fragments N] [--no-continue]
+                               [--load-info-json FILE] URL STATE_DIR
+
+The URL's path is /<script>/<anything>, where the script names the outcome
+of each attempt, e.g. https://a.test/429,429,ok/3 fails twice with HTTP 429
+and then succeeds; the last outcome repeats. Outcomes are "ok", "hang", or
+a failure from FAILURES, which prints what real yt-dlp prints for it and
+exits 1. Attempts are counted per URL in STATE_DIR, and every start and end
+is appended to STATE_DIR/events.jsonl with the options the attempt ran with.
+
+An "ok" attempt on an http:// URL downloads it, paced to --limit-rate and
+resuming its .part file in STATE_DIR unless --no-continue is given, and
+prints structured progress as progress_args() asks real yt-dlp to. Other
+attempts sleep for $FAKE_ATTEMPT_TIME seconds (default 0) first.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ytdl_core.progress import PROGRESS_MARKER  # noqa: E402
+
+CHUNK_SIZE = 16 * 1024
+FAILURES = {
+    "429": ["[download] Got error: HTTP Error 429: Too Many Requests. Retrying (1/10)...",
+            "ERROR: unable to download video data: HTTP Error 429: Too Many Requests"],
+    "403": ["ERROR: unable to download video data: HTTP Error 403: Forbidden"],
+    "timeout": ["ERROR: [generic] x: Unable to download webpage: <urlopen error timed out>"],
+    "frag": ["ERROR: fragment 12 not found, unable to continue"],
+    "merge": ["[Merger] Merging formats into \"x.mp4\"", "ERROR: Postprocessing: Conversion failed!"],
+    "416": ["ERROR: unable to download video data: HTTP Error 416: Requested Range Not Satisfiable"],
+    "gone": ["ERROR: [generic] x: Video unavailable"],
+}
+
+
+def progress(kind, **data):
+    print(f"{PROGRESS_MARKER}{kind} {json.dumps(data)}", flush=True)
+
+def log_event(state, **event):
+    with open(os.path.join(state, "events.jsonl"), "a") as f:
+        f.write(json.dumps(dict(event, time=time.time())) + "\n")
+
+def download(url, path, limit_rate, resume):
+    """Fetches url into path.part, no faster than limit_rate bytes/s, then renames it to path."""
+    part = path + ".part"
+    offset = os.path.getsize(part) if resume and os.path.exists(part) else 0
+    request = urllib.request.Request(url, headers={"Range": f"bytes={offset}-"} if offset else {})
+    with urllib.request.urlopen(request) as response, open(part, "ab" if offset else "wb") as f:
+        total = offset + int(response.headers["Content-Length"])
+        done = offset
+        start = time.monotonic()
+        while chunk := response.read(CHUNK_SIZE):
+            f.write(chunk)
+            f.flush()
+            done += len(chunk)
+            elapsed = time.monotonic() - start
+            speed = (done - offset) / elapsed if elapsed else None
+            progress("download", status="downloading", downloaded_bytes=done, total_bytes=total, speed=speed,
+                     eta=None, filename=path)
+            if limit_rate:
+                time.sleep(max(0.0, (done - offset) / limit_rate - elapsed))
+    os.replace(part, path)
+    progress("download", status="finished", downloaded_bytes=total, total_bytes=total, filename=path)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit-rate", type=int)
+    parser.add_argument("--concurrent-fragments", type=int)
+    parser.add_argument("--no-continue", action="store_true")
+    parser.add_argument("--load-info-json")
+    parser.add_argument("url")
+    parser.add_argument("state")
+    args, _ = parser.parse_known_args()
+
+    script, name = args.url.split("/", 3)[3].split("?")[0].split("/", 1)
+    host = args.url.split("/")[2]
+    counter = os.path.join(args.state, args.url.replace("/", "_").replace(":", "_").replace("?", "_"))
+    attempt = int(open(counter).read()) + 1 if os.path.exists(counter) else 1
+    with open(counter, "w") as f:
+        f.write(str(attempt))
+    steps = script.split(",")
+    outcome = steps[min(attempt, len(steps)) - 1]
+    log_event(args.state, host=host, url=args.url, event="start", attempt=attempt, outcome=outcome,
+              pid=os.getpid(), limit_rate=args.limit_rate, fragments=args.concurrent_fragments,
+              no_continue=args.no_continue, reextract=args.load_info_json is None)
+
+    path = os.path.join(args.state, name.replace("/", "_") + ".mp4")
+    if outcome == "ok" and args.url.startswith("http://"):
+        download(args.url, path, args.limit_rate, not args.no_continue)
+    else:
+        print("[download] Destination: x.mp4", flush=True)
+        time.sleep(float(os.environ.get("FAKE_ATTEMPT_TIME", 0)))
+        if outcome == "hang":
+            time.sleep(60)
+        if outcome == "ok":
+            progress("download", status="finished", downloaded_bytes=100, total_bytes=100, filename=path)
+    for line in FAILURES.get(outcome, []):
+        print(line, flush=True)
+    if outcome == "ok":
+        progress("file", id=name, extractor_key="Fake", format_id="0", filepath=path, webpage_url=args.url)
+    log_event(args.state, host=host, event="end", pid=os.getpid())
+    return 0 if outcome == "ok" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
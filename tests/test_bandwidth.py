@@ -0,0 +1,163 @@
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ytdl_core.bandwidth import (BandwidthScheduler, FRAGMENT_BUDGET, MAX_FRAGMENTS_PER_JOB, next_window_change,
+                                 parse_rate, parse_schedule)
+from ytdl_core.jobs import DONE
+
+TIMEOUT = 30
+
+
+def total(scheduler):
+    return sum(rate for rate, _ in scheduler._allotments.values())
+
+
+def test_parse_rate_and_schedule():
+    assert parse_rate("4M") == 4 * 1024 ** 2
+    assert parse_rate("1.5MiB/s") == int(1.5 * 1024 ** 2)
+    assert parse_rate("none") is None and parse_rate("") is None
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+    assert parse_schedule("09:00-17:00=1M, 17:00-09:00=none") == [(540, 1020, 1024 ** 2), (1020, 540, None)]
+    with pytest.raises(ValueError):
+        parse_schedule("25:00-26:00=1M")
+
+def test_jobs_started_one_by_one_share_evenly():
+    scheduler = BandwidthScheduler(budget=1000000)
+    assert scheduler.allot({1: None}) == {1: (1000000, MAX_FRAGMENTS_PER_JOB)}
+    scheduler.allot({2: None})
+    scheduler.allot({3: None})
+    rates = [scheduler.allotment(job_id)[0] for job_id in (1, 2, 3)]
+    assert max(rates) - min(rates) <= 1
+    assert total(scheduler) <= 1000000
+    assert sum(fragments for _, fragments in scheduler._allotments.values()) <= FRAGMENT_BUDGET
+
+def test_capped_jobs_leave_the_rest_to_others():
+    scheduler = BandwidthScheduler(budget=1000000)
+    scheduler.allot({1: 100000, 2: None, 3: None})
+    assert scheduler.allotment(1)[0] == 100000
+    assert scheduler.allotment(2)[0] == scheduler.allotment(3)[0] == 450000
+    assert BandwidthScheduler().allot({1: 5000, 2: None}) == {1: (5000, FRAGMENT_BUDGET // 2), 2: (None, 8)}
+
+def test_unlimited_jobs_keep_one_connection():
+    assert BandwidthScheduler().allot({1: None, 2: None}) == {1: (None, None), 2: (None, None)}
+    assert BandwidthScheduler(fragment_budget=6).allot({1: None, 2: None}) == {1: (None, 3), 2: (None, 3)}
+
+def test_running_jobs_are_told_about_new_shares():
+    scheduler = BandwidthScheduler(budget=900)
+    changes = []
+    scheduler.watch(changes.append)
+    scheduler.allot({1: None})
+    assert changes == []
+    scheduler.allot({2: None, 3: None})
+    assert changes == [{1}]
+    scheduler.release(2)
+    assert changes[-1] == {1, 3}
+    assert scheduler.allotment(1)[0] + scheduler.allotment(3)[0] == 900
+    scheduler.set_budget(300)
+    assert changes[-1] == {1, 3} and total(scheduler) == 300
+    scheduler.release(2)  # Already gone: nothing changes.
+    assert len(changes) == 3
+
+def test_schedule_windows():
+    noon = time.mktime((2024, 5, 1, 12, 0, 30, 0, 0, -1))
+    schedule = parse_schedule("09:00-17:00=1M,22:00-06:00=none")
+    scheduler = BandwidthScheduler(budget=5000, schedule=schedule)
+    assert scheduler.budget_now(noon) == 1024 ** 2
+    assert scheduler.budget_now(noon + 6 * 3600) == 5000
+    assert scheduler.budget_now(noon + 12 * 3600) is None
+    assert next_window_change(schedule, noon) == 5 * 3600 - 30
+    assert next_window_change([], noon) is None
+
+def test_window_change_rebalances_running_jobs():
+    scheduler = BandwidthScheduler(budget=None)
+    changes = []
+    scheduler.watch(changes.append)
+    scheduler.allot({1: None, 2: None})
+    # As if a business-hours window had just opened.
+    scheduler.schedule = [(0, 24 * 60, 2000)]
+    scheduler._window_changed()
+    assert changes == [{1, 2}]
+    assert scheduler.allotment(1) == (1000, MAX_FRAGMENTS_PER_JOB)
+    assert scheduler._timer is not None
+    scheduler.release(1)
+    scheduler.release(2)
+    assert scheduler._timer is None
+
+
+# --- Against a throttled server and the fake yt-dlp ---
+SIZE = 240 * 1024
+SERVER_RATE = 4 * 1024 * 1024
+BUDGET = 320 * 1024
+
+
+class ThrottledHandler(BaseHTTPRequestHandler):
+    """Serves SIZE bytes for any path, honouring Range, no faster than SERVER_RATE per connection."""
+
+    def do_GET(self):
+        start = int(self.headers.get("Range", "bytes=0-")[6:].rstrip("-"))
+        self.server.ranges.append((self.path, start))
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Length", str(SIZE - start))
+        self.end_headers()
+        for offset in range(start, SIZE, 16 * 1024):
+            self.wfile.write(bytes(min(16 * 1024, SIZE - offset)))
+            time.sleep(16 * 1024 / SERVER_RATE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ThrottledHandler)
+    httpd.daemon_threads = True
+    httpd.ranges = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_running_downloads_follow_their_share(server, make_queue, wait_for, fake_events, tmp_path):
+    scheduler = BandwidthScheduler(budget=BUDGET)
+    outputs = []
+    queue = make_queue(max_workers=4, bandwidth=scheduler, on_output=lambda job, line: outputs.append(line))
+    first = queue.submit(f"{server.url}/ok/first")
+    wait_for(lambda: first.percent > 10)
+    second = queue.submit(f"{server.url}/ok/second")
+    assert queue.wait(TIMEOUT)
+    assert first.status == second.status == DONE
+
+    starts = {}
+    for event in fake_events():
+        if event["event"] == "start":
+            starts.setdefault(event["url"].rsplit("/", 1)[-1], []).append(event["limit_rate"])
+    # Alone, then halved when the second job started; whichever finishes last gets the whole budget again.
+    assert starts["first"][:2] == [BUDGET, BUDGET // 2]
+    assert starts["second"][0] == BUDGET // 2
+    assert starts["first"][2:] + starts["second"][1:] in ([], [BUDGET])
+    assert any(line.startswith("[bandwidth] Restarting at") for line in outputs)
+    # The restarted process resumed the .part file, and both files are whole.
+    assert any(path.endswith("/first") and offset > 0 for path, offset in server.ranges)
+    for name in ("first", "second"):
+        assert os.path.getsize(tmp_path / f"{name}.mp4") == SIZE
+    assert scheduler._allotments == {} and first.allotment is None
+
+def test_a_batch_starts_with_even_shares(server, make_queue, fake_events):
+    scheduler = BandwidthScheduler(budget=BUDGET)
+    queue = make_queue(max_workers=4, bandwidth=scheduler)
+    jobs = queue.submit_many([f"{server.url}/ok/{n}" for n in range(3)])
+    assert queue.wait(TIMEOUT)
+    assert all(job.status == DONE for job in jobs)
+    starts = [event for event in fake_events() if event["event"] == "start"]
+    # Started as one batch: each got a third straight away, so nobody was restarted to make room.
+    rates = [event["limit_rate"] for event in starts[:3]]
+    assert sum(rates) == BUDGET and max(rates) - min(rates) <= 1
+    assert {event["url"] for event in starts[:3]} == {job.url for job in jobs}
+    assert all(event["fragments"] == FRAGMENT_BUDGET // 3 for event in starts[:3])
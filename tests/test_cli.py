@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+from ytdl_core.cli import EXIT_OK, EXIT_USAGE, main
+
+
+@pytest.mark.parametrize("argv", [[], ["--limit-rate", "fast", "https://a.test/1"], ["-a", "missing.txt"]])
+def test_usage_errors_create_no_files(tmp_path, monkeypatch, argv):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit) as exit_info:
+        main(argv)
+    assert exit_info.value.code == EXIT_USAGE
+    assert os.listdir(tmp_path) == []
+
+def test_archive_import_alone(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "yt-dlp-archive.txt").write_text("youtube abcdefghijk\n", encoding="utf-8")
+    assert main(["--archive-import", "yt-dlp-archive.txt"]) == EXIT_OK
+    assert '"added": 1' in capsys.readouterr().out
+    assert main(["--archive-export", "out.txt"]) == EXIT_OK
+    assert (tmp_path / "out.txt").read_text(encoding="utf-8").split() == ["youtube", "abcdefghijk"]
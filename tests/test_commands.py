@@ -0,0 +1,22 @@
+import pytest
+
+from ytdl_core.commands import build_command, format_spec, make_options
+
+
+def test_format_spec():
+    assert format_spec(make_options()) is None
+    assert format_spec(make_options(max_res="720p")) == "bestvideo[height<=720]+bestaudio/best[height<=720]"
+    assert format_spec(make_options(format_id="137+140")) == "137+140"
+    assert format_spec(make_options(format_id="137+140", audio_only=True)) is None
+
+def test_an_explicit_format_is_held_to_the_resolution_limit():
+    options = make_options(format_id="137+140", max_res="720p")
+    assert format_spec(options) == "(137+140)[height<=?720]"
+    cmd = build_command("https://a.test/1", options)
+    assert cmd[cmd.index("-f") + 1] == "(137+140)[height<=?720]"
+
+def test_make_options_rejects_bad_values():
+    with pytest.raises(ValueError, match="Unknown download options: colour"):
+        make_options(colour="red")
+    with pytest.raises(ValueError, match="max_res"):
+        make_options(max_res="720")
@@ -0,0 +1,99 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from ytdl_core.compress import DONE, SKIPPED, CompressionEngine, CompressTask, default_job_budget, probe
+
+needs_ffmpeg = pytest.mark.skipif(not (shutil.which("ffmpeg") and shutil.which("ffprobe")),
+                                  reason="ffmpeg and ffprobe are not on PATH")
+
+
+def make_clip(path, height=240):
+    """Writes a 1-second test pattern with a tone, the kind of file a download leaves behind."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", f"testsrc=size={height * 4 // 3}x{height}:rate=25:duration=1",
+                    "-f", "lavfi", "-i", "sine=frequency=440:duration=1",
+                    "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", path], check=True)
+    return path
+
+
+def test_output_names_keep_same_named_sources_apart(tmp_path):
+    engine = CompressionEngine(str(tmp_path / "out"), "cpu")
+    try:
+        first = engine.output_path(str(tmp_path / "a" / "clip.mp4"))
+        second = engine.output_path(str(tmp_path / "b" / "clip.mp4"))
+        assert first != second
+        assert os.path.dirname(first) == str(tmp_path / "out")
+        name, digest, suffix = os.path.basename(first).rsplit("_", 2)
+        assert (name, len(digest), suffix) == ("clip", 8, "compressed.mp4")
+        assert engine.output_path(str(tmp_path / "a" / "clip.mp4")) == first
+    finally:
+        engine.shutdown()
+
+def test_job_budget_splits_the_cores():
+    assert default_job_budget("cpu", 1) == (1, 1)
+    assert default_job_budget("cpu", 8) == (4, 2)
+    assert default_job_budget("cpu", 64) == (8, 8)
+    assert default_job_budget("gpu", 64) == (3, None)
+
+def test_commands(tmp_path):
+    task = CompressTask("in.mp4", "out.mp4")
+    task.bitrate = "1500k"
+    engine = CompressionEngine(str(tmp_path), "default", bufsize="1500k", threads_per_job=2)
+    try:
+        cmd = engine.build_command(task, "out.part.mp4")
+    finally:
+        engine.shutdown()
+    assert "-c:v" not in cmd and "-preset" not in cmd
+    assert cmd[cmd.index("-b:v") + 1] == "1500k" and cmd[cmd.index("-bufsize") + 1] == "1500k"
+    engine = CompressionEngine(str(tmp_path), "cpu", threads_per_job=2)
+    try:
+        cmd = engine.build_command(task, "out.part.mp4")
+    finally:
+        engine.shutdown()
+    assert cmd[cmd.index("-c:v") + 1] == "libx264" and "-bufsize" not in cmd
+    assert cmd[cmd.index("-threads") + 1] == "2"
+
+@needs_ffmpeg
+def test_compresses_and_skips_on_a_rerun(tmp_path):
+    sources = [make_clip(str(tmp_path / "a" / "clip.mp4")), make_clip(str(tmp_path / "b" / "clip.mp4"), 180)]
+    out = str(tmp_path / "out")
+    updates = []
+    engine = CompressionEngine(out, "cpu", bitrate_table=((0, "200k"),), max_jobs=2, on_update=updates.append)
+    try:
+        tasks = engine.run(sources)
+    finally:
+        engine.shutdown()
+    assert [task.status for task in tasks] == [DONE, DONE], [task.error for task in tasks]
+    outputs = [task.output for task in tasks]
+    assert len(set(outputs)) == 2
+    assert [probe(path)["height"] for path in outputs] == [240, 180]
+    assert all(0.9 < probe(path)["duration"] < 1.5 for path in outputs)
+    assert not [name for name in os.listdir(out) if ".part." in name]
+    assert any(task.status == DONE for task in updates)
+
+    # A second run finds both in the index, and never compresses its own outputs.
+    engine = CompressionEngine(out, "cpu", bitrate_table=((0, "200k"),))
+    try:
+        again = engine.run(sources + outputs)
+    finally:
+        engine.shutdown()
+    assert [task.status for task in again] == [SKIPPED] * 4
+    assert [task.output for task in again[:2]] == outputs
+
+@needs_ffmpeg
+def test_a_changed_source_is_compressed_again(tmp_path):
+    source = make_clip(str(tmp_path / "clip.mp4"))
+    out = str(tmp_path / "out")
+    engine = CompressionEngine(out, "default", bitrate_table=((0, "200k"),), bufsize="200k")
+    try:
+        assert engine.run([source])[0].status == DONE
+        make_clip(source, 120)
+        [task] = engine.run([source])
+    finally:
+        engine.shutdown()
+    assert task.status == DONE
+    assert probe(task.output)["height"] == 120
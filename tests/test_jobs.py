@@ -0,0 +1,72 @@
+import os
+import time
+
+from ytdl_core.jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING
+from ytdl_core.retry import NETWORK
+
+TIMEOUT = 20
+
+
+def test_submit_runs_to_done(make_queue):
+    updates, files = [], []
+    queue = make_queue(max_workers=2, on_update=lambda job: updates.append(job.status),
+                       on_file=lambda job, info: files.append(info["filepath"]))
+    jobs = queue.submit_many(["https://a.test/ok/1", "https://a.test/ok/2", "https://a.test/ok/3"])
+    assert [job.id for job in jobs] == [1, 2, 3]
+    assert queue.wait(TIMEOUT)
+    assert all(job.status == DONE and job.percent == 100.0 and job.returncode == 0 for job in jobs)
+    assert sorted(os.path.basename(path) for path in files) == ["1.mp4", "2.mp4", "3.mp4"]
+    assert queue.counts() == {DONE: 3}
+    assert queue.overall_percent() == 100.0
+    assert RUNNING in updates and updates[-1] == DONE
+
+def test_failure_without_a_policy(make_queue):
+    queue = make_queue()
+    job = queue.submit("https://a.test/timeout/1")
+    assert queue.wait(TIMEOUT)
+    assert job.status == FAILED and job.returncode == 1
+    assert job.failure == NETWORK
+    assert job.attempts == 1
+
+def test_pool_is_bounded(make_queue, wait_for):
+    queue = make_queue(max_workers=1)
+    first = queue.submit("https://a.test/hang/1")
+    second = queue.submit("https://a.test/ok/2")
+    wait_for(lambda: first.status == RUNNING and first.process is not None)
+    assert second.status == QUEUED
+    queue.set_max_workers(2)
+    wait_for(lambda: second.status == DONE)
+    assert first.status == RUNNING
+
+def test_cancel_queued_and_running(make_queue, wait_for):
+    queue = make_queue(max_workers=1)
+    running = queue.submit("https://a.test/hang/1")
+    queued = queue.submit("https://a.test/ok/2")
+    wait_for(lambda: running.process is not None)
+    assert queue.cancel(queued.id)
+    assert queued.status == CANCELLED
+    start = time.monotonic()
+    assert queue.cancel(running.id)
+    assert queue.wait(TIMEOUT)
+    assert running.status == CANCELLED
+    assert time.monotonic() - start < 10  # The hanging process was killed, not waited out.
+    assert not queue.cancel(running.id)
+    assert not queue.cancel(999)
+
+def test_manual_retry(make_queue):
+    queue = make_queue()
+    job = queue.submit("https://a.test/timeout,ok/1")
+    assert queue.wait(TIMEOUT)
+    assert job.status == FAILED
+    assert queue.retry(job.id)
+    assert queue.wait(TIMEOUT)
+    assert job.status == DONE and job.attempts == 2
+    assert job.failure is None and job.failures == []
+    assert not queue.retry(job.id)  # Only failed or cancelled jobs.
+
+def test_clear_finished(make_queue):
+    queue = make_queue()
+    done = queue.submit("https://a.test/ok/1")
+    assert queue.wait(TIMEOUT)
+    assert queue.clear_finished() == [done.id]
+    assert queue.jobs == {}
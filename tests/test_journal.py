@@ -0,0 +1,44 @@
+import os
+import sqlite3
+
+from ytdl_core.journal import JobJournal
+
+
+def test_own_rows_are_not_unfinished(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.sqlite3"))
+    entry = journal.record("https://a.test/1", {"audio_only": False}, "queued")
+    journal.started(entry, "running", None, "yt_dlp")
+    assert journal.unfinished() == []
+    journal.close()
+
+def test_rows_of_an_earlier_run_with_the_same_pid(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    earlier = JobJournal(path)
+    entry = earlier.record("https://a.test/1", {"audio_only": True}, "queued")
+    earlier.progress(entry, "/out/x.mp4.part", 1024)
+    earlier.close()
+
+    journal = JobJournal(path)
+    [found] = journal.unfinished()
+    assert (found.entry, found.owner, found.url, found.options) == (entry, os.getpid(), "https://a.test/1",
+                                                                    {"audio_only": True})
+    assert found.part_path == "/out/x.mp4.part" and found.downloaded == 1024
+    assert journal.reap_orphans([found]) == 0  # No process was journaled.
+    journal.remove(found.entry)
+    assert journal.unfinished() == []
+    journal.close()
+
+def test_journals_without_sessions_are_upgraded(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE jobs (entry INTEGER PRIMARY KEY AUTOINCREMENT, owner INTEGER NOT NULL, "
+               "url TEXT NOT NULL, options TEXT NOT NULL, status TEXT NOT NULL, pid INTEGER, executable TEXT, "
+               "part_path TEXT, downloaded INTEGER, created REAL NOT NULL, updated REAL NOT NULL)")
+    db.execute("INSERT INTO jobs (owner, url, options, status, created, updated) VALUES (?, ?, '{}', 'queued', 0, 0)",
+               (os.getpid(), "https://a.test/old"))
+    db.commit()
+    db.close()
+    journal = JobJournal(path)
+    journal.record("https://a.test/new", {}, "queued")
+    assert [entry.url for entry in journal.unfinished()] == ["https://a.test/old"]
+    journal.close()
@@ -0,0 +1,85 @@
+import threading
+
+from fake_playlist import NO_ID_EVERY, DUPLICATE_EVERY, GONE_EVERY
+
+from ytdl_core.playlist import PlaylistDetailLoader, iter_flat_playlist
+
+PLAYLIST_SIZE = 500
+
+
+class RecordingCache:
+    """A metadata cache that holds some URLs and notes which threads asked it."""
+
+    def __init__(self, infos=None):
+        self.infos = dict(infos or {})
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            self.threads.add(threading.current_thread())
+            return self.infos.get(url)
+
+    def put(self, url, info):
+        with self._lock:
+            self.infos[url] = info
+
+
+def load(loader, entries):
+    """Requests details for entries; returns the loaded and failed ones once every entry is settled."""
+    loaded, failed = [], []
+    settled = threading.Semaphore(0)
+
+    def on_info(entry):
+        loaded.append(entry)
+        settled.release()
+
+    def on_error(entry):
+        failed.append(entry)
+        settled.release()
+    count = loader.request(entries, on_info, on_error)
+    for _ in range(count):
+        assert settled.acquire(timeout=20), "timed out"
+    return loaded, failed
+
+
+def test_flat_extraction_streams_every_entry(fake_playlist_ytdlp):
+    entries = list(iter_flat_playlist(f"https://list.test/{PLAYLIST_SIZE}", fake_playlist_ytdlp))
+    assert [entry.index for entry in entries] == list(range(1, PLAYLIST_SIZE + 1))
+    assert sum(entry.id is None for entry in entries) == PLAYLIST_SIZE // NO_ID_EVERY
+    assert entries[0].url == "https://list.test/v/1" and entries[0].title == "Video 1"
+
+def test_details_load_for_entries_without_unique_ids(fake_playlist_ytdlp, tmp_path, monkeypatch):
+    log = tmp_path / "extractions.log"
+    monkeypatch.setenv("FAKE_PLAYLIST_LOG", str(log))
+    entries = list(iter_flat_playlist(f"https://list.test/{PLAYLIST_SIZE}", fake_playlist_ytdlp))
+    cache = RecordingCache()
+    loader = PlaylistDetailLoader(fake_playlist_ytdlp, cache, batch_size=25, max_parallel=4)
+    try:
+        loaded, failed = load(loader, entries)
+    finally:
+        loader.shutdown()
+
+    gone = [entry for entry in entries if entry.index % GONE_EVERY == 0]
+    assert sorted(entry.index for entry in failed) == [entry.index for entry in gone]
+    assert len(loaded) == PLAYLIST_SIZE - len(gone)
+    for entry in loaded:
+        assert entry.info["original_url"] == entry.url and entry.info["title"] == entry.title
+    assert [entry.info["id"] for entry in entries if entry.index % DUPLICATE_EVERY == 0] == ["dup"] * 5
+    assert len(cache.infos) == len(loaded)
+    assert sorted(int(n) for n in log.read_text().split()) == [25] * (PLAYLIST_SIZE // 25)
+
+def test_cached_details_are_looked_up_off_the_calling_thread(fake_playlist_ytdlp, tmp_path, monkeypatch):
+    log = tmp_path / "extractions.log"
+    monkeypatch.setenv("FAKE_PLAYLIST_LOG", str(log))
+    entries = list(iter_flat_playlist("https://list.test/40", fake_playlist_ytdlp))
+    cache = RecordingCache({entry.url: {"id": entry.id, "original_url": entry.url} for entry in entries[:30]})
+    loader = PlaylistDetailLoader(fake_playlist_ytdlp, cache, batch_size=8)
+    try:
+        loaded, failed = load(loader, entries)
+        assert loader.request(entries, None) == 0  # Everything is loaded now.
+    finally:
+        loader.shutdown()
+    assert len(loaded) == 40 and not failed
+    assert threading.current_thread() not in cache.threads
+    assert sorted(int(n) for n in log.read_text().split()) == [2, 8]  # Only the ten uncached entries.
@@ -0,0 +1,85 @@
+import json
+
+from ytdl_core.progress import (DOWNLOAD, EMBED_SUBS, EXTRACT_AUDIO, FILE_DONE, MERGE, POSTPROCESS, PROGRESS_MARKER,
+                                ProgressRecord, parse_progress_line, progress_args)
+
+# --- Fixtures: lines as yt-dlp prints them with progress_args() ---
+DOWNLOADING = PROGRESS_MARKER + 'download {"status": "downloading", "downloaded_bytes": 1048576, ' \
+    '"total_bytes": 4194304, "total_bytes_estimate": null, "speed": 524288.0, "eta": 6, ' \
+    '"fragment_index": null, "fragment_count": null, "filename": "Video [abc].f137.mp4"}'
+ESTIMATED = PROGRESS_MARKER + 'download {"status": "downloading", "downloaded_bytes": 512, "total_bytes": null, ' \
+    '"total_bytes_estimate": 2048, "speed": null, "eta": null, "fragment_index": 3, "fragment_count": 12, ' \
+    '"filename": "Live [xyz].mp4"}'
+UNKNOWN_TOTAL = PROGRESS_MARKER + 'download {"status": "downloading", "downloaded_bytes": 512, "total_bytes": null, ' \
+    '"total_bytes_estimate": null, "speed": 100.0, "eta": null, "fragment_index": null, "fragment_count": null, ' \
+    '"filename": "x.mp4"}'
+FINISHED = PROGRESS_MARKER + 'download {"status": "finished", "downloaded_bytes": 4194304, "total_bytes": 4194304, ' \
+    '"filename": "Video [abc].f137.mp4"}'
+MERGING = PROGRESS_MARKER + 'postprocess {"status": "started", "postprocessor": "Merger"}'
+OTHER_PP = PROGRESS_MARKER + 'postprocess {"status": "finished", "postprocessor": "MoveFiles"}'
+FILE = PROGRESS_MARKER + 'file {"id": "abc", "extractor_key": "Youtube", "format_id": "137+140", ' \
+    '"filepath": "/out/Video [abc].mp4", "webpage_url": "https://www.youtube.com/watch?v=abc"}'
+
+
+def test_progress_args_carry_the_templates():
+    args = progress_args()
+    assert args.count("--progress-template") == 2
+    assert "--print" in args and "--no-quiet" in args
+    assert all(PROGRESS_MARKER in arg for arg in args if arg.startswith(("download:", "postprocess:", "after_move:")))
+
+def test_download_tick():
+    record = parse_progress_line(DOWNLOADING)
+    assert record.phase == DOWNLOAD and record.status == "downloading"
+    assert record.structured
+    assert record.percent == 25.0
+    assert record.speed == 524288.0 and record.eta == 6
+    assert record.filename == "Video [abc].f137.mp4"
+    assert record.describe() == "[download]  25.0% of 4.00MiB at 512.00KiB/s ETA 00:06"
+
+def test_download_tick_uses_the_estimate_and_fragments():
+    record = parse_progress_line(ESTIMATED)
+    assert record.total_bytes == 2048
+    assert record.percent == 25.0
+    assert record.describe().endswith("ETA --:-- (frag 3/12)")
+
+def test_download_tick_without_a_total():
+    record = parse_progress_line(UNKNOWN_TOTAL)
+    assert record.percent is None
+    assert record.describe().startswith("[download]   ?.?% of ?")
+
+def test_finished_download_is_complete():
+    assert parse_progress_line(FINISHED).percent == 100.0
+
+def test_postprocess_phases():
+    assert parse_progress_line(MERGING).phase == MERGE
+    assert parse_progress_line(MERGING).percent is None
+    assert parse_progress_line(OTHER_PP).phase == POSTPROCESS
+    assert parse_progress_line(MERGING).describe() == "[merge] started"
+
+def test_file_done():
+    record = parse_progress_line(FILE)
+    assert record.phase == FILE_DONE
+    assert record.filename == "/out/Video [abc].mp4"
+    assert record.info["format_id"] == "137+140"
+
+def test_legacy_lines():
+    record = parse_progress_line("[download]  42.5% of ~  10.00MiB at  1.00MiB/s ETA 00:05")
+    assert record.phase == DOWNLOAD and not record.structured
+    assert record.percent == 42.5 and record.status == "downloading"
+    assert parse_progress_line("[download] 100% of 10.00MiB").status == "finished"
+    assert parse_progress_line('[Merger] Merging formats into "x.mp4"').phase == MERGE
+    assert parse_progress_line("[ExtractAudio] Destination: x.mp3").phase == EXTRACT_AUDIO
+    assert parse_progress_line("[EmbedSubtitle] Embedding subtitles in x.mp4").phase == EMBED_SUBS
+
+def test_other_lines_are_ignored():
+    for line in ("", "[youtube] abc: Downloading webpage", "ERROR: Video unavailable", "plain text",
+                 PROGRESS_MARKER + "download {not json"):
+        assert parse_progress_line(line) is None
+
+def test_dict_round_trip():
+    for line in (DOWNLOADING, ESTIMATED, FINISHED, MERGING, FILE, "[download]  42.5% of 10.00MiB"):
+        record = parse_progress_line(line)
+        data = json.loads(json.dumps(record.to_dict()))
+        again = ProgressRecord.from_dict(data)
+        assert again.to_dict() == record.to_dict()
+        assert again.structured == record.structured
@@ -0,0 +1,206 @@
+import random
+
+import pytest
+
+from ytdl_core.jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING
+from ytdl_core.retry import (DISK_FULL, FORBIDDEN, FRAGMENT, LOGIN_REQUIRED, NETWORK, POSTPROCESS, RATE_LIMITED,
+                             RESUME_FAILED, RETRY_RULES, UNAVAILABLE, UNKNOWN, UNSUPPORTED, HostThrottle, RetryPolicy,
+                             RetryRule, classify_line, host_key, worse_failure)
+
+TIMEOUT = 20
+DELAY_SCALE = 0.01  # The shipped rules' delays, shortened for the queue tests.
+
+
+@pytest.mark.parametrize("line, failure", [
+    ("ERROR: unable to download video data: HTTP Error 429: Too Many Requests", RATE_LIMITED),
+    ("[download] Got error: HTTP Error 429: Too Many Requests. Retrying (1/10)...", RATE_LIMITED),
+    ("ERROR: [youtube] abc: Sign in to confirm you're not a bot", RATE_LIMITED),
+    ("ERROR: [youtube] abc: Sign in to confirm your age", LOGIN_REQUIRED),
+    ("ERROR: unable to download video data: HTTP Error 403: Forbidden", FORBIDDEN),
+    ("ERROR: unable to download video data: HTTP Error 416: Requested Range Not Satisfiable", RESUME_FAILED),
+    ("ERROR: [youtube] abc: Video unavailable", UNAVAILABLE),
+    ("ERROR: [youtube] abc: Private video", UNAVAILABLE),
+    ("ERROR: Unsupported URL: https://example.com/", UNSUPPORTED),
+    ("ERROR: unable to write data: [Errno 28] No space left on device", DISK_FULL),
+    ("ERROR: Postprocessing: Conversion failed!", POSTPROCESS),
+    ("ERROR: fragment 12 not found, unable to continue", FRAGMENT),
+    ("ERROR: [generic] x: Unable to download webpage: <urlopen error timed out>", NETWORK),
+    ("ERROR: unable to download video data: HTTP Error 503: Service Unavailable", NETWORK),
+    ("ERROR: something nobody has seen before", UNKNOWN),
+])
+def test_classify_line(line, failure):
+    assert classify_line(line) == failure
+
+@pytest.mark.parametrize("line", [
+    "", "[download]  42.0% of 10.00MiB", "[youtube] abc: Downloading webpage",
+    "WARNING: fragment 3 not found", "[download] Got error: something odd",
+])
+def test_lines_that_are_not_failures(line):
+    assert classify_line(line) is None
+
+def test_worse_failure_keeps_the_more_telling_class():
+    assert worse_failure(None, NETWORK) == NETWORK
+    assert worse_failure(NETWORK, None) == NETWORK
+    assert worse_failure(NETWORK, RATE_LIMITED) == RATE_LIMITED
+    assert worse_failure(UNKNOWN, FRAGMENT) == FRAGMENT
+    assert worse_failure(DISK_FULL, UNKNOWN) == DISK_FULL
+
+def test_host_key():
+    assert host_key("https://youtu.be/abc") == "youtube.com"
+    assert host_key("https://www.youtube.com/watch?v=abc") == "youtube.com"
+    assert host_key("https://music.youtube.com/watch?v=abc") == "youtube.com"
+    assert host_key("https://VIMEO.com/1") == "vimeo.com"
+
+
+# --- Backoff ---
+def test_backoff_doubles_with_equal_jitter():
+    policy = RetryPolicy(max_retries=10, rules={NETWORK: RetryRule(6, 2.0)}, rng=random.Random(1))
+    history = []
+    for same in range(6):
+        decision = policy.decide(NETWORK, history, "a.test", 1, now=0.0)
+        ceiling = 2.0 * 2 ** same
+        assert ceiling / 2 <= decision.delay <= ceiling
+        assert decision.attempt == same + 1
+        history.append(NETWORK)
+    assert policy.decide(NETWORK, history, "a.test", 1, now=0.0) is None
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(max_retries=10, rules={NETWORK: RetryRule(10, 60.0)}, max_delay=100.0)
+    decision = policy.decide(NETWORK, [NETWORK] * 5, "a.test", 1, now=0.0)
+    assert 50.0 <= decision.delay <= 100.0
+
+def test_jitter_spreads_jobs_that_failed_together():
+    policy = RetryPolicy(rng=random.Random(7))
+    delays = {policy.decide(NETWORK, [], "a.test", 1, now=0.0).delay for _ in range(20)}
+    assert len(delays) == 20
+
+def test_permanent_failures_are_not_retried():
+    policy = RetryPolicy()
+    for failure in (UNAVAILABLE, LOGIN_REQUIRED, DISK_FULL, UNSUPPORTED):
+        assert policy.decide(failure, [], "a.test", 1) is None
+    assert policy.histogram()[UNAVAILABLE] == {"failed": 1, "retried": 0, "recovered": 0, "gave_up": 1}
+
+def test_max_retries_counts_every_class():
+    policy = RetryPolicy(max_retries=2)
+    assert policy.decide(NETWORK, [FRAGMENT, FORBIDDEN], "a.test", 1) is None
+    assert RetryPolicy(max_retries=0).decide(NETWORK, [], "a.test", 1) is None
+
+def test_rule_overrides():
+    policy = RetryPolicy()
+    resume = policy.decide(RESUME_FAILED, [], "a.test", 1)
+    assert resume.overrides == {"resume_partial": False}
+    assert "restarting" in resume.describe()
+    forbidden = policy.decide(FORBIDDEN, [], "a.test", 1)
+    assert forbidden.overrides == {"reuse_metadata": False}
+    assert "resuming" in forbidden.describe()
+
+def test_recovery_is_counted():
+    policy = RetryPolicy()
+    policy.decide(NETWORK, [], "a.test", 1)
+    policy.succeeded([NETWORK], "a.test")
+    policy.succeeded([], "a.test")
+    assert policy.histogram()[NETWORK]["recovered"] == 1
+
+
+# --- Host throttling ---
+def test_rate_limit_halves_and_pauses_the_host():
+    policy = RetryPolicy(rng=random.Random(3))
+    hosts = policy.hosts
+    decision = policy.decide(RATE_LIMITED, [], "a.test", 8, now=100.0)
+    assert hosts.limit("a.test") == 4
+    assert not hosts.admits("a.test", 0, now=100.0)
+    assert hosts.next_resume(now=100.0) == pytest.approx(100.0 + decision.delay)
+    after = 100.0 + decision.delay + 0.001
+    assert hosts.admits("a.test", 3, now=after)
+    assert not hosts.admits("a.test", 4, now=after)
+    assert hosts.admits("b.test", 50, now=100.0)
+
+def test_throttle_recovers_one_step_at_a_time():
+    hosts = HostThrottle(ceiling=4)
+    hosts.rate_limited("a.test", 4, until=0.0)
+    assert hosts.limit("a.test") == 2
+    hosts.succeeded("a.test")
+    assert hosts.limit("a.test") == 2
+    hosts.succeeded("a.test")
+    assert hosts.limit("a.test") == 3
+    for _ in range(3):
+        hosts.succeeded("a.test")
+    assert hosts.limit("a.test") is None
+
+def test_throttle_never_drops_below_one():
+    hosts = HostThrottle()
+    for _ in range(5):
+        hosts.rate_limited("a.test", 1, until=0.0)
+    assert hosts.limit("a.test") == 1
+
+
+# --- Queue ---
+def scaled_policy(scale=DELAY_SCALE):
+    """RETRY_RULES with shorter delays, so queue tests retry the way the shipped policy does."""
+    return RetryPolicy(rules={name: RetryRule(rule.retries, rule.base_delay * scale, rule.throttle_host,
+                                              rule.overrides) for name, rule in RETRY_RULES.items()})
+
+def test_policy_retries_until_done(make_queue, wait_for):
+    policy = RetryPolicy(rules={NETWORK: RetryRule(3, 0.01)})
+    outputs = []
+    queue = make_queue(retry=policy, on_output=lambda job, line: outputs.append(line))
+    job = queue.submit("https://a.test/timeout,timeout,ok/1")
+    wait_for(lambda: job.finished)
+    assert job.status == DONE and job.attempts == 3
+    assert job.failures == [NETWORK, NETWORK]
+    assert sum(line.startswith("[retry] network") for line in outputs) == 2
+    assert policy.histogram()[NETWORK] == {"failed": 2, "retried": 2, "recovered": 1, "gave_up": 0}
+
+def test_policy_gives_up(make_queue, wait_for):
+    policy = RetryPolicy(rules={NETWORK: RetryRule(1, 0.01)})
+    queue = make_queue(retry=policy)
+    job = queue.submit("https://a.test/timeout/1")
+    wait_for(lambda: job.finished)
+    assert job.status == FAILED and job.attempts == 2
+    assert policy.histogram()[NETWORK]["gave_up"] == 1
+
+def test_forbidden_is_retried_with_a_fresh_extraction(make_queue, fake_events):
+    queue = make_queue(retry=scaled_policy())
+    job = queue.submit("https://a.test/403,ok/1")
+    assert queue.wait(TIMEOUT)
+    assert job.status == DONE and job.failures == [FORBIDDEN]
+    starts = [event for event in fake_events() if event["event"] == "start"]
+    assert [(event["reextract"], event["no_continue"]) for event in starts] == [(False, False), (True, False)]
+
+def test_rejected_range_restarts_the_part_file(make_queue, fake_events):
+    outputs = []
+    queue = make_queue(retry=scaled_policy(), on_output=lambda job, line: outputs.append(line))
+    job = queue.submit("https://a.test/416,ok/1")
+    assert queue.wait(TIMEOUT)
+    assert job.status == DONE and job.failures == [RESUME_FAILED]
+    starts = [event for event in fake_events() if event["event"] == "start"]
+    assert [(event["reextract"], event["no_continue"]) for event in starts] == [(False, False), (False, True)]
+    assert any(line.startswith("[retry] resume-failed") and line.endswith("restarting") for line in outputs)
+
+def test_rate_limit_pauses_and_throttles_the_host(make_queue, wait_for, fake_events):
+    # RATE_LIMITED waits 0.5-1s here, long enough to see the pause.
+    policy = scaled_policy(1 / 30)
+    queue = make_queue(max_workers=8, retry=policy)
+    hanging = queue.submit_many([f"https://limited.test/hang/{n}" for n in range(3)])
+    wait_for(lambda: all(job.status == RUNNING and job.process is not None for job in hanging))
+    limited = queue.submit("https://limited.test/429,ok/3")
+    wait_for(lambda: limited.failures == [RATE_LIMITED])
+    assert limited.status == QUEUED
+    # Halved from the four jobs that were running on the host.
+    assert policy.hosts.limit("limited.test") == 2
+
+    # Freeing the slots doesn't end the pause; other hosts are not held up.
+    for job in hanging:
+        queue.cancel(job.id)
+    later = queue.submit("https://limited.test/ok/4")
+    elsewhere = queue.submit("https://other.test/ok/5")
+    assert queue.wait(TIMEOUT)
+    assert [job.status for job in hanging] == [CANCELLED] * 3
+    assert (limited.status, later.status, elsewhere.status) == (DONE, DONE, DONE) and limited.attempts == 2
+
+    events = fake_events()
+    failed_pid = next(event["pid"] for event in events if event.get("outcome") == "429")
+    failed_at = next(event["time"] for event in events if event["event"] == "end" and event["pid"] == failed_pid)
+    starts = {(event["url"], event["attempt"]): event["time"] for event in events if event["event"] == "start"}
+    assert starts[limited.url, 2] - failed_at >= 0.5 and starts[later.url, 1] - failed_at >= 0.5
+    assert starts[elsewhere.url, 1] - failed_at < 0.5
@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import shlex
+import subprocess
+
+import pytest
+
+from ytdl_core import store as store_module
+from ytdl_core.store import OutputStore, LINK_HARD, LINK_SYMLINK, LINK_COPY, object_name, main
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def file_info(path, video_id="abc", format_id="22"):
+    return {"filepath": str(path), "id": video_id, "extractor_key": "Youtube", "format_id": format_id}
+
+@pytest.fixture
+def store(tmp_path):
+    store = OutputStore(str(tmp_path / "store"))
+    yield store
+    store.close()
+
+
+def test_ingest_then_link_into_another_folder(tmp_path, store):
+    path = write(tmp_path / "out" / "a.mp4", b"video bytes" * 100)
+    assert store.ingest(file_info(path), {}) == LINK_HARD
+    stored = store.object_path(object_name("Youtube", "abc", "22", "", "mp4"))
+    assert os.path.samefile(path, stored) and read(path) == b"video bytes" * 100
+
+    target = str(tmp_path / "other" / "a.mp4")
+    assert store.link_existing("Youtube", "abc", "22", "", target) == LINK_HARD
+    assert os.path.samefile(target, stored)
+    assert store.link_existing("Youtube", "abc", "22", "", target) is None  # Already there.
+    assert store.link_existing("Youtube", "abc", "137", "", str(tmp_path / "x.mp4")) is None  # Not stored.
+
+    # yt-dlp then reports the linked file as finished; nothing moves.
+    assert store.holds(file_info(target), {})
+    assert store.ingest(file_info(target), {}) == LINK_HARD
+    stats = store.stats()
+    assert (stats["objects"], stats["links"], stats["ingested"], stats["reused"]) == (1, {LINK_HARD: 2}, 1, 1)
+
+def test_audio_links_under_the_final_extension(tmp_path, store):
+    path = write(tmp_path / "out" / "a.mp3", b"audio")
+    options = {"audio_only": True}
+    store.ingest(file_info(path), options)
+    variant = store_module.store_variant(options)
+    target = str(tmp_path / "other" / "a.webm")
+    assert store.link_existing("Youtube", "abc", "22", variant, target, final_ext="mp3") == LINK_HARD
+    assert read(tmp_path / "other" / "a.mp3") == b"audio" and not os.path.exists(target)
+
+def test_identical_bytes_share_one_copy(tmp_path, store):
+    data = os.urandom(4096)
+    first = write(tmp_path / "out" / "first.mp4", data)
+    second = write(tmp_path / "out" / "second.mp4", data)
+    store.ingest(file_info(first, "one"), {})
+    assert store.ingest(file_info(second, "two"), {}) == LINK_HARD
+    assert os.path.samefile(first, second)
+    assert os.path.samefile(store.object_path(object_name("Youtube", "one", "22", "", "mp4")),
+                            store.object_path(object_name("Youtube", "two", "22", "", "mp4")))
+    stats = store.stats()
+    assert (stats["objects"], stats["deduplicated"], stats["saved_bytes"]) == (2, 1, len(data))
+
+def test_downloading_stored_bytes_again_relinks_them(tmp_path, store):
+    first = write(tmp_path / "out" / "a.mp4", b"same")
+    store.ingest(file_info(first), {})
+    again = write(tmp_path / "again" / "a.mp4", b"same")
+    assert store.ingest(file_info(again), {}) == LINK_HARD
+    assert os.path.samefile(first, again) and store.stats()["deduplicated"] == 1
+
+def refuse(*args):
+    raise OSError("not supported here")
+
+@pytest.mark.parametrize("failing, expected", [
+    (("link", "reflink"), LINK_SYMLINK),
+    (("link", "reflink", "symlink"), LINK_COPY),
+])
+def test_links_fall_back_when_the_filesystem_refuses(tmp_path, store, monkeypatch, failing, expected):
+    if "link" in failing:
+        monkeypatch.setattr(os, "link", refuse)
+    if "reflink" in failing:
+        monkeypatch.setattr(store_module, "reflink", refuse)
+    if "symlink" in failing:
+        monkeypatch.setattr(os, "symlink", refuse)
+    path = write(tmp_path / "out" / "a.mp4", b"data")
+    assert store.ingest(file_info(path), {}) == expected
+    assert os.path.islink(path) == (expected == LINK_SYMLINK) and read(path) == b"data"
+    target = str(tmp_path / "other" / "a.mp4")
+    assert store.link_existing("Youtube", "abc", "22", "", target) == expected
+    assert read(target) == b"data"
+    assert not [name for name in os.listdir(tmp_path / "other") if name.endswith(".tmp")]
+
+def test_gc_deletes_only_unreferenced_objects(tmp_path, store, capsys):
+    kept = write(tmp_path / "out" / "kept.mp4", b"kept")
+    dropped = write(tmp_path / "out" / "dropped.mp4", b"dropped!")
+    replaced = write(tmp_path / "out" / "replaced.mp4", b"replaced")
+    for path, video_id in ((kept, "kept"), (dropped, "dropped"), (replaced, "replaced")):
+        store.ingest(file_info(path, video_id), {})
+    os.remove(dropped)
+    os.remove(replaced)
+    write(replaced, b"a different file")
+    objects = sorted(os.listdir(store.objects_dir))
+
+    assert main(["--store", store.root, "gc", "--dry-run"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert (report["dead_links"], report["objects_removed"], report["objects_kept"]) == (2, 2, 1)
+    assert report["freed_bytes"] == len(b"dropped!") + len(b"replaced") and report["dry_run"]
+    assert sorted(os.listdir(store.objects_dir)) == objects
+    assert store.stats()["objects"] == 3
+
+    result = store.gc()
+    assert (result["dead_links"], result["objects_removed"], result["objects_kept"]) == (2, 2, 1)
+    assert os.listdir(store.objects_dir) == [object_name("Youtube", "kept", "22", "", "mp4")]
+    assert read(kept) == b"kept" and read(replaced) == b"a different file"
+    assert store.stats()["links"] == {LINK_HARD: 1}
+    assert store.gc()["objects_removed"] == 0
+
+def test_gc_keeps_bytes_a_twin_still_uses(tmp_path, store):
+    first = write(tmp_path / "out" / "first.mp4", b"twin")
+    second = write(tmp_path / "out" / "second.mp4", b"twin")
+    store.ingest(file_info(first, "one"), {})
+    store.ingest(file_info(second, "two"), {})
+    os.remove(first)
+    os.remove(second)
+    write(second, b"twin")  # A copy the user made, no longer a link.
+    result = store.gc()
+    assert result["objects_removed"] == 2 and result["freed_bytes"] == len(b"twin")
+
+def expand_template(command, fields):
+    """What yt-dlp does to an --exec command: '%(field)q' becomes the quoted value and '%%' a single '%'."""
+    return re.sub(r"%%|%\((\w+)\)q", lambda m: shlex.quote(fields[m[1]]) if m[1] else "%", command)
+
+@pytest.mark.skipif(os.name == "nt", reason="the hook is run through a POSIX shell here")
+def test_hook_command_runs_from_any_folder(tmp_path):
+    # A '%' in the store path must survive yt-dlp's template expansion.
+    store = OutputStore(str(tmp_path / "100% store"))
+    path = write(tmp_path / "out" / "a.mp4", b"video")
+    store.ingest(file_info(path), {})
+    hook = store.hook_command({})
+    assert hook.startswith("before_dl:") and "100%% store" in hook
+
+    target = str(tmp_path / "other dir" / "it's.mp4")
+    command = expand_template(hook[len("before_dl:"):], {"extractor_key": "Youtube", "id": "abc",
+                                                         "format_id": "22", "_filename": target})
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+    elsewhere = tmp_path / "cwd"
+    elsewhere.mkdir()
+    result = subprocess.run(command, shell=True, cwd=str(elsewhere), env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.startswith(f"[store] Linked stored copy ({LINK_HARD})")
+    assert os.path.samefile(target, path)
+    assert store.stats()["links"] == {LINK_HARD: 2}
+    store.close()
+
+def test_hook_never_fails_the_download(tmp_path, capsys):
+    missing = str(tmp_path / "store")
+    assert main(["--store", missing, "link", "Youtube", "abc", "22", str(tmp_path / "a.mp4")]) == 0
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,154 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ytdl_core.thumbnails import ConnectionPoolFetcher, DiskCache, MemoryCache, ThumbnailLoader, pick_thumbnail
+
+TIMEOUT = 10
+IMAGE = b"\xff\xd8 not really a jpeg " * 64
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so connection reuse can be observed.
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path.startswith("/redirect"):
+            self.send_response(302)
+            self.send_header("Location", "/img/redirected")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path.startswith("/img/"):
+            self.server.release.wait(TIMEOUT)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(self.server.image)))
+            self.end_headers()
+            self.wfile.write(self.server.image)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.image = IMAGE
+    httpd.release = threading.Event()  # Cleared to hold image responses back.
+    httpd.release.set()
+    httpd.requests = []
+    httpd.connections = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_pick_thumbnail():
+    info = {"thumbnail": "default.jpg", "thumbnails": [
+        {"url": "small.jpg", "width": 120}, {"url": "mid.jpg", "width": 320}, {"url": "big.jpg", "width": 1280}]}
+    assert pick_thumbnail(info) == "mid.jpg"
+    assert pick_thumbnail(info, width=2000) == "default.jpg"
+    assert pick_thumbnail({"thumbnails": [{"url": "small.jpg", "width": 120}]}) == "small.jpg"
+    assert pick_thumbnail({}) is None
+
+def test_fetcher_reuses_the_connection(server):
+    fetcher = ConnectionPoolFetcher()
+    for n in range(5):
+        assert fetcher.fetch(f"{server.url}/img/{n}?size=small") == IMAGE
+    assert server.connections == 1
+    assert server.requests[-1] == "/img/4?size=small"
+
+def test_fetcher_follows_redirects_and_reports_errors(server):
+    fetcher = ConnectionPoolFetcher()
+    assert fetcher.fetch(f"{server.url}/redirect") == IMAGE
+    assert server.requests == ["/redirect", "/img/redirected"]
+    with pytest.raises(OSError, match="HTTP 404"):
+        fetcher.fetch(f"{server.url}/missing")
+
+def test_preload_fills_the_disk_cache(server, tmp_path):
+    loader = ThumbnailLoader(str(tmp_path))
+    try:
+        url = f"{server.url}/img/a"
+        server.release.clear()
+        future = loader._raw("key-a", url)
+        assert loader._raw("key-a", url) is future  # In-flight fetches are shared.
+        server.release.set()
+        assert future.result(TIMEOUT) == IMAGE
+        assert loader.preload([("b", f"{server.url}/img/b"), ("c", None)]) == 1
+        loader._fetch_pool.shutdown(wait=True)
+    finally:
+        loader.shutdown()
+    assert loader.hits["network"] == 2
+    assert len(server.requests) == 2
+
+    again = ThumbnailLoader(str(tmp_path))
+    try:
+        assert again._raw("key-a", url).result(TIMEOUT) == IMAGE
+    finally:
+        again.shutdown()
+    assert again.hits == {"memory": 0, "disk": 1, "network": 0}
+    assert len(server.requests) == 2
+
+def test_request_reports_fetch_errors(server, tmp_path):
+    loader = ThumbnailLoader(str(tmp_path))
+    errors = []
+    done = threading.Event()
+    try:
+        loader.request("x", f"{server.url}/missing", callback=lambda image: done.set(),
+                       on_error=lambda e: (errors.append(e), done.set()))
+        assert done.wait(TIMEOUT)
+    finally:
+        loader.shutdown()
+    assert isinstance(errors[0], OSError)
+
+def test_request_decodes_and_keeps_the_image_in_memory(server, tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    from io import BytesIO
+    buffer = BytesIO()
+    Image.new("RGB", (640, 360), "red").save(buffer, "JPEG")
+    server.image = buffer.getvalue()
+    loader = ThumbnailLoader(str(tmp_path), size=(160, 90))
+    images = []
+    done = threading.Event()
+    try:
+        loader.request("x", f"{server.url}/img/x", callback=lambda image: (images.append(image), done.set()))
+        assert done.wait(TIMEOUT)
+        loader.request("x", f"{server.url}/img/x", callback=images.append)
+    finally:
+        loader.shutdown()
+    assert images[0].size == (160, 90)
+    assert images[1] is images[0]
+    assert loader.hits["memory"] == 1
+
+
+# --- Caches ---
+def test_disk_cache_evicts_oldest_first(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    for n in range(5):
+        cache.put(f"k{n}", bytes(300))
+        os.utime(tmp_path / f"k{n}.img", (n, n))
+    assert cache.get("k0") is None
+    assert cache.get("k4") == bytes(300)
+    assert sum(f.stat().st_size for f in tmp_path.iterdir()) <= 1000
+    assert DiskCache(str(tmp_path), max_bytes=1000)._size == cache._size
+
+def test_memory_cache_is_lru():
+    cache = MemoryCache(max_items=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
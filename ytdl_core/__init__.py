@@ -0,0 +1,5 @@
+"""Tk-free download core shared by the GUI front ends."""
+
+from .jobs import Job, JobQueue, parse_url_list
+
+__all__ = ["Job", "JobQueue", "parse_url_list"]
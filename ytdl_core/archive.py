@@ -0,0 +1,144 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+
+from .metadata_cache import canonical_video_id
+
+# --- Constants ---
+ARCHIVE_DB = "download-archive.sqlite3"
+SAMPLE_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    key       TEXT PRIMARY KEY,
+    extractor TEXT NOT NULL,
+    video_id  TEXT NOT NULL,
+    format_id TEXT,
+    path      TEXT,
+    size      INTEGER,
+    checksum  TEXT,
+    completed REAL NOT NULL
+);
+"""
+
+
+# --- Helper Functions ---
+def archive_key(extractor, video_id):
+    """Returns the key yt-dlp's --download-archive uses: '<extractor> <id>'."""
+    return f"{extractor.lower()} {video_id}"
+
+def archive_key_for_url(url):
+    """Returns the archive key for a URL whose ID is known without extraction, else None."""
+    key = canonical_video_id(url)
+    if key.startswith("youtube:"):
+        return archive_key("youtube", key[len("youtube:"):])
+    return None
+
+def sample_checksum(path, sample_size=SAMPLE_SIZE):
+    """Cheap content fingerprint: SHA-256 over the size and three sampled chunks.
+
+    Hashing a multi-GB file in full would hold up the worker slot; the
+    sampled digest still catches truncated or replaced files.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode("ascii"))
+    with open(path, "rb") as f:
+        for offset in (0, max(0, size // 2 - sample_size // 2), max(0, size - sample_size)):
+            f.seek(offset)
+            digest.update(f.read(sample_size))
+    return "sample-sha256:" + digest.hexdigest()
+
+
+# --- Archive ---
+class DownloadArchive:
+    """Persistent index of completed downloads with O(1) membership checks.
+
+    Rows live in SQLite; the keys are also held in a set so the queue can
+    check thousands of URLs without touching the disk.
+    """
+
+    def __init__(self, path=ARCHIVE_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._keys = {row[0] for row in self._db.execute("SELECT key FROM downloads")}
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def contains_url(self, url):
+        key = archive_key_for_url(url)
+        return key is not None and key in self._keys
+
+    def add(self, extractor, video_id, format_id=None, path=None, size=None, checksum=None):
+        key = archive_key(extractor, video_id)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             (key, extractor.lower(), video_id, format_id, path, size, checksum, time.time()))
+            self._db.commit()
+            self._keys.add(key)
+        return key
+
+    def record_file(self, info):
+        """Records a finished file from a FILE_DONE progress record's info dict."""
+        path = info.get("filepath")
+        size = checksum = None
+        if path and os.path.isfile(path):
+            size = os.path.getsize(path)
+            checksum = sample_checksum(path)
+        return self.add(info.get("extractor_key") or "generic", info["id"], info.get("format_id"), path, size,
+                        checksum)
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT extractor, video_id, format_id, path, size, checksum, completed "
+                                   "FROM downloads WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("extractor", "video_id", "format_id", "path", "size", "checksum", "completed"), row))
+
+    def remove(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM downloads WHERE key = ?", (key,))
+            self._db.commit()
+            self._keys.discard(key)
+
+    # --- yt-dlp --download-archive interop ---
+    def import_ytdlp(self, path):
+        """Adds every '<extractor> <id>' line of a yt-dlp archive file; returns the new count."""
+        now = time.time()
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 2:
+                    continue
+                key = archive_key(*parts)
+                if key not in self._keys:
+                    rows.append((key, parts[0].lower(), parts[1], now))
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO downloads (key, extractor, video_id, completed) "
+                                 "VALUES (?, ?, ?, ?)", rows)
+            self._db.commit()
+            self._keys.update(row[0] for row in rows)
+        return len(rows)
+
+    def export_ytdlp(self, path):
+        """Writes all keys as a yt-dlp archive file; returns the number written."""
+        with self._lock:
+            keys = sorted(self._keys)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(key + "\n" for key in keys)
+        os.replace(tmp_path, path)
+        return len(keys)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,200 @@
+import re
+import time
+import threading
+
+# --- Constants ---
+# Fragment connections shared out while a rate limit is in force and no budget of its own was set.
+FRAGMENT_BUDGET = 16
+MAX_FRAGMENTS_PER_JOB = 8
+RATE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+RATE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMG]?)(?:i?B)?(?:/s)?\s*$', re.IGNORECASE)
+WINDOW_RE = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*=\s*(.+?)\s*$')
+UNLIMITED = ("", "0", "none", "off", "unlimited")
+
+
+# --- Helper Functions ---
+def parse_rate(text):
+    """Parses '4M', '512K', '1.5MiB/s' or a plain byte count into bytes/s; empty, '0' or 'none' mean no limit."""
+    if text is None or str(text).strip().lower() in UNLIMITED:
+        return None
+    m = RATE_RE.match(str(text))
+    if not m:
+        raise ValueError(f"Invalid rate: {text!r} (expected e.g. 500K or 4M)")
+    return int(float(m.group(1)) * RATE_UNITS[m.group(2).upper()])
+
+def parse_schedule(text):
+    """Parses 'HH:MM-HH:MM=RATE' windows separated by commas, e.g. '09:00-17:00=1M,17:00-09:00=none'.
+
+    Windows may wrap past midnight. Returns a list of (start_minute, end_minute, rate).
+    """
+    windows = []
+    for part in (text or "").split(","):
+        if not part.strip():
+            continue
+        m = WINDOW_RE.match(part)
+        if not m:
+            raise ValueError(f"Invalid schedule window: {part.strip()!r} (expected HH:MM-HH:MM=RATE)")
+        h1, m1, h2, m2 = (int(g) for g in m.groups()[:4])
+        if m1 > 59 or m2 > 59 or h1 * 60 + m1 >= 24 * 60 or h2 * 60 + m2 > 24 * 60:
+            raise ValueError(f"Invalid time in schedule window: {part.strip()!r}")
+        windows.append((h1 * 60 + m1, h2 * 60 + m2, parse_rate(m.group(5))))
+    return windows
+
+def in_window(minute, start, end):
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+def next_window_change(schedule, now=None):
+    """Seconds from ``now`` (a time.time() value) to the next start or end of a schedule window, or None."""
+    if not schedule:
+        return None
+    local = time.localtime(now)
+    minute = local.tm_hour * 60 + local.tm_min
+    boundaries = {start for start, _, _ in schedule} | {end % (24 * 60) for _, end, _ in schedule}
+    minutes = min((boundary - minute) % (24 * 60) or 24 * 60 for boundary in boundaries)
+    return minutes * 60 - local.tm_sec
+
+
+# --- Scheduler ---
+class BandwidthScheduler:
+    """Shares one download budget, and a pool of fragment connections, between running jobs.
+
+    Every running job holds an allotment. All of them are recalculated
+    whenever a job starts or finishes, the budget is changed, or a
+    ``schedule`` window opens or closes: the budget is split evenly, and
+    what a job's own ``cap`` leaves unused goes to the others, so the
+    rates never add up to more than the budget. ``budget`` is in bytes/s
+    (None for no limit); the first matching schedule window overrides it.
+    Fragment connections are only shared out when ``fragment_budget`` is
+    set or a rate limit applies; otherwise jobs keep yt-dlp's single
+    connection. Every job gets at least one.
+
+    ``watch(callback)`` registers ``callback(job_ids)``, called with the
+    running jobs whose allotment changed under them. It is called without
+    the scheduler's lock held, from whichever thread caused the change
+    (the window timer's for schedule changes); ask ``allotment()`` for the
+    current values.
+    """
+
+    def __init__(self, budget=None, schedule=None, fragment_budget=None):
+        self.budget = budget
+        self.schedule = list(schedule or ())
+        self.fragment_budget = fragment_budget
+        self._caps = {}
+        self._allotments = {}
+        self._watchers = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def watch(self, callback):
+        self._watchers.append(callback)
+
+    def set_budget(self, budget, schedule=None):
+        with self._lock:
+            self.budget = budget
+            if schedule is not None:
+                self.schedule = list(schedule)
+            changed = self._rebalance()
+        self._notify(changed)
+
+    def budget_now(self, now=None):
+        """The budget in force at ``now`` (a time.time() value), in bytes/s or None."""
+        local = time.localtime(now)
+        minute = local.tm_hour * 60 + local.tm_min
+        for start, end, rate in self.schedule:
+            if in_window(minute, start, end):
+                return rate
+        return self.budget
+
+    def allot(self, caps, now=None):
+        """Adds starting jobs and returns {job_id: (rate, fragments)} for them; either is None when not limited.
+
+        ``caps`` maps each starting job to its own limit from its options
+        (or None). Starting a batch in one call shares the budget between
+        all of it at once, rather than changing the running jobs' shares
+        once per job.
+        """
+        with self._lock:
+            self._caps.update(caps)
+            changed = self._rebalance(now)
+            allotments = {job_id: self._allotments[job_id] for job_id in caps}
+        self._notify(changed - set(caps))
+        return allotments
+
+    def release(self, job_id):
+        with self._lock:
+            if self._caps.pop(job_id, False) is False:
+                return
+            changed = self._rebalance()
+        self._notify(changed)
+
+    def allotment(self, job_id):
+        """Returns (rate, fragments) for a running job, or None."""
+        with self._lock:
+            return self._allotments.get(job_id)
+
+    def throughput(self, jobs):
+        """Returns (achieved, allotted) bytes/s over running jobs; allotted is None if any job is unlimited."""
+        achieved = 0.0
+        allotted = 0
+        with self._lock:
+            for job in jobs:
+                allotment = self._allotments.get(job.id)
+                if allotment is None:
+                    continue
+                if job.progress is not None and job.progress.speed:
+                    achieved += job.progress.speed
+                if allotted is not None:
+                    allotted = None if allotment[0] is None else allotted + allotment[0]
+        return achieved, allotted
+
+    def _rebalance(self, now=None):
+        """Recomputes every allotment and returns the ids whose allotment changed. Caller holds the lock."""
+        budget = self.budget_now(now)
+        rates = {}
+        left = budget
+        # Jobs capped below an even share are served first; what they leave goes to the rest.
+        order = sorted(self._caps, key=lambda job_id: (self._caps[job_id] is None, self._caps[job_id] or 0))
+        for done, job_id in enumerate(order):
+            cap = self._caps[job_id]
+            if budget is None:
+                rates[job_id] = cap
+                continue
+            share = left // (len(order) - done)
+            rates[job_id] = max(1, share if cap is None else min(cap, share))
+            left -= rates[job_id]
+        pool = self.fragment_budget
+        if pool is None and any(rate is not None for rate in rates.values()):
+            pool = FRAGMENT_BUDGET
+        fragments = None
+        if pool is not None and rates:
+            fragments = max(1, min(MAX_FRAGMENTS_PER_JOB, pool // len(rates)))
+        allotments = {job_id: (rate, fragments) for job_id, rate in rates.items()}
+        changed = {job_id for job_id, allotment in allotments.items() if self._allotments.get(job_id) != allotment}
+        self._allotments = allotments
+        self._arm_timer()
+        return changed
+
+    def _arm_timer(self):
+        """Rebalances again when the next schedule window opens or closes, while jobs are running."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        delay = next_window_change(self.schedule) if self._caps else None
+        if delay is not None:
+            self._timer = threading.Timer(delay, self._window_changed)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _window_changed(self):
+        with self._lock:
+            self._timer = None
+            changed = self._rebalance()
+        self._notify(changed)
+
+    def _notify(self, job_ids):
+        if job_ids:
+            for callback in list(self._watchers):
+                callback(job_ids)
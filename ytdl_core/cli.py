@@ -0,0 +1,300 @@
+"""Headless batch downloader sharing the GUI's command builder.
+
+    python -m ytdl_core -a urls.txt -o downloads -j 4 --max-res 720p
+
+Progress is printed to stdout as JSON lines; per-job yt-dlp output goes to
+streaming log files under LOGS_DIR. Tk and Pillow are never imported.
+"""
+import sys
+import json
+import time
+import shutil
+import argparse
+import threading
+
+from .archive import ARCHIVE_DB, DownloadArchive
+from .bandwidth import FRAGMENT_BUDGET, BandwidthScheduler, parse_rate, parse_schedule
+from .commands import (YTDLP_EXECUTABLE, CACHE_DIR, DEFAULT_TEMPLATE, MAX_RES_CHOICES, SUBTITLE_LANGS, build_command,
+                       make_options)
+from .engine import ENGINE_CHOICES, ENGINE_LIBRARY, ENGINE_SUBPROCESS, LibraryEngine, resolve_engine
+from .jobs import JobQueue, parse_url_list, QUEUED, DONE, FAILED, CANCELLED, SKIPPED, FINISHED_STATES
+from .journal import JOURNAL_DB, JobJournal
+from .logs import LOGS_DIR, open_job_log
+from .metadata_cache import MetadataCache
+from .pipeline import CompressStage, SidecarStage
+from .progress import parse_progress_line
+from .retry import DEFAULT_RETRIES, RetryPolicy
+from .sidecars import DEFAULT_SIDECAR_WORKERS
+from .store import STORE_DIR, OutputStore
+from .timeline import write_timeline
+
+# --- Exit Codes ---
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_MISSING_TOOL = 3
+EXIT_INTERRUPTED = 130
+
+
+class JsonLinesReporter:
+    """Prints job events as JSON lines and streams job output to log files."""
+
+    def __init__(self, stream=sys.stdout, progress_interval=0.25, verbose=False, logs_dir=LOGS_DIR, bandwidth=None):
+        self.stream = stream
+        self.bandwidth = bandwidth
+        self.progress_interval = progress_interval
+        self.verbose = verbose
+        self.logs_dir = logs_dir
+        self._last_status = {}
+        self._last_progress = {}
+        self._logs = {}
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        record = {"event": event, "time": round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def on_update(self, job):
+        if self._last_status.get(job.id) != job.status:
+            self._last_status[job.id] = job.status
+            if job.finished and job.id in self._logs:
+                self._logs.pop(job.id).close()
+            failure = {"failure": job.failure} if job.failure and job.status != DONE else {}
+            if job.status == QUEUED and job.retry_at:
+                failure["retry_in"] = round(max(0.0, job.retry_at - time.monotonic()), 3)
+            self.emit("status", job=job.id, url=job.url, status=job.status, returncode=job.returncode,
+                      attempt=job.attempts, **failure)
+            # A retried attempt's timeline is written too; the next attempt starts a new one.
+            if job.timeline is not None and (job.finished or job.status == QUEUED and job.retry_at):
+                path = write_timeline(job.timeline, self.logs_dir)
+                self.emit("timing", job=job.id, timeline=path, **job.timeline.summary())
+            return
+        now = time.monotonic()
+        if job.progress is None or now - self._last_progress.get(job.id, 0.0) < self.progress_interval:
+            return
+        self._last_progress[job.id] = now
+        allotment = self.bandwidth.allotment(job.id) if self.bandwidth is not None else None
+        self.emit("progress", job=job.id, rate_limit=allotment[0] if allotment else None, **job.progress.to_dict())
+
+    def on_compress_update(self, task):
+        if task.status == "encoding":
+            now = time.monotonic()
+            if now - self._last_progress.get(task.source, 0.0) < self.progress_interval:
+                return
+            self._last_progress[task.source] = now
+        self.emit("compress", source=task.source, output=task.output, status=task.status, percent=task.percent,
+                  fps=task.fps, speed=task.speed, bitrate=task.bitrate, error=task.error)
+
+    def on_output(self, job, line):
+        job_log = self._logs.get(job.id)
+        if job_log is None:
+            job_log = self._logs[job.id] = open_job_log(job.id, self.logs_dir)
+        job_log.write_line(line)
+        if self.verbose:
+            self.emit("output", job=job.id, line=line)
+
+    def close(self):
+        for job_log in self._logs.values():
+            job_log.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m ytdl_core", description=__doc__.splitlines()[0])
+    parser.add_argument("urls", nargs="*", help="video or playlist URLs")
+    parser.add_argument("-a", "--batch-file", help="file with one URL per line ('-' for stdin)")
+    parser.add_argument("-o", "--output-dir", default=".", help="output folder (default: current folder)")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="parallel yt-dlp processes (default: 2)")
+    parser.add_argument("--playlist", action="store_true", help="download whole playlists")
+    parser.add_argument("--audio-only", action="store_true", help="extract audio as mp3")
+    parser.add_argument("--subtitles", action="store_true", help="download subtitles (see --sub-langs)")
+    parser.add_argument("--sub-langs", default=SUBTITLE_LANGS,
+                        help=f"comma-separated subtitle languages (default: {SUBTITLE_LANGS})")
+    parser.add_argument("--embed-subs", action="store_true", help="embed downloaded subtitles")
+    parser.add_argument("--thumbnail", action="store_true", help="save the thumbnail as a jpg next to the video")
+    parser.add_argument("--embed-thumbnail", action="store_true", help="also embed the thumbnail as cover art")
+    parser.add_argument("--info-json", action="store_true", help="save yt-dlp's info JSON next to the video")
+    parser.add_argument("--sidecars", action="store_true",
+                        help="fetch subtitles, thumbnails and info JSON in parallel with the media and embed them "
+                             "afterwards, cached by video ID")
+    parser.add_argument("--sidecar-jobs", type=int, default=DEFAULT_SIDECAR_WORKERS,
+                        help=f"concurrent sidecar fetches shared by all jobs (default: {DEFAULT_SIDECAR_WORKERS})")
+    parser.add_argument("--max-res", choices=MAX_RES_CHOICES, default="none", help="maximum video height")
+    parser.add_argument("-f", "--format", dest="format_id", help="explicit yt-dlp format code")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="filename template")
+    parser.add_argument("--compress", choices=("cpu", "gpu"), help="compress each file as soon as it is downloaded")
+    parser.add_argument("--compress-jobs", type=int, help="concurrent encodes (default: from core count)")
+    parser.add_argument("--compress-queue", type=int, help="files that may wait for an encoder before "
+                                                           "downloads pause (default: 2 per encoder)")
+    parser.add_argument("--limit-rate", metavar="RATE", help="total download budget shared by all jobs, e.g. 4M")
+    parser.add_argument("--job-limit-rate", metavar="RATE", help="cap for any single job, e.g. 1M")
+    parser.add_argument("--schedule", metavar="WINDOWS",
+                        help="time-of-day budgets overriding --limit-rate, e.g. 09:00-17:00=1M,17:00-09:00=none")
+    parser.add_argument("--fragments", type=int,
+                        help=f"fragment connections shared by all jobs (default: yt-dlp's one per job, or "
+                             f"{FRAGMENT_BUDGET} shared while a rate limit applies)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help="retries per job after rate limiting, network, fragment or merge failures, with "
+                             f"backoff (default: {DEFAULT_RETRIES}; 0 disables)")
+    parser.add_argument("--engine", choices=ENGINE_CHOICES, default=ENGINE_SUBPROCESS,
+                        help="run yt-dlp as a process per URL, or in-process from the yt_dlp package "
+                             "('auto' prefers the package; default: subprocess)")
+    parser.add_argument("--no-cache", action="store_true", help="don't reuse cached extractor JSON")
+    parser.add_argument("--archive", default=ARCHIVE_DB, help=f"download archive database (default: {ARCHIVE_DB})")
+    parser.add_argument("--no-archive", action="store_true", help="download even if already in the archive")
+    parser.add_argument("--store", action="store_true",
+                        help="keep one copy per video and format in the store and hardlink (or symlink) it into "
+                             "place; archived videos are linked instead of skipped")
+    parser.add_argument("--store-dir", default=STORE_DIR, help=f"store folder (default: {STORE_DIR})")
+    parser.add_argument("--archive-import", metavar="FILE", help="merge a yt-dlp --download-archive file first")
+    parser.add_argument("--archive-export", metavar="FILE", help="write the archive as a yt-dlp archive file and exit")
+    parser.add_argument("--journal", default=JOURNAL_DB, help=f"job journal database (default: {JOURNAL_DB})")
+    parser.add_argument("--no-journal", action="store_true", help="don't journal jobs for resuming")
+    parser.add_argument("--resume", action="store_true", help="resume jobs left unfinished by an earlier run")
+    parser.add_argument("--progress-interval", type=float, default=0.25,
+                        help="minimum seconds between progress events per job")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also print yt-dlp output as JSON lines")
+    return parser
+
+def read_urls(args):
+    urls = list(args.urls)
+    if args.batch_file == "-":
+        urls.extend(parse_url_list(sys.stdin.read()))
+    elif args.batch_file:
+        with open(args.batch_file, encoding="utf-8") as f:
+            urls.extend(parse_url_list(f.read()))
+    return urls
+
+def open_archive(args):
+    """Opens the download archive and merges --archive-import into it; None with --no-archive."""
+    if args.no_archive:
+        return None
+    archive = DownloadArchive(args.archive)
+    if args.archive_import:
+        added = archive.import_ytdlp(args.archive_import)
+        print(json.dumps({"event": "archive-import", "added": added, "total": len(archive)}), flush=True)
+    return archive
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.archive_export and not args.no_archive:
+        archive = open_archive(args)
+        written = archive.export_ytdlp(args.archive_export)
+        print(json.dumps({"event": "archive-export", "written": written}), flush=True)
+        archive.close()
+        return EXIT_OK
+    try:
+        urls = read_urls(args)
+    except OSError as e:
+        parser.error(f"cannot read batch file: {e}")
+    if not urls and not args.resume:
+        if args.archive_import:
+            archive = open_archive(args)
+            if archive is not None:
+                archive.close()
+            return EXIT_OK
+        parser.error("no URLs given")
+
+    try:
+        bandwidth = BandwidthScheduler(parse_rate(args.limit_rate), parse_schedule(args.schedule),
+                                       fragment_budget=max(1, args.fragments) if args.fragments else None)
+        job_rate = parse_rate(args.job_limit_rate)
+        engine_mode = resolve_engine(args.engine)
+    except ValueError as e:
+        parser.error(str(e))
+    reporter = JsonLinesReporter(progress_interval=args.progress_interval, verbose=args.verbose, bandwidth=bandwidth)
+    if engine_mode == ENGINE_SUBPROCESS and not shutil.which(YTDLP_EXECUTABLE):
+        reporter.emit("error", message=f"{YTDLP_EXECUTABLE} not found in PATH.")
+        return EXIT_MISSING_TOOL
+
+    # The SQLite files are only created once the arguments are known to be usable.
+    archive = open_archive(args)
+    options = make_options(output_dir=args.output_dir, playlist=args.playlist, audio_only=args.audio_only,
+                           subtitles=args.subtitles, embed_subtitles=args.embed_subs, subtitle_langs=args.sub_langs,
+                           thumbnail=args.thumbnail or args.embed_thumbnail, embed_thumbnail=args.embed_thumbnail,
+                           info_json=args.info_json, sidecars=args.sidecars, max_res=args.max_res,
+                           template=args.template, format_id=args.format_id, compress=bool(args.compress),
+                           rate_limit=job_rate, store=args.store)
+    cache = None if args.no_cache else MetadataCache(CACHE_DIR)
+    stage = None
+    if args.compress:
+        stage = CompressStage(encoder=args.compress, max_jobs=args.compress_jobs, max_pending=args.compress_queue,
+                              on_update=reporter.on_compress_update)
+
+    def on_file(job, info):
+        if stage is not None and job.options["compress"] and not job.options["audio_only"] and info.get("filepath"):
+            stage.offer(info["filepath"])
+
+    journal = None if args.no_journal else JobJournal(args.journal)
+    store = OutputStore(args.store_dir) if args.store else None
+    engine = LibraryEngine(cache, archive, store=store) if engine_mode == ENGINE_LIBRARY else None
+    sidecars = SidecarStage(max_workers=max(1, args.sidecar_jobs), metadata_cache=cache, archive=archive) if args.sidecars else None
+    retry = RetryPolicy(max_retries=max(0, args.retries))
+    queue = JobQueue(lambda url, opts: build_command(url, opts, cache, archive=archive, store=store),
+                     parse_progress_line, max_workers=args.jobs, on_update=reporter.on_update,
+                     on_output=reporter.on_output, archive=archive, on_file=on_file, journal=journal,
+                     bandwidth=bandwidth, engine=engine, sidecars=sidecars, store=store, retry=retry)
+
+    interrupted = False
+    try:
+        if journal is not None:
+            unfinished = journal.unfinished()
+            killed = journal.reap_orphans(unfinished)
+            if args.resume:
+                queue.resume(unfinished)
+            if unfinished or killed:
+                reporter.emit("journal", unfinished=len(unfinished), resumed=bool(args.resume),
+                              orphans_killed=killed)
+        queue.submit_many(urls, options)
+        while not queue.wait(timeout=0.5):
+            pass
+        if stage is not None:
+            stage.wait()
+    except KeyboardInterrupt:
+        interrupted = True
+        # Leaves the interrupted jobs in the journal for --resume.
+        queue.shutdown()
+        if stage is not None:
+            stage.cancel_all()
+        queue.wait(timeout=10)
+    finally:
+        if stage is not None:
+            stage.shutdown(wait=not interrupted)
+        if sidecars is not None:
+            sidecars.shutdown(wait=False)
+        reporter.close()
+        if engine is not None:
+            engine.shutdown()
+        if cache is not None:
+            cache.close()
+        if archive is not None:
+            archive.close()
+        if journal is not None:
+            journal.close()
+
+    counts = queue.counts()
+    compress_failed = 0
+    if stage is not None and not interrupted:
+        tasks = stage.wait()
+        compress_failed = sum(task.status == "failed" for task in tasks)
+        reporter.emit("compress-summary", compressed=sum(task.status == "done" for task in tasks),
+                      failed=compress_failed, download_wait=round(stage.blocked_time, 3))
+    if sidecars is not None:
+        reporter.emit("sidecar-summary", **sidecars.stats())
+    if retry.histogram():
+        reporter.emit("retry-summary", failures=retry.histogram())
+    if store is not None:
+        reporter.emit("store-summary", **store.stats())
+        store.close()
+    reporter.emit("summary", total=len(queue.jobs), done=counts.get(DONE, 0), skipped=counts.get(SKIPPED, 0),
+                  failed=counts.get(FAILED, 0), cancelled=counts.get(CANCELLED, 0))
+    if interrupted:
+        return EXIT_INTERRUPTED
+    if not compress_failed and all(job.status in (DONE, SKIPPED) for job in queue.jobs.values()
+                                   if job.status in FINISHED_STATES):
+        return EXIT_OK
+    return EXIT_FAILED
@@ -0,0 +1,225 @@
+"""Client for the API server (see server.py), shaped like JobQueue so a front end can use either."""
+import json
+import time
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+from .jobs import Job, CANCELLED, DONE, RUNNING, SKIPPED
+from .progress import ProgressRecord
+
+# --- Constants ---
+# Where the server and its clients look for the token (a client also takes ?token= on the URL).
+TOKEN_ENV = "YTDL_API_TOKEN"
+REQUEST_TIMEOUT = 30
+RECONNECT_DELAY = 2.0
+
+
+class RemoteJob(Job):
+    """A job running on the server, updated from its event stream."""
+
+    def update(self, data):
+        self.status = data["status"]
+        self.percent = data["percent"]
+        self.attempts = data["attempts"]
+        self.returncode = data["returncode"]
+        self.failure = data["failure"]
+        self.failures = data["failures"]
+        self.files = data["files"]
+        self.options = data["options"]
+        progress = data.get("progress")
+        self.progress = None if progress is None else ProgressRecord.from_dict(progress)
+        self.retry_at = time.monotonic() + data["retry_in"] if data.get("retry_in") is not None else 0.0
+
+
+class RemoteJobQueue:
+    """Submits to and follows an API server with the JobQueue methods a front end calls.
+
+    ``start()`` opens the server's event stream on a background thread,
+    reconnecting when it drops; ``on_update`` and ``on_output`` are called
+    from that thread, as JobQueue calls them from its workers. The jobs
+    run on the server, so ``shutdown()`` only disconnects. Failed requests
+    go to ``on_error`` with the server's message and return what JobQueue
+    would for a no-op (False, or no jobs). ``engine`` and ``store`` are
+    accepted for compatibility and ignored: the server has its own.
+    A ``?token=`` on ``url`` is used when ``token`` is not given.
+    """
+
+    def __init__(self, url, token=None, on_update=None, on_output=None, on_error=None):
+        parts = urlsplit(url)
+        self.url = urlunsplit((parts.scheme, parts.netloc, parts.path, "", "")).rstrip("/")
+        self.token = token or parse_qs(parts.query).get("token", [None])[0]
+        self.on_update = on_update
+        self.on_output = on_output
+        self.on_error = on_error
+        self.engine = None
+        self.store = None
+        self.jobs = {}
+        self._max_workers = None
+        self._closing = threading.Event()
+        self._stream = None
+        self._lock = threading.RLock()
+
+    # --- Public API ---
+    def start(self):
+        threading.Thread(target=self._follow, name="ytdl-events", daemon=True).start()
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    def set_max_workers(self, count):
+        reply = self._call("POST", "/api/workers", {"count": max(1, int(count))})
+        if reply is not None:
+            self._max_workers = reply["workers"]
+
+    def submit(self, url, options=None):
+        jobs = self.submit_many([url], options)
+        return jobs[0] if jobs else None
+
+    def submit_many(self, urls, options=None):
+        """Queues several URLs at once; ``options`` may also be a function of the URL."""
+        return self._submit_all([(url, options(url) if callable(options) else options) for url in urls])
+
+    def resume(self, entries):
+        """Queues unfinished JournalEntry objects on the server; their journal stays with the caller."""
+        return self._submit_all([(entry.url, entry.options) for entry in entries])
+
+    def cancel(self, job_id):
+        reply = self._call("POST", f"/api/jobs/{job_id}/cancel")
+        return bool(reply and reply["cancelled"])
+
+    def retry(self, job_id):
+        reply = self._call("POST", f"/api/jobs/{job_id}/retry")
+        if reply is not None:
+            self._merge(reply)
+        return reply is not None
+
+    def clear_finished(self):
+        reply = self._call("POST", "/api/jobs/clear")
+        cleared = [] if reply is None else reply["cleared"]
+        with self._lock:
+            for job_id in cleared:
+                self.jobs.pop(job_id, None)
+        return cleared
+
+    def cancel_all(self):
+        with self._lock:
+            ids = [job_id for job_id, job in self.jobs.items() if not job.finished]
+        for job_id in ids:
+            self.cancel(job_id)
+
+    def shutdown(self):
+        """Disconnects; the server keeps running the jobs."""
+        self._closing.set()
+        stream = self._stream
+        if stream is not None:
+            stream.close()
+
+    def counts(self):
+        with self._lock:
+            summary = {}
+            for job in self.jobs.values():
+                summary[job.status] = summary.get(job.status, 0) + 1
+            return summary
+
+    def throughput(self):
+        with self._lock:
+            running = [j for j in self.jobs.values() if j.status == RUNNING]
+        return sum(j.progress.speed or 0 for j in running if j.progress is not None), None
+
+    def overall_percent(self):
+        with self._lock:
+            jobs = [j for j in self.jobs.values() if j.status != CANCELLED]
+            if not jobs:
+                return 0.0
+            return sum(100.0 if j.status in (DONE, SKIPPED) else j.percent for j in jobs) / len(jobs)
+
+    # --- Requests ---
+    def _submit_all(self, items):
+        reply = self._call("POST", "/api/jobs", {"items": [{"url": url, "options": options or {}}
+                                                           for url, options in items]})
+        return [] if reply is None else [self._merge(data) for data in reply["jobs"]]
+
+    def _request(self, path, method="GET", body=None):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        return urllib.request.Request(self.url + path, data=data, method=method, headers=headers)
+
+    def _call(self, method, path, body=None):
+        try:
+            with urllib.request.urlopen(self._request(path, method, body), timeout=REQUEST_TIMEOUT) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read())["error"]
+            except (ValueError, KeyError):
+                message = str(e)
+            self._error(message)
+        except (OSError, ValueError) as e:
+            self._error(f"{self.url} unreachable: {e}")
+        return None
+
+    def _error(self, message):
+        if self.on_error is not None:
+            self.on_error(message)
+
+    def _merge(self, data):
+        """Updates (or creates) the local copy of a job; returns it."""
+        with self._lock:
+            job = self.jobs.get(data["id"])
+            if job is None:
+                job = self.jobs[data["id"]] = RemoteJob(data["id"], data["url"], data["options"])
+            job.update(data)
+        return job
+
+    # --- Event Stream ---
+    def _follow(self):
+        while not self._closing.is_set():
+            try:
+                # No timeout: the server sends keepalive comments, and shutdown() closes the stream.
+                with urllib.request.urlopen(self._request("/api/events?output=1")) as stream:
+                    self._stream = stream
+                    self._read_events(stream)
+            except urllib.error.HTTPError as e:
+                self._error(f"event stream refused: {e}")
+                return
+            except (OSError, ValueError) as e:
+                if self._closing.is_set():
+                    return
+                self._error(f"lost the event stream ({e}); reconnecting")
+            self._closing.wait(RECONNECT_DELAY)
+
+    def _read_events(self, stream):
+        event = None
+        for raw in stream:
+            line = raw.decode("utf-8").rstrip("\r\n")
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:") and event is not None:
+                self._dispatch(event, json.loads(line[5:]))
+                event = None
+
+    def _dispatch(self, event, data):
+        if event == "snapshot":
+            with self._lock:
+                self._max_workers = data.get("workers", self._max_workers)
+                known = {item["id"] for item in data["jobs"]}
+                # Jobs cleared on the server while disconnected are forgotten here too.
+                for job_id in [job_id for job_id in self.jobs if job_id not in known]:
+                    del self.jobs[job_id]
+            for item in data["jobs"]:
+                self._notify(self._merge(item))
+        elif event == "job":
+            self._notify(self._merge(data))
+        elif event == "output" and self.on_output is not None:
+            job = self.jobs.get(data["job"])
+            if job is not None:
+                self.on_output(job, data["line"])
+
+    def _notify(self, job):
+        if self.on_update is not None:
+            self.on_update(job)
@@ -0,0 +1,139 @@
+import os
+
+from .progress import progress_args
+
+# --- Constants ---
+YTDLP_EXECUTABLE = "yt-dlp.exe" if os.name == 'nt' else "yt-dlp"
+FFMPEG_EXECUTABLE = "ffmpeg.exe" if os.name == 'nt' else "ffmpeg"
+FFPROBE_EXECUTABLE = "ffprobe.exe" if os.name == 'nt' else "ffprobe"
+DEFAULT_TEMPLATE = "%(title)s [%(id)s].%(ext)s"
+MAX_RES_CHOICES = ("none", "1080p", "720p", "480p", "360p")
+SUBTITLE_LANGS = "en,en-US,en-GB"
+THUMBNAIL_FORMAT = "jpg"
+# Extractor JSON, thumbnails, sidecars and tool probes; here so the GUI can name it before SQLite is loaded.
+CACHE_DIR = "cache"
+
+# The options a job is built from; the GUI and the CLI both fill in this dict.
+DEFAULT_OPTIONS = {
+    "output_dir": ".",
+    "playlist": False,
+    "audio_only": False,
+    "subtitles": False,
+    "embed_subtitles": False,
+    "subtitle_langs": SUBTITLE_LANGS,
+    "thumbnail": False,
+    "embed_thumbnail": False,
+    "info_json": False,
+    # Fetch the above beside the media instead of inside the download (see sidecars.SidecarFetcher).
+    "sidecars": False,
+    "max_res": "none",
+    "template": DEFAULT_TEMPLATE,
+    "format_id": None,
+    "skip_archived": True,
+    "compress": False,
+    # Keep one copy per video and format and link it into place (see store.OutputStore).
+    "store": False,
+    "rate_limit": None,
+    "concurrent_fragments": None,
+    # Cleared by a retry (see retry.RETRY_RULES) to restart the .part file or to extract again.
+    "resume_partial": True,
+    "reuse_metadata": True,
+}
+
+
+def make_options(**overrides):
+    """Returns a full options dict, starting from DEFAULT_OPTIONS."""
+    unknown = set(overrides) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown download options: {', '.join(sorted(unknown))}")
+    options = dict(DEFAULT_OPTIONS)
+    options.update(overrides)
+    if options["max_res"] not in MAX_RES_CHOICES:
+        raise ValueError(f"max_res must be one of: {', '.join(MAX_RES_CHOICES)}")
+    return options
+
+def format_spec(options):
+    """The yt-dlp -f selector for an options dict, or None to let yt-dlp pick."""
+    if options["audio_only"]:
+        return None
+    res_val = options["max_res"].replace("p", "") if options["max_res"] != "none" else None
+    if options["format_id"]:
+        if res_val is None:
+            return options["format_id"]
+        # An explicit format may be any row of the fetched list or any -f code, so the limit still applies:
+        # yt-dlp picks it from the formats no taller than the limit (audio has no height), or fails.
+        return f"({options['format_id']})[height<=?{res_val}]"
+    if res_val is not None:
+        return f"bestvideo[height<={res_val}]+bestaudio/best[height<={res_val}]"
+    return None
+
+def output_template(options):
+    return os.path.join(options["output_dir"], options["template"] or "%(title)s.%(ext)s")
+
+def skips_archived(options):
+    """True when archived videos are skipped; with the store they are linked into place instead."""
+    return options.get("skip_archived", True) and not options.get("store")
+
+def archive_file_for(options, archive):
+    """Exports the archive for a playlist job and returns the yt-dlp archive file path, else None.
+
+    Single videos are checked against the archive before a download starts;
+    playlist entries are only known to yt-dlp, so it gets a copy.
+    """
+    if archive is None or not options["playlist"] or not skips_archived(options):
+        return None
+    archive_file = os.path.splitext(archive.path)[0] + ".txt"
+    archive.export_ytdlp(archive_file)
+    return archive_file
+
+def build_command(url, options, metadata_cache=None, executable=YTDLP_EXECUTABLE, archive=None, store=None):
+    """Builds the yt-dlp command list for one URL from an options dict."""
+    cmd = [executable]
+
+    cmd.append("--progress")
+    cmd.extend(progress_args())
+    cmd.append("--no-warnings")
+    # Resume .part files left by an interrupted run (see JobJournal).
+    cmd.append("--continue" if options.get("resume_partial", True) else "--no-continue")
+    if options.get("rate_limit"):
+        cmd.extend(["--limit-rate", str(int(options["rate_limit"]))])
+    if options.get("concurrent_fragments"):
+        cmd.extend(["--concurrent-fragments", str(options["concurrent_fragments"])])
+
+    if options["playlist"]:
+        cmd.extend(["--yes-playlist"])
+        if archive_file := archive_file_for(options, archive):
+            cmd.extend(["--download-archive", archive_file])
+    else:
+        cmd.extend(["--no-playlist"])
+
+    if options["audio_only"]:
+        cmd.extend(["-x", "--audio-format", "mp3"])
+    elif spec := format_spec(options):
+        cmd.extend(["-f", spec])
+
+    if not options.get("sidecars"):
+        if options["subtitles"]:
+            cmd.extend(["--write-sub", "--sub-lang", options.get("subtitle_langs") or SUBTITLE_LANGS])
+            if options["embed_subtitles"]:
+                cmd.append("--embed-subs")
+        if options.get("thumbnail"):
+            cmd.extend(["--write-thumbnail", "--convert-thumbnails", THUMBNAIL_FORMAT])
+            if options.get("embed_thumbnail"):
+                cmd.append("--embed-thumbnail")
+        if options.get("info_json"):
+            cmd.append("--write-info-json")
+
+    cmd.extend(["-o", output_template(options)])
+    if store is not None and options.get("store"):
+        cmd.extend(["--exec", store.hook_command(options)])
+
+    # Reuse cached extractor output instead of extracting the video again.
+    info_json = None
+    if metadata_cache is not None and not options["playlist"] and options.get("reuse_metadata", True):
+        info_json = metadata_cache.info_json_path(url)
+    if info_json:
+        cmd.extend(["--load-info-json", info_json])
+    else:
+        cmd.append(url)
+    return cmd
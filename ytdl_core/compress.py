@@ -0,0 +1,430 @@
+"""Parallel batch video compression, replacing the compress-*.bat scripts.
+
+    python -m ytdl_core.compress --encoder cpu video1.mp4 video2.mkv
+    python -m ytdl_core.compress --encoder gpu --bitrates 0:10000k,1440:15000k *.mp4
+
+Files are probed in parallel, a bitrate is picked from a height table, and
+encodes share a concurrency budget. A persistent index remembers what was
+already compressed so outputs and unchanged sources are skipped.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from .commands import FFMPEG_EXECUTABLE, FFPROBE_EXECUTABLE
+from .jobs import hidden_startupinfo
+
+# --- Constants ---
+COMPRESS_DIR = "Compress files"
+INDEX_NAME = ".compress-index.sqlite3"
+PROBE_WORKERS = 8
+# libx264 threads per encode when the cores are split between several encodes.
+X264_THREADS_PER_JOB = 2
+MAX_X264_JOBS = 8  # Each encode holds its own lookahead frames in memory.
+
+# (min_height, bitrate) rows; the last row whose min_height <= height wins.
+BITRATE_TABLES = {
+    "cpu": ((0, "15000k"), (1440, "30000k")),
+    "gpu": ((0, "10000k"), (1440, "15000k")),
+    "small": ((0, "1500k"),),
+}
+# Rate-control buffer for the named tables that need one (the 1500 kbps .bat passed -bufsize 1500k).
+TABLE_BUFSIZES = {"small": "1500k"}
+
+ENCODERS = {
+    "cpu": {"input": [], "video": ["-c:v", "libx264", "-preset", "slow"], "threads": True, "max_jobs": None},
+    # Consumer NVENC chips allow only a few concurrent sessions.
+    "gpu": {"input": ["-hwaccel", "auto"], "video": ["-c:v", "h264_nvenc", "-preset", "p5"], "threads": False,
+            "max_jobs": 3},
+    # ffmpeg's own pick for .mp4 (libx264 at its default preset), as drag_to_compress_1500kbps_bitrate.bat
+    # always encoded.
+    "default": {"input": [], "video": [], "threads": True, "max_jobs": None},
+}
+
+# --- Task States ---
+PENDING = "pending"
+ENCODING = "encoding"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS compressed (
+    source    TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    mtime     REAL NOT NULL,
+    output    TEXT NOT NULL,
+    bitrate   TEXT,
+    encoder   TEXT,
+    completed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS compressed_output ON compressed (output);
+"""
+
+
+# --- Helper Functions ---
+def parse_bitrate_table(text):
+    """Parses '0:15000k,1440:30000k' into ((0, '15000k'), (1440, '30000k'))."""
+    rows = []
+    for part in text.split(","):
+        height, _, bitrate = part.strip().partition(":")
+        if not bitrate:
+            raise ValueError(f"Bad bitrate table entry: {part!r} (expected HEIGHT:BITRATE)")
+        rows.append((int(height), bitrate.strip()))
+    return tuple(sorted(rows))
+
+def pick_bitrate(height, table):
+    bitrate = table[0][1]
+    for min_height, row_bitrate in table:
+        if (height or 0) >= min_height:
+            bitrate = row_bitrate
+    return bitrate
+
+def probe(path, executable=FFPROBE_EXECUTABLE):
+    """Returns {'height', 'duration', 'frames'} for the first video stream of a file."""
+    cmd = [executable, "-v", "error", "-select_streams", "v:0", "-show_entries",
+           "stream=height,nb_frames:format=duration", "-of", "json", path]
+    result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace",
+                            startupinfo=hidden_startupinfo())
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"ffprobe exited with code {result.returncode}")
+    data = json.loads(result.stdout or "{}")
+    stream = (data.get("streams") or [{}])[0]
+    duration = data.get("format", {}).get("duration")
+    frames = stream.get("nb_frames")
+    return {
+        "height": int(stream["height"]) if stream.get("height") else None,
+        "duration": float(duration) if duration not in (None, "N/A") else None,
+        "frames": int(frames) if frames not in (None, "N/A") else None,
+    }
+
+def default_job_budget(encoder, cores=None):
+    """Returns (jobs, threads_per_job) for an encoder on this machine.
+
+    libx264 gets more frames per second out of several narrow encodes than
+    one wide one, so the cores are split into encodes of about
+    X264_THREADS_PER_JOB threads, up to MAX_X264_JOBS at once.
+    """
+    cores = cores or os.cpu_count() or 1
+    if not ENCODERS[encoder]["threads"]:
+        return ENCODERS[encoder]["max_jobs"] or 1, None
+    jobs = max(1, min(MAX_X264_JOBS, cores // X264_THREADS_PER_JOB))
+    return jobs, max(1, cores // jobs)
+
+
+# --- Index ---
+class CompressionIndex:
+    """Remembers compressed sources (by path, size and mtime) and their outputs."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(INDEX_SCHEMA)
+        self._outputs = {os.path.normcase(row[0]) for row in self._db.execute("SELECT output FROM compressed")}
+
+    def is_output(self, path):
+        return os.path.normcase(os.path.abspath(path)) in self._outputs
+
+    def lookup(self, path):
+        """Returns the recorded output if this exact source was compressed and the output still exists."""
+        source = os.path.abspath(path)
+        stat = os.stat(source)
+        with self._lock:
+            row = self._db.execute("SELECT size, mtime, output FROM compressed WHERE source = ?",
+                                   (source,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime and os.path.exists(row[2]):
+            return row[2]
+        return None
+
+    def record(self, path, output, bitrate, encoder):
+        source = os.path.abspath(path)
+        output = os.path.abspath(output)
+        stat = os.stat(source)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO compressed VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (source, stat.st_size, stat.st_mtime, output, bitrate, encoder, time.time()))
+            self._db.commit()
+            self._outputs.add(os.path.normcase(output))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# --- Tasks ---
+class CompressTask:
+    """One source file and its encode state and throughput."""
+
+    def __init__(self, source, output):
+        self.source = source
+        self.output = output
+        self.status = PENDING
+        self.height = None
+        self.duration = None
+        self.frames = None
+        self.bitrate = None
+        self.percent = 0.0
+        self.fps = None
+        self.speed = None
+        self.elapsed = 0.0
+        self.returncode = None
+        self.error = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, SKIPPED)
+
+    def describe(self):
+        name = os.path.basename(self.source)
+        if self.status == SKIPPED:
+            return f"⏭️ Skipping already compressed: {name}"
+        if self.status == FAILED:
+            return f"❌ Failed: {name} ({self.error or f'code {self.returncode}'})"
+        if self.status == DONE:
+            return f"✅ Done: {self.output} in {self.elapsed:.1f}s ({self.fps or 0:.1f} fps, {self.speed or 0:.2f}x)"
+        return f"🔧 {name} at {self.bitrate}: {self.percent:.1f}% ({self.fps or 0:.1f} fps, {self.speed or 0:.2f}x)"
+
+    def __repr__(self):
+        return f"<CompressTask {self.status} {self.source}>"
+
+
+# --- Engine ---
+class CompressionEngine:
+    """Probes and encodes files on a bounded pool of ffmpeg processes.
+
+    ``on_update(task)`` is called from worker threads whenever a task's
+    state or throughput changes.
+    """
+
+    def __init__(self, output_dir=COMPRESS_DIR, encoder="cpu", bitrate_table=None, max_jobs=None,
+                 threads_per_job=None, on_update=None, ffmpeg=FFMPEG_EXECUTABLE, ffprobe=FFPROBE_EXECUTABLE,
+                 bufsize=None):
+        if encoder not in ENCODERS:
+            raise ValueError(f"Unknown encoder {encoder!r}; choose from {', '.join(ENCODERS)}")
+        jobs, threads = default_job_budget(encoder)
+        self.output_dir = output_dir
+        self.encoder = encoder
+        self.bitrate_table = bitrate_table or BITRATE_TABLES.get(encoder, BITRATE_TABLES["cpu"])
+        self.max_jobs = max_jobs or jobs
+        self.threads_per_job = threads_per_job or threads
+        self.bufsize = bufsize
+        self.on_update = on_update
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+        os.makedirs(output_dir, exist_ok=True)
+        self.index = CompressionIndex(os.path.join(output_dir, INDEX_NAME))
+        self._encode_pool = ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix="encode")
+        self._probe_pool = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="probe")
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    def output_path(self, source):
+        """Output for a source; a hash of its full path keeps same-named sources from different folders apart."""
+        name = os.path.splitext(os.path.basename(source))[0]
+        digest = hashlib.sha1(os.path.normcase(os.path.abspath(source)).encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.output_dir, f"{name}_{digest}_compressed.mp4")
+
+    def plan(self, paths):
+        """Probes all files in parallel and returns their tasks; known outputs are skipped."""
+        tasks = [CompressTask(path, self.output_path(path)) for path in paths]
+        list(self._probe_pool.map(self._prepare, tasks))
+        return tasks
+
+    def submit(self, path):
+        """Plans and encodes one file in the background; returns a Future of its task."""
+        task = CompressTask(path, self.output_path(path))
+        return self._encode_pool.submit(self._prepare_and_encode, task)
+
+    def run(self, paths):
+        """Compresses files and blocks until all are finished; returns their tasks."""
+        tasks = self.plan(paths)
+        futures = [self._encode_pool.submit(self._encode, task) for task in tasks if task.status == PENDING]
+        for future in futures:
+            future.result()
+        return tasks
+
+    def cancel_all(self):
+        with self._lock:
+            for process in self._processes:
+                process.terminate()
+
+    def shutdown(self, wait=True):
+        self._probe_pool.shutdown(wait=wait, cancel_futures=not wait)
+        self._encode_pool.shutdown(wait=wait, cancel_futures=not wait)
+        self.index.close()
+
+    # --- Internals ---
+    def _prepare_and_encode(self, task):
+        self._prepare(task)
+        if task.status == PENDING:
+            self._encode(task)
+        return task
+
+    def _prepare(self, task):
+        try:
+            if self.index.is_output(task.source):
+                task.status = SKIPPED
+            elif existing := self.index.lookup(task.source):
+                task.output = existing
+                task.status = SKIPPED
+            else:
+                info = probe(task.source, self.ffprobe)
+                task.height, task.duration, task.frames = info["height"], info["duration"], info["frames"]
+                task.bitrate = pick_bitrate(task.height, self.bitrate_table)
+        except Exception as e:
+            task.status = FAILED
+            task.error = str(e)
+        self._notify(task)
+        return task
+
+    def build_command(self, task, output):
+        profile = ENCODERS[self.encoder]
+        cmd = [self.ffmpeg, "-hide_banner", "-nostdin", "-y", *profile["input"], "-i", task.source,
+               *profile["video"], "-b:v", task.bitrate]
+        if self.bufsize:
+            cmd.extend(["-bufsize", self.bufsize])
+        if profile["threads"] and self.threads_per_job:
+            cmd.extend(["-threads", str(self.threads_per_job)])
+        cmd.extend(["-c:a", "copy", "-progress", "pipe:1", "-nostats", output])
+        return cmd
+
+    def _encode(self, task):
+        # Encode to a temporary name so an interrupted run never leaves a
+        # half-written file that looks finished.
+        part_path = task.output[:-len(".mp4")] + ".part.mp4"
+        task.status = ENCODING
+        self._notify(task)
+        start = time.perf_counter()
+        try:
+            process = subprocess.Popen(self.build_command(task, part_path), stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="replace",
+                                       startupinfo=hidden_startupinfo())
+            with self._lock:
+                self._processes.add(process)
+            stderr_tail = []
+            reader = threading.Thread(target=self._drain_stderr, args=(process.stderr, stderr_tail), daemon=True)
+            reader.start()
+            self._read_progress(task, process.stdout, start)
+            task.returncode = process.wait()
+            reader.join()
+            with self._lock:
+                self._processes.discard(process)
+            if task.returncode != 0:
+                raise RuntimeError(stderr_tail[-1] if stderr_tail else f"ffmpeg exited with code {task.returncode}")
+            os.replace(part_path, task.output)
+            self.index.record(task.source, task.output, task.bitrate, self.encoder)
+            task.status = DONE
+            task.percent = 100.0
+        except Exception as e:
+            task.status = FAILED
+            task.error = str(e)
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        task.elapsed = time.perf_counter() - start
+        if task.status == DONE and task.duration and task.elapsed:
+            task.speed = task.duration / task.elapsed
+        self._notify(task)
+        return task
+
+    def _read_progress(self, task, stream, start):
+        """Parses ffmpeg's '-progress' key=value blocks into task throughput."""
+        for line in stream:
+            key, _, value = line.strip().partition("=")
+            if key == "fps":
+                task.fps = _to_float(value)
+            elif key == "speed":
+                task.speed = _to_float(value.rstrip("x"))
+            elif key == "out_time_us" and task.duration:
+                seconds = (_to_float(value) or 0) / 1e6
+                task.percent = max(0.0, min(100.0, seconds * 100 / task.duration))
+            elif key == "progress":
+                task.elapsed = time.perf_counter() - start
+                self._notify(task)
+
+    def _drain_stderr(self, stream, tail):
+        for line in stream:
+            line = line.strip()
+            if line:
+                tail.append(line)
+                del tail[:-20]
+
+    def _notify(self, task):
+        if self.on_update:
+            self.on_update(task)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+# --- Command Line ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ytdl_core.compress", description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+", help="video files to compress")
+    parser.add_argument("--encoder", choices=sorted(ENCODERS), default="cpu")
+    parser.add_argument("--bitrates", help="height:bitrate table, e.g. 0:15000k,1440:30000k "
+                                           "(defaults: " + "; ".join(f"{k}={','.join(f'{h}:{b}' for h, b in v)}"
+                                                                      for k, v in BITRATE_TABLES.items()) + ")")
+    parser.add_argument("--preset-table", choices=sorted(BITRATE_TABLES), help="use a named bitrate table")
+    parser.add_argument("-o", "--output-dir", default=COMPRESS_DIR)
+    parser.add_argument("-j", "--jobs", type=int, help="concurrent encodes (default: from core count)")
+    parser.add_argument("--threads", type=int, help="encoder threads per job (default: cores / jobs)")
+    parser.add_argument("--bufsize", help="rate-control buffer, e.g. 1500k (default: none, or the preset table's)")
+    args = parser.parse_args(argv)
+
+    table = None
+    bufsize = args.bufsize
+    if args.bitrates:
+        table = parse_bitrate_table(args.bitrates)
+    elif args.preset_table:
+        table = BITRATE_TABLES[args.preset_table]
+        bufsize = bufsize or TABLE_BUFSIZES.get(args.preset_table)
+
+    last_report = {}
+
+    def report(task):
+        now = time.monotonic()
+        if task.status == ENCODING and now - last_report.get(task.source, 0) < 2:
+            return
+        last_report[task.source] = now
+        print(task.describe(), flush=True)
+
+    files = []
+    for path in args.files:
+        if os.path.isfile(path):
+            files.append(path)
+        else:
+            print(f"❌ File not found: {path}")
+    engine = CompressionEngine(args.output_dir, args.encoder, table, args.jobs, args.threads, on_update=report,
+                               bufsize=bufsize)
+    start = time.perf_counter()
+    try:
+        tasks = engine.run(files)
+    except KeyboardInterrupt:
+        engine.cancel_all()
+        engine.shutdown(wait=False)
+        return 130
+    engine.shutdown()
+
+    done = [t for t in tasks if t.status == DONE]
+    seconds = sum(t.duration or 0 for t in done)
+    wall = time.perf_counter() - start
+    print(f"\n✅ All done: {len(done)} compressed, {sum(t.status == SKIPPED for t in tasks)} skipped, "
+          f"{sum(t.status == FAILED for t in tasks)} failed in {wall:.1f}s "
+          f"({seconds / wall if wall else 0:.2f}x realtime overall, {engine.max_jobs} jobs)")
+    return 0 if len(files) == len(args.files) and all(t.status != FAILED for t in tasks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import os
+import json
+import shutil
+import threading
+import subprocess
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+from .commands import YTDLP_EXECUTABLE, FFMPEG_EXECUTABLE
+from .jobs import hidden_startupinfo
+
+# --- Constants ---
+PROBES_FILE = "probes.json"
+PROBE_TIMEOUT = 15
+# Tool name -> (executable, version argument).
+TOOLS = {
+    "yt-dlp": (YTDLP_EXECUTABLE, "--version"),
+    "ffmpeg": (FFMPEG_EXECUTABLE, "-version"),
+}
+# Optional packages: name -> (import name, distribution name).
+PACKAGES = {
+    "yt_dlp": ("yt_dlp", "yt-dlp"),
+    "Pillow": ("PIL", "pillow"),
+}
+
+
+# --- Helper Functions ---
+def parse_version(output):
+    """The version from the first line of ``yt-dlp --version`` or ``ffmpeg -version`` output."""
+    words = output.strip().splitlines()[0].split() if output.strip() else []
+    if "version" in words and words.index("version") + 1 < len(words):
+        return words[words.index("version") + 1]
+    return words[0] if words else None
+
+def file_signature(path):
+    """(size, mtime) of a file, which changes whenever the tool is updated."""
+    st = os.stat(path)
+    return [st.st_size, int(st.st_mtime)]
+
+
+class ToolInfo:
+    """Where a dependency was found and its version; ``cached`` marks results not yet re-checked."""
+
+    __slots__ = ("name", "path", "version", "signature", "cached")
+
+    def __init__(self, name, path=None, version=None, signature=None, cached=False):
+        self.name = name
+        self.path = path
+        self.version = version
+        self.signature = signature
+        self.cached = cached
+
+    @property
+    def found(self):
+        return self.path is not None
+
+    def describe(self):
+        if not self.found:
+            return f"{self.name} missing"
+        return f"{self.name} {self.version}" if self.version else self.name
+
+    def to_dict(self):
+        return {"path": self.path, "version": self.version, "signature": self.signature}
+
+    def __repr__(self):
+        return f"<ToolInfo {self.describe()}{' (cached)' if self.cached else ''}>"
+
+
+def describe_tools(tools):
+    return ", ".join(info.describe() for name, info in tools.items() if name in TOOLS)
+
+
+# --- Probe ---
+class DependencyProbe:
+    """Finds yt-dlp, ffmpeg and the optional packages, and their versions, off the UI thread.
+
+    Results are saved to ``cache_dir``. A later launch reads them with
+    ``cached()`` without touching the tools, then ``start()`` re-checks in
+    the background; ``--version`` only runs again for a tool whose path,
+    size or modification time changed.
+    """
+
+    def __init__(self, cache_dir, tools=TOOLS, packages=PACKAGES):
+        self.path = os.path.join(cache_dir, PROBES_FILE)
+        self.tools = tools
+        self.packages = packages
+
+    def cached(self):
+        """Returns {name: ToolInfo} from the last probe, or {} when there is none."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {name: ToolInfo(name, d.get("path"), d.get("version"), d.get("signature"), cached=True)
+                for name, d in data.items() if name in self.tools or name in self.packages}
+
+    def probe(self):
+        """Checks every tool and package, runs version probes as needed, and saves the results."""
+        previous = self.cached()
+        with ThreadPoolExecutor(max_workers=len(self.tools) or 1) as pool:
+            futures = {name: pool.submit(self._probe_tool, name, executable, arg, previous.get(name))
+                       for name, (executable, arg) in self.tools.items()}
+            results = {name: self._probe_package(name, *spec) for name, spec in self.packages.items()}
+            results.update((name, future.result()) for name, future in futures.items())
+        self._save(results)
+        return results
+
+    def start(self, callback):
+        """Probes on a background thread and calls ``callback(results)`` from it."""
+        thread = threading.Thread(target=lambda: callback(self.probe()), name="dependency-probe", daemon=True)
+        thread.start()
+        return thread
+
+    def _probe_tool(self, name, executable, version_arg, previous):
+        path = shutil.which(executable)
+        if path is None:
+            return ToolInfo(name)
+        try:
+            signature = file_signature(path)
+        except OSError:
+            signature = None
+        if previous is not None and previous.path == path and signature and previous.signature == signature:
+            return ToolInfo(name, path, previous.version, signature)
+        try:
+            result = subprocess.run([path, version_arg], capture_output=True, text=True, timeout=PROBE_TIMEOUT,
+                                    encoding='utf-8', errors='replace', startupinfo=hidden_startupinfo())
+            version = parse_version(result.stdout)
+        except (OSError, subprocess.SubprocessError):
+            version = None
+        return ToolInfo(name, path, version, signature)
+
+    def _probe_package(self, name, module, distribution):
+        # find_spec and the distribution metadata avoid importing the package itself.
+        from importlib import metadata  # Slow to import; only the background probe needs it.
+        spec = importlib.util.find_spec(module)
+        if spec is None:
+            return ToolInfo(name)
+        try:
+            version = metadata.version(distribution)
+        except metadata.PackageNotFoundError:
+            version = None
+        return ToolInfo(name, spec.origin, version)
+
+    def _save(self, results):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({name: info.to_dict() for name, info in results.items()}, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,280 @@
+"""In-process yt-dlp engine: YoutubeDL objects on long-lived threads instead of one process per URL.
+
+The yt_dlp package is imported lazily. When it is not installed as a
+library, callers keep starting the yt-dlp executable.
+"""
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+from .commands import SUBTITLE_LANGS, THUMBNAIL_FORMAT, archive_file_for, format_spec, output_template
+from .playlist import ExtractionError
+from .progress import DOWNLOAD, FILE_DONE_FIELDS, progress_record
+
+# --- Constants ---
+ENGINE_SUBPROCESS = "subprocess"
+ENGINE_LIBRARY = "library"
+ENGINE_CHOICES = ("auto", ENGINE_SUBPROCESS, ENGINE_LIBRARY)
+EXTRACT_WORKERS = 3
+
+_yt_dlp = None
+_file_done_class = None
+_before_download_class = None
+_import_lock = threading.Lock()
+
+
+# --- Helper Functions ---
+def library_available():
+    """True when yt_dlp can be imported; does not import it."""
+    return _yt_dlp is not None or importlib.util.find_spec("yt_dlp") is not None
+
+def resolve_engine(choice):
+    """Maps an ENGINE_CHOICES value to ENGINE_LIBRARY or ENGINE_SUBPROCESS."""
+    if choice == "auto":
+        return ENGINE_LIBRARY if library_available() else ENGINE_SUBPROCESS
+    if choice == ENGINE_LIBRARY and not library_available():
+        raise ValueError("the yt_dlp package is not installed (pip install yt-dlp)")
+    return choice
+
+def load_yt_dlp():
+    """Imports yt_dlp once and returns it."""
+    global _yt_dlp, _file_done_class, _before_download_class
+    with _import_lock:
+        if _yt_dlp is None:
+            import yt_dlp
+            from yt_dlp.postprocessor.common import PostProcessor
+
+            class FileDonePP(PostProcessor):
+                """Library counterpart of the FILE_DONE_TEMPLATE ``--print after_move:`` line."""
+
+                def __init__(self, downloader, on_record):
+                    super().__init__(downloader)
+                    self.on_record = on_record
+
+                def run(self, info):
+                    self.on_record(progress_record("file", {k: info.get(k) for k in FILE_DONE_FIELDS.split(",")}))
+                    return [], info
+
+            class BeforeDownloadPP(PostProcessor):
+                """Library counterpart of an ``--exec before_dl:`` hook; runs once the filename is known."""
+
+                def __init__(self, downloader, hook):
+                    super().__init__(downloader)
+                    self.hook = hook
+
+                def run(self, info):
+                    self.hook(info)
+                    return [], info
+
+            _file_done_class = FileDonePP
+            _before_download_class = BeforeDownloadPP
+            _yt_dlp = yt_dlp
+        return _yt_dlp
+
+def build_params(options, archive=None):
+    """Maps an options dict onto YoutubeDL params, as commands.build_command does onto arguments."""
+    params = {
+        "outtmpl": output_template(options),
+        "noplaylist": not options["playlist"],
+        "continuedl": options.get("resume_partial", True),
+        "no_warnings": True,
+        # Progress reaches the caller through hooks, not as log lines.
+        "noprogress": True,
+    }
+    if options.get("rate_limit"):
+        params["ratelimit"] = int(options["rate_limit"])
+    if options.get("concurrent_fragments"):
+        params["concurrent_fragment_downloads"] = options["concurrent_fragments"]
+    if archive_file := archive_file_for(options, archive):
+        params["download_archive"] = archive_file
+
+    postprocessors = []
+    if options["audio_only"]:
+        params["format"] = "bestaudio/best"
+        postprocessors.append({"key": "FFmpegExtractAudio", "preferredcodec": "mp3"})
+    elif spec := format_spec(options):
+        params["format"] = spec
+    if options.get("sidecars"):
+        params["postprocessors"] = postprocessors
+        return params
+    if options["subtitles"]:
+        params["writesubtitles"] = True
+        params["subtitleslangs"] = (options.get("subtitle_langs") or SUBTITLE_LANGS).split(",")
+        if options["embed_subtitles"]:
+            postprocessors.append({"key": "FFmpegEmbedSubtitle", "already_have_subtitle": True})
+    if options.get("thumbnail"):
+        params["writethumbnail"] = True
+        postprocessors.append({"key": "FFmpegThumbnailsConvertor", "format": THUMBNAIL_FORMAT, "when": "before_dl"})
+        if options.get("embed_thumbnail"):
+            postprocessors.append({"key": "EmbedThumbnail", "already_have_thumbnail": True})
+    if options.get("info_json"):
+        params["writeinfojson"] = True
+    params["postprocessors"] = postprocessors
+    return params
+
+
+class LineLogger:
+    """YoutubeDL logger that hands each message to ``on_line``, like a subprocess's merged stdout."""
+
+    def __init__(self, on_line=None):
+        self.on_line = on_line
+
+    def debug(self, msg):
+        if self.on_line and not msg.startswith("[debug] "):
+            self.on_line(msg)
+
+    info = debug
+    error = debug
+
+    def warning(self, msg):
+        self.debug(f"WARNING: {msg}")
+
+
+# --- Engine ---
+class LibraryEngine:
+    """Runs yt-dlp in this process, skipping interpreter and extractor startup for every URL.
+
+    Metadata extraction runs on a small pool whose threads each keep one
+    warm YoutubeDL, so extractor instances and their initialization are
+    reused between URLs. A download needs a YoutubeDL built from its own
+    options and runs on the calling thread (JobQueue already bounds how
+    many run at once), but reuses the warm instance's list of extractor
+    classes instead of rebuilding it. Progress and post-processor hooks
+    become the same ProgressRecords the subprocess path parses from stdout.
+    """
+
+    def __init__(self, metadata_cache=None, archive=None, extract_workers=EXTRACT_WORKERS, store=None):
+        self.metadata_cache = metadata_cache
+        self.archive = archive
+        self.store = store
+        self._local = threading.local()
+        self._extractor_classes = None
+        self._pool = ThreadPoolExecutor(max_workers=extract_workers, thread_name_prefix="ytdl-engine")
+        # Importing yt_dlp and its extractor classes is most of its startup; do it off the caller's thread.
+        self.warmup = self._pool.submit(self._extractor, False)
+
+    def extract_info(self, url, playlist=False, timeout=None, flat=False):
+        """Returns the JSON-safe info dict ``yt-dlp --dump-single-json`` would print.
+
+        With ``flat``, playlist entries are left unresolved, as with ``--flat-playlist``.
+        """
+        return self._pool.submit(self._extract, url, playlist, flat).result(timeout)
+
+    def download(self, url, options, on_record=None, on_output=None, cancelled=None, rate_limit=None):
+        """Downloads one URL for an options dict on the calling thread; returns yt-dlp's exit code.
+
+        Cached extractor output is reused like ``--load-info-json`` does,
+        and with an OutputStore a stored copy is linked into place first.
+        """
+        info_json = None
+        if self.metadata_cache is not None and not options["playlist"] and options.get("reuse_metadata", True):
+            info_json = self.metadata_cache.info_json_path(url)
+        before_download = None
+        if self.store is not None and options.get("store"):
+            before_download = self._store_hook(self.store, options, on_output)
+        return self.run(url, build_params(options, self.archive), on_record, on_output, cancelled, info_json,
+                        before_download, rate_limit)
+
+    def run(self, url, params, on_record=None, on_output=None, cancelled=None, info_json=None, before_download=None,
+            rate_limit=None):
+        """Runs one YoutubeDL over params and returns 0 on success, 1 on failure.
+
+        ``on_record(record)`` gets a ProgressRecord per hook call and a
+        FILE_DONE record per finished file; ``on_output(line)`` gets log
+        lines. ``cancelled()`` is polled from the hooks and aborts the
+        download once it returns True; a running ffmpeg step finishes first.
+        ``before_download(info)`` is called for each video once its output
+        filename is known, before yt-dlp checks whether it already exists.
+        ``rate_limit()`` is polled from the progress hook as well; the
+        bytes/s it returns (None for no limit) replaces the ``ratelimit``
+        param, which yt-dlp's downloaders read again for every chunk.
+        """
+        self.warmup.result()
+        yt_dlp = _yt_dlp
+        on_record = on_record or (lambda record: None)
+
+        def check_cancelled():
+            if cancelled is not None and cancelled():
+                raise yt_dlp.utils.DownloadCancelled("Download cancelled")
+
+        def progress_hook(data):
+            check_cancelled()
+            if rate_limit is not None:
+                params["ratelimit"] = rate_limit()
+            on_record(progress_record(DOWNLOAD, data))
+
+        def postprocessor_hook(data):
+            check_cancelled()
+            on_record(progress_record("postprocess", data))
+
+        params = dict(params, logger=LineLogger(on_output), progress_hooks=[progress_hook],
+                      postprocessor_hooks=[postprocessor_hook])
+        try:
+            with self._new_downloader(params) as ydl:
+                ydl.add_post_processor(_file_done_class(ydl, on_record), when="after_move")
+                if before_download is not None:
+                    ydl.add_post_processor(_before_download_class(ydl, before_download), when="before_dl")
+                if info_json:
+                    return ydl.download_with_info_file(info_json)
+                return ydl.download([url])
+        except (yt_dlp.utils.DownloadCancelled, yt_dlp.utils.DownloadError):
+            return 1  # Already reported through the logger.
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _store_hook(self, store, options, on_output):
+        """The in-process counterpart of OutputStore.hook_command()."""
+        # Only reached with a store open; importing it at the top would load SQLite for every engine user.
+        from .store import store_variant
+        variant = store_variant(options)
+        final_ext = "mp3" if options["audio_only"] else None
+
+        def link_stored(info):
+            try:
+                kind = store.link_existing(info.get("extractor_key"), info["id"], info.get("format_id"), variant,
+                                           info["_filename"], final_ext)
+            except Exception as e:
+                # Without the stored copy the video just downloads as usual.
+                kind = None
+                if on_output:
+                    on_output(f"[store] Couldn't link a stored copy: {e}")
+            if kind and on_output:
+                on_output(f"[store] Linked stored copy ({kind}) to {info['_filename']}")
+        return link_stored
+
+    def _new_downloader(self, params):
+        # Building the default extractor list costs tens of milliseconds per
+        # YoutubeDL; the classes are stateless, so take them from the warm one.
+        if self._extractor_classes is None:
+            return _yt_dlp.YoutubeDL(params)
+        ydl = _yt_dlp.YoutubeDL(params, auto_init=False)
+        for ie in self._extractor_classes:
+            ydl.add_info_extractor(ie)
+        return ydl
+
+    # --- Pool Threads ---
+    def _extractor(self, playlist, flat=False):
+        cache = getattr(self._local, "extractors", None)
+        if cache is None:
+            cache = self._local.extractors = {}
+        ydl = cache.get((playlist, flat))
+        if ydl is None:
+            yt_dlp = load_yt_dlp()
+            params = {"quiet": True, "no_warnings": True, "noplaylist": not playlist, "logger": LineLogger()}
+            if flat:
+                params["extract_flat"] = "in_playlist"
+            ydl = cache[playlist, flat] = yt_dlp.YoutubeDL(params)
+            if self._extractor_classes is None:
+                # In extractor order; instances (the catch-all "unsupported URL" one) are replaced by their class.
+                self._extractor_classes = [ie if isinstance(ie, type) else type(ie)
+                                           for ie in getattr(ydl, "_ies", {}).values()] or None
+        return ydl
+
+    def _extract(self, url, playlist, flat=False):
+        ydl = self._extractor(playlist, flat)
+        try:
+            info = ydl.extract_info(url, download=False)
+        except _yt_dlp.utils.DownloadError as e:
+            raise ExtractionError(str(e)) from e
+        return ydl.sanitize_info(info)
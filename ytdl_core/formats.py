@@ -0,0 +1,265 @@
+from bisect import bisect_left
+
+from .progress import format_bytes
+
+# --- Constants ---
+# Codec families, matched by prefix against yt-dlp's vcodec/acodec strings.
+CODEC_FAMILIES = (
+    ("avc", "h264"), ("h264", "h264"),
+    ("hev", "h265"), ("hvc", "h265"), ("h265", "h265"),
+    ("vp09", "vp9"), ("vp9", "vp9"), ("vp8", "vp8"),
+    ("av01", "av1"),
+    ("mp4a", "aac"), ("aac", "aac"),
+    ("opus", "opus"), ("vorbis", "vorbis"), ("mp3", "mp3"),
+)
+# Which container each extension belongs to, and which codecs that container
+# holds without a remux.
+CONTAINERS = {"mp4": "mp4", "m4a": "mp4", "mov": "mp4", "webm": "webm", "weba": "webm", "mkv": "mkv"}
+CONTAINER_CODECS = {
+    "mp4": {"h264", "h265", "av1", "aac", "mp3", "opus"},
+    "webm": {"vp8", "vp9", "av1", "opus", "vorbis"},
+}
+# Formats that are not playable media (YouTube storyboards and the like).
+SKIPPED_EXTS = {"mhtml"}
+
+
+def codec_family(codec):
+    """Maps 'avc1.640028' to 'h264', 'none'/None to None, anything unknown to itself."""
+    if not codec or codec == "none":
+        return None
+    codec = codec.lower()
+    for prefix, family in CODEC_FAMILIES:
+        if codec.startswith(prefix):
+            return family
+    return codec.split(".")[0]
+
+
+# --- Format Model ---
+class MediaFormat:
+    """One entry of an info dict's ``formats`` list."""
+
+    __slots__ = ("format_id", "ext", "vcodec", "acodec", "width", "height", "fps", "tbr", "abr", "filesize",
+                 "size_exact", "note", "protocol")
+
+    def __init__(self, data, duration=None):
+        self.format_id = str(data.get("format_id"))
+        self.ext = data.get("ext") or ""
+        self.vcodec = codec_family(data.get("vcodec"))
+        self.acodec = codec_family(data.get("acodec"))
+        self.width = data.get("width")
+        self.height = data.get("height")
+        self.fps = data.get("fps")
+        self.tbr = data.get("tbr")
+        self.abr = data.get("abr")
+        self.note = data.get("format_note") or ""
+        self.protocol = data.get("protocol") or ""
+        self.filesize = data.get("filesize")
+        self.size_exact = self.filesize is not None
+        if self.filesize is None:
+            self.filesize = data.get("filesize_approx")
+        if self.filesize is None and self.tbr and duration:
+            self.filesize = int(self.tbr * 1000 / 8 * duration)  # tbr is in kbit/s
+
+    @property
+    def has_video(self):
+        return self.vcodec is not None
+
+    @property
+    def has_audio(self):
+        return self.acodec is not None
+
+    @property
+    def container(self):
+        return CONTAINERS.get(self.ext, self.ext)
+
+    @property
+    def resolution(self):
+        if not self.has_video:
+            return "audio only"
+        if self.height:
+            return f"{self.width}x{self.height}" if self.width else f"{self.height}p"
+        return "video"
+
+    @property
+    def codecs(self):
+        return "+".join(c for c in (self.vcodec, self.acodec) if c) or "?"
+
+    def label(self):
+        """One line for the format selector."""
+        codecs = self.codecs
+        size = f"~{format_bytes(self.filesize)}" if self.filesize and not self.size_exact else format_bytes(self.filesize)
+        note = f" {self.note}" if self.note else ""
+        return f"{self.format_id}  {self.ext}  {self.resolution}{note}  {codecs}  {size}"
+
+    def __repr__(self):
+        return f"<MediaFormat {self.label()}>"
+
+
+def parse_formats(info):
+    """Returns the downloadable formats of an info dict as MediaFormat objects, in yt-dlp's order."""
+    duration = info.get("duration")
+    formats = []
+    for data in info.get("formats") or ():
+        if data.get("ext") in SKIPPED_EXTS or data.get("has_drm"):
+            continue
+        fmt = MediaFormat(data, duration)
+        # yt-dlp leaves codecs unset for some progressive formats; treat them as muxed.
+        if fmt.vcodec is None and fmt.acodec is None and data.get("vcodec") is None:
+            fmt.vcodec = fmt.acodec = "unknown"
+        if fmt.has_video or fmt.has_audio:
+            formats.append(fmt)
+    return formats
+
+
+# --- Selection ---
+class FormatSelection:
+    """A chosen video+audio pair, or one format carrying both, with its predicted size."""
+
+    def __init__(self, video, audio=None):
+        self.video = video
+        self.audio = audio
+
+    @property
+    def formats(self):
+        return [f for f in (self.video, self.audio) if f is not None]
+
+    @property
+    def format_spec(self):
+        """The -f argument for yt-dlp."""
+        return "+".join(f.format_id for f in self.formats)
+
+    @property
+    def container(self):
+        return self.video.container
+
+    # The same fields as a MediaFormat, so a list can show either.
+    format_id = format_spec
+    ext = container
+
+    @property
+    def height(self):
+        return self.video.height
+
+    @property
+    def resolution(self):
+        return self.video.resolution
+
+    @property
+    def note(self):
+        return self.video.note
+
+    @property
+    def codecs(self):
+        return "+".join(f.codecs for f in self.formats)
+
+    @property
+    def filesize(self):
+        return self.size
+
+    @property
+    def size(self):
+        """Predicted total bytes, or None when any part has no size or bitrate."""
+        sizes = [f.filesize for f in self.formats]
+        return None if None in sizes else sum(sizes)
+
+    @property
+    def size_exact(self):
+        return all(f.size_exact for f in self.formats)
+
+    def describe(self):
+        parts = [f"{self.video.resolution} {self.video.vcodec or ''}".strip()]
+        if self.audio is not None:
+            parts.append(f"{self.audio.acodec} {self.audio.ext}")
+        size = self.size
+        size_text = "size unknown" if size is None else ("" if self.size_exact else "~") + format_bytes(size)
+        return f"{self.format_spec} ({' + '.join(parts)}, {size_text})"
+
+    def __repr__(self):
+        return f"<FormatSelection {self.describe()}>"
+
+
+def compatible(video, audio, container=None):
+    """True when both streams fit one container (``container``, or the video's own) without a remux."""
+    container = container or video.container
+    allowed = CONTAINER_CODECS.get(container)
+    if allowed is None:
+        return audio.container == video.container
+    return video.vcodec in allowed and audio.acodec in allowed and audio.container == container
+
+
+def _codec_rank(codec, preference):
+    if not preference:
+        return 0
+    return -preference.index(codec) if codec in preference else -len(preference)
+
+def _video_key(fmt, preference):
+    return (fmt.height or 0, _codec_rank(fmt.vcodec, preference), fmt.fps or 0, fmt.tbr or 0)
+
+def _audio_key(fmt, preference):
+    return (fmt.abr or fmt.tbr or 0, _codec_rank(fmt.acodec, preference))
+
+
+def select_format(formats, max_height=None, max_bytes=None, codec_preference=None, container=None,
+                  audio_only=False):
+    """Picks the best FormatSelection under the given limits, or returns None.
+
+    Video candidates are ranked by height, then codec preference, frame rate
+    and bitrate; each is paired with the best audio stream that shares a
+    container with it, so yt-dlp can merge without a remux. The first pair
+    that fits ``max_bytes`` wins. Formats of unknown size never satisfy
+    ``max_bytes``.
+    """
+    preference = list(codec_preference or ())
+    audios = sorted((f for f in formats if f.has_audio and not f.has_video),
+                    key=lambda f: _audio_key(f, preference), reverse=True)
+    if audio_only:
+        for audio in audios:
+            if _fits(audio.filesize, max_bytes) and (container is None or audio.container == container):
+                return FormatSelection(audio)
+        return None
+
+    videos = [f for f in formats if f.has_video
+              and (max_height is None or (f.height or 0) <= max_height)
+              and (container is None or f.container == container)]
+    videos.sort(key=lambda f: _video_key(f, preference), reverse=True)
+    # Audio candidates depend only on the video's container and codec, so
+    # hundreds of DASH videos share a handful of precomputed lists.
+    partners = {}
+    for video in videos:
+        if video.has_audio:
+            if _fits(video.filesize, max_bytes):
+                return FormatSelection(video)
+            continue
+        group = (video.container, video.vcodec)
+        if group not in partners:
+            partners[group] = _AudioPartners([a for a in audios if compatible(video, a, container)])
+        audio = partners[group].best(video.filesize, max_bytes)
+        if audio is not None:
+            return FormatSelection(video, audio)
+    return None
+
+def _fits(size, max_bytes):
+    return max_bytes is None or (size is not None and size <= max_bytes)
+
+
+class _AudioPartners:
+    """Compatible audio streams, best first, with a size frontier for budgeted lookups."""
+
+    def __init__(self, audios):
+        self.audios = audios
+        # Keep only streams smaller than every better one: the best stream
+        # under a budget is then the first frontier entry that fits.
+        frontier = []
+        for audio in audios:
+            if audio.filesize is not None and (not frontier or audio.filesize < frontier[-1].filesize):
+                frontier.append(audio)
+        self.frontier = frontier
+        self.negated_sizes = [-a.filesize for a in frontier]
+
+    def best(self, video_size, max_bytes):
+        if max_bytes is None:
+            return self.audios[0] if self.audios else None
+        if video_size is None:
+            return None
+        index = bisect_left(self.negated_sizes, -(max_bytes - video_size))
+        return self.frontier[index] if index < len(self.frontier) else None
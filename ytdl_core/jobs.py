@@ -0,0 +1,631 @@
+import os
+import time
+import threading
+import subprocess
+from collections import Counter, deque
+
+from .commands import skips_archived
+from .processes import process_group_kwargs, kill_process_tree
+from .progress import DOWNLOAD, FILE_DONE, format_bytes
+from .retry import UNKNOWN, classify_line, host_key, worse_failure
+from .timeline import JobTimeline
+
+# --- Job States ---
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+SKIPPED = "skipped"
+FINISHED_STATES = (DONE, FAILED, CANCELLED, SKIPPED)
+
+# A larger share only restarts a yt-dlp process when it grew by more than this fraction;
+# a smaller one always does, so the jobs stay inside the budget.
+REALLOT_GROWTH = 0.25
+
+# Seconds between journal writes of a running job's .part file and size (see journal.JobJournal).
+PROGRESS_INTERVAL = 2.0
+# Journaled in place of an executable for in-process jobs, which have no PID of their own.
+LIBRARY_EXECUTABLE = "yt_dlp"
+
+# yt-dlp batch files treat lines starting with these characters as comments.
+COMMENT_PREFIXES = ("#", ";", "]")
+
+
+# --- Helper Functions ---
+def parse_url_list(text):
+    """Splits pasted text or a URL list file into URLs, skipping blanks and comments."""
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(COMMENT_PREFIXES):
+            continue
+        urls.extend(line.split())
+    return urls
+
+def hidden_startupinfo():
+    """Returns a STARTUPINFO that hides the console window on Windows, else None."""
+    if os.name != 'nt':
+        return None
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return startupinfo
+
+
+# --- Jobs ---
+class Job:
+    """A single URL download and its live state."""
+
+    def __init__(self, job_id, url, options):
+        self.id = job_id
+        self.url = url
+        self.options = dict(options)
+        self.status = QUEUED
+        self.percent = 0.0
+        self.progress = None
+        self.files = []
+        self.returncode = None
+        self.command = None
+        self.process = None
+        self.cancel_requested = False
+        self.attempts = 0
+        self.journal_entry = None
+        self.timeline = None
+        self.failure = None
+        self.failures = []
+        self.retry_at = 0.0
+        self.retry_overrides = {}
+        self.host = host_key(url)
+        self.allotment = None
+        self.reallot_requested = False
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.status} {self.percent:.1f}% {self.url}>"
+
+
+class JobQueue:
+    """Runs queued yt-dlp jobs on a bounded pool of worker processes.
+
+    ``build_command(url, options)`` returns the argv for a job and
+    ``parse_progress(line)`` returns a ProgressRecord or None for each
+    output line. ``on_update(job)`` and ``on_output(job, line)`` are called
+    from worker threads; structured progress lines reach ``on_output`` in
+    their human-readable form. ``on_file(job, info)`` is called as soon as
+    yt-dlp reports a finished file, while the job may still be running; it
+    may block to apply backpressure.
+
+    With a DownloadArchive, URLs already in it are marked skipped at submit
+    time without starting a process, and finished files are recorded in it.
+    With a JobJournal, every queued and running job is journaled until it
+    finishes; ``shutdown()`` stops the workers but keeps those entries so
+    ``resume()`` can pick them up in the next session. With a
+    BandwidthScheduler, each job is started with the rate limit and
+    fragment count it allots, and follows its allotment as other jobs
+    start and finish: in-process downloads change their rate limit on
+    the next progress tick, while a yt-dlp process that is still
+    downloading is restarted with the new limits (it resumes its .part
+    files) when its share shrank, or grew by more than REALLOT_GROWTH.
+    Every attempt records a JobTimeline in
+    ``job.timeline``, closed before the final ``on_update``.
+
+    While ``engine`` is set to a LibraryEngine, jobs run in-process
+    through ``engine.download(url, options, ...)`` instead of as
+    subprocesses; it can be switched between jobs. With a SidecarStage,
+    jobs whose options ask for sidecars start fetching them when queued,
+    and each finished file gets them before ``on_file`` sees it. With an
+    OutputStore, files of jobs whose options ask for it are taken into the
+    store and linked back, and archived videos are queued rather than
+    skipped so the store can link them into their new place.
+
+    With a RetryPolicy, each attempt's output is classified as it arrives
+    and a failed job is re-queued with the delay and option overrides the
+    policy picks, into ``job.failures`` history; it keeps its journal
+    entry while it waits. Pending jobs whose retry time has not come, or
+    whose host the policy is throttling, are passed over by the scheduler.
+    """
+
+    def __init__(self, build_command, parse_progress, max_workers=2,
+                 on_update=None, on_output=None, archive=None, on_file=None, journal=None, bandwidth=None, engine=None,
+                 sidecars=None, store=None, retry=None):
+        self.build_command = build_command
+        self.parse_progress = parse_progress
+        self.archive = archive
+        self.journal = journal
+        self.bandwidth = bandwidth
+        self.engine = engine
+        self.sidecars = sidecars
+        self.store = store
+        self.retry_policy = retry
+        self.on_update = on_update
+        self.on_output = on_output
+        self.on_file = on_file
+        self.jobs = {}
+        self._max_workers = max(1, int(max_workers))
+        self._pending = deque()
+        self._running = set()
+        self._next_id = 1
+        self._closing = False
+        self._wake_timer = None
+        self._wake_deadline = 0.0
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+        if bandwidth is not None:
+            bandwidth.watch(self._reallot)
+
+    # --- Public API ---
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    def set_max_workers(self, count):
+        """Resizes the pool; extra slots are filled immediately."""
+        with self._lock:
+            self._max_workers = max(1, int(count))
+            self._schedule()
+
+    def submit(self, url, options=None):
+        """Queues one URL and returns its Job."""
+        return self._submit_all([(url, options)])[0]
+
+    def submit_many(self, urls, options=None):
+        """Queues several URLs at once; ``options`` may also be a function of the URL."""
+        if callable(options):
+            return self._submit_all([(url, options(url)) for url in urls])
+        return self._submit_all([(url, options) for url in urls])
+
+    def resume(self, entries):
+        """Re-queues unfinished JournalEntry objects from an earlier session; returns the new Jobs.
+
+        yt-dlp continues from the ``.part`` files those jobs left behind.
+        """
+        jobs = self._submit_all([(entry.url, entry.options) for entry in entries])
+        for entry in entries:
+            self.journal.remove(entry.entry)
+        return jobs
+
+    def cancel(self, job_id):
+        """Drops a queued job or terminates a running one."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                self._pending.remove(job)
+                job.status = CANCELLED
+                self._journal_remove(job)
+            elif job.process is not None:
+                self._terminate(job.process)
+        self._notify(job)
+        return True
+
+    def retry(self, job_id):
+        """Re-queues a failed or cancelled job."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status not in (FAILED, CANCELLED):
+                return False
+            job.status = QUEUED
+            job.percent = 0.0
+            job.progress = None
+            job.files = []
+            job.returncode = None
+            job.cancel_requested = False
+            job.failure = None
+            job.failures = []
+            job.retry_at = 0.0
+            job.retry_overrides = {}
+            self._journal_queued(job)
+            self._pending.append(job)
+        self._notify(job)
+        with self._lock:
+            self._schedule()
+        return True
+
+    def clear_finished(self):
+        """Forgets finished jobs and returns their ids."""
+        with self._lock:
+            done = [job_id for job_id, job in self.jobs.items() if job.finished]
+            for job_id in done:
+                del self.jobs[job_id]
+        return done
+
+    def cancel_all(self):
+        with self._lock:
+            ids = list(self.jobs)
+        for job_id in ids:
+            self.cancel(job_id)
+
+    def shutdown(self):
+        """Stops all workers for good, leaving their jobs in the journal to be resumed."""
+        with self._lock:
+            self._closing = True
+            self._pending.clear()
+            for job in self.jobs.values():
+                if job.status == RUNNING:
+                    job.cancel_requested = True
+                    if job.process is not None:
+                        self._terminate(job.process)
+            if self._wake_timer is not None:
+                self._wake_timer.cancel()
+            self._schedule()
+
+    def wait(self, timeout=None):
+        """Blocks until no job is queued or running. Returns False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending and not self._running, timeout)
+
+    def counts(self):
+        """Returns a {status: count} summary of all known jobs."""
+        with self._lock:
+            summary = {}
+            for job in self.jobs.values():
+                summary[job.status] = summary.get(job.status, 0) + 1
+            return summary
+
+    def throughput(self):
+        """Returns (achieved, allotted) bytes/s over running jobs; allotted is None without a limit."""
+        with self._lock:
+            running = [j for j in self.jobs.values() if j.status == RUNNING]
+        if self.bandwidth is not None:
+            return self.bandwidth.throughput(running)
+        return sum(j.progress.speed or 0 for j in running if j.progress is not None), None
+
+    def overall_percent(self):
+        """Average progress over the jobs that have not been cancelled."""
+        with self._lock:
+            jobs = [j for j in self.jobs.values() if j.status != CANCELLED]
+            if not jobs:
+                return 0.0
+            return sum(100.0 if j.status in (DONE, SKIPPED) else j.percent for j in jobs) / len(jobs)
+
+    def _submit_all(self, items):
+        """Queues (url, options) pairs and only then fills the pool, so a batch starts together."""
+        jobs = []
+        with self._lock:
+            for url, options in items:
+                job = Job(self._next_id, url, options or {})
+                self._next_id += 1
+                self.jobs[job.id] = job
+                if self._is_archived(job):
+                    job.status = SKIPPED
+                else:
+                    self._journal_queued(job)
+                    self._pending.append(job)
+                jobs.append(job)
+        for job in jobs:
+            self._notify(job)
+        if self.sidecars is not None:
+            for job in jobs:
+                if job.status == QUEUED and self.sidecars.wants(job.options):
+                    self.sidecars.prefetch(job.url, job.options, self.engine)
+        with self._lock:
+            self._schedule()
+        return jobs
+
+    # --- Archive ---
+    def _is_archived(self, job):
+        if self.archive is None or job.options.get("playlist") or not skips_archived(job.options):
+            return False
+        return self.archive.contains_url(job.url)
+
+    def _record_files(self, job):
+        for info in job.files:
+            try:
+                self.archive.record_file(info)
+            except Exception as e:
+                if self.on_output:
+                    self.on_output(job, f"Failed to record {info.get('filepath')} in the archive: {e}")
+
+    # --- Journal ---
+    def _journal_queued(self, job):
+        if self.journal is not None:
+            job.journal_entry = self.journal.record(job.url, job.options, QUEUED)
+
+    def _journal_remove(self, job):
+        # After shutdown() the entry must survive so the next session can resume it.
+        if self.journal is not None and job.journal_entry is not None and not self._closing:
+            self.journal.remove(job.journal_entry)
+            job.journal_entry = None
+
+    # --- Scheduling ---
+    def _schedule(self):
+        """Starts pending jobs until the pool is full. Caller holds the lock."""
+        started = []
+        while self._pending and len(self._running) < self._max_workers and not self._closing:
+            job = self._next_pending()
+            if job is None:
+                break
+            job.status = RUNNING
+            job.attempts += 1
+            self._running.add(job.id)
+            started.append(job)
+        # The whole batch is allotted at once, so the running jobs' shares change only once.
+        if self.bandwidth is not None and started:
+            allotments = self.bandwidth.allot({job.id: self._job_options(job).get("rate_limit") for job in started})
+            for job in started:
+                job.allotment = allotments[job.id]
+        for job in started:
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+        if not self._pending and not self._running:
+            self._idle.notify_all()
+
+    def _next_pending(self):
+        """Takes the first pending job that may start now, or None. Caller holds the lock."""
+        if self.retry_policy is None:
+            return self._pending.popleft()
+        now = time.monotonic()
+        running = Counter(self.jobs[job_id].host for job_id in self._running)
+        for index, job in enumerate(self._pending):
+            if job.retry_at <= now and self.retry_policy.hosts.admits(job.host, running[job.host], now):
+                del self._pending[index]
+                return job
+        # Everything left is waiting on a timer; nothing else would start it.
+        deadlines = [job.retry_at for job in self._pending if job.retry_at > now]
+        resume = self.retry_policy.hosts.next_resume(now)
+        if resume is not None:
+            deadlines.append(resume)
+        if deadlines:
+            self._wake_at(min(deadlines))
+        return None
+
+    def _wake_at(self, when):
+        """Runs the scheduler again at monotonic time ``when``. Caller holds the lock."""
+        if self._wake_timer is not None:
+            if self._wake_deadline <= when:
+                return
+            self._wake_timer.cancel()
+        self._wake_deadline = when
+        self._wake_timer = threading.Timer(max(0.0, when - time.monotonic()), self._wake)
+        self._wake_timer.daemon = True
+        self._wake_timer.start()
+
+    def _wake(self):
+        with self._lock:
+            self._wake_timer = None
+            self._schedule()
+
+    # --- Bandwidth ---
+    def _job_options(self, job):
+        if job.retry_overrides:
+            return dict(job.options, **job.retry_overrides)
+        return job.options
+
+    def _allotted_options(self, job, options):
+        if job.allotment is None:
+            return options
+        rate, fragments = job.allotment
+        return dict(options, rate_limit=rate, concurrent_fragments=fragments or options.get("concurrent_fragments"))
+
+    def _reallot(self, job_ids):
+        """Moves running jobs to their new allotments (a BandwidthScheduler watcher)."""
+        with self._lock:
+            for job_id in job_ids:
+                job = self.jobs.get(job_id)
+                allotment = self.bandwidth.allotment(job_id)
+                if job is None or job.status != RUNNING or allotment is None:
+                    continue
+                previous, job.allotment = job.allotment, allotment
+                # In-process downloads poll job.allotment; a process has to be restarted to change.
+                if job.process is not None and self._downloading(job) and self._needs_restart(previous, allotment):
+                    job.reallot_requested = True
+                    self._terminate(job.process)
+
+    def _downloading(self, job):
+        """False once yt-dlp has moved on to merging or converting, which a restart would only repeat."""
+        return job.progress is None or job.progress.phase == DOWNLOAD
+
+    def _needs_restart(self, previous, allotment):
+        old_rate, new_rate = (previous or (None, None))[0], allotment[0]
+        if old_rate is None or new_rate is None:
+            return old_rate != new_rate
+        return new_rate < old_rate or new_rate > old_rate * (1 + REALLOT_GROWTH)
+
+    def _plan_retry(self, job):
+        """Re-queues a failed job if the retry policy allows it; returns the RetryDecision or None.
+
+        Caller holds the lock.
+        """
+        if self.retry_policy is None or self._closing:
+            return None
+        running = sum(1 for job_id in self._running if self.jobs[job_id].host == job.host)
+        decision = self.retry_policy.decide(job.failure, job.failures, job.host, running)
+        job.failures.append(job.failure)
+        if decision is None:
+            return None
+        job.retry_at = time.monotonic() + decision.delay
+        job.retry_overrides = dict(job.retry_overrides, **decision.overrides)
+        job.progress = None
+        job.files = []
+        self._pending.append(job)
+        if self.journal is not None and job.journal_entry is not None:
+            self.journal.started(job.journal_entry, QUEUED, None, None)
+        self._wake_at(job.retry_at)
+        return decision
+
+    def _run(self, job):
+        job.timeline = JobTimeline(job.id, job.url)
+        job.failure = None
+        job.returncode = None
+        self._notify(job)
+        try:
+            options = self._job_options(job)
+            engine = self.engine
+            if engine is not None:
+                self._run_in_process(job, engine, options)
+            else:
+                self._run_process(job, options)
+            if job.returncode == 0 and self.archive is not None:
+                self._record_files(job)
+        except Exception as e:
+            job.returncode = -1
+            if self.on_output:
+                self.on_output(job, f"Error during download: {e}")
+
+        retry = None
+        with self._lock:
+            job.process = None
+            if job.cancel_requested:
+                job.status = CANCELLED
+            elif job.returncode == 0:
+                job.status = DONE
+                job.percent = 100.0
+                if self.retry_policy is not None:
+                    self.retry_policy.succeeded(job.failures, job.host)
+            else:
+                job.failure = job.failure or UNKNOWN
+                retry = self._plan_retry(job)
+                job.status = QUEUED if retry is not None else FAILED
+            outcome = {"failure": job.failure} if job.failure and job.status != DONE else {}
+            job.timeline.close(status=job.status, returncode=job.returncode, attempt=job.attempts, **outcome)
+            if retry is None:
+                self._journal_remove(job)
+            self._running.discard(job.id)
+            job.allotment = None
+            job.reallot_requested = False
+            if self.bandwidth is not None:
+                self.bandwidth.release(job.id)
+        if retry is not None and self.on_output:
+            self.on_output(job, retry.describe())
+        self._notify(job)
+        with self._lock:
+            self._schedule()
+
+    def _run_process(self, job, options):
+        """Runs yt-dlp for one attempt, restarting it whenever _reallot stopped it for new limits."""
+        while True:
+            self._spawn(job, self._allotted_options(job, options))
+            with self._lock:
+                job.process = None
+                restart = (job.reallot_requested and job.returncode != 0 and not job.cancel_requested
+                           and not self._closing)
+                job.reallot_requested = False
+            if not restart:
+                return
+            # The stopped process's exit is not a failure of the attempt.
+            job.failure = None
+            rate, fragments = job.allotment
+            job.timeline.end("download", reallotted=True)
+            job.timeline.instant("reallot", rate=rate, fragments=fragments)
+            if self.on_output:
+                self.on_output(job, f"[bandwidth] Restarting at {format_bytes(rate) + '/s' if rate else 'full speed'}"
+                                    f" with {fragments or 1} fragment connection(s)")
+
+    def _spawn(self, job, options):
+        timeline = job.timeline
+        job.command = self.build_command(job.url, options)
+        timeline.begin("spawn")
+        process = subprocess.Popen(job.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, bufsize=1, encoding='utf-8', errors='replace',
+                                   startupinfo=hidden_startupinfo(), **process_group_kwargs())
+        timeline.end("spawn", pid=process.pid)
+        timeline.begin("startup")
+        with self._lock:
+            job.process = process
+            if job.cancel_requested or self._closing:
+                self._terminate(process)
+        if self.journal is not None:
+            self.journal.started(job.journal_entry, RUNNING, process.pid, job.command[0])
+        journaled = [None, 0.0]
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            self._handle_output(job, line, self.parse_progress(line), journaled)
+        process.wait()
+        job.returncode = process.returncode
+
+    def _run_in_process(self, job, engine, options):
+        job.command = None
+        job.timeline.begin("startup")
+        if self.journal is not None:
+            self.journal.started(job.journal_entry, RUNNING, None, LIBRARY_EXECUTABLE)
+        journaled = [None, 0.0]
+        # The allotment may change mid-download; the engine applies it on the next progress tick.
+        rate_limit = (lambda: job.allotment[0] if job.allotment else None) if self.bandwidth is not None else None
+        # Log lines are never parsed: the hooks already deliver every record.
+        job.returncode = engine.download(
+            job.url, self._allotted_options(job, options),
+            on_record=lambda record: self._handle_output(job, None, record, journaled),
+            on_output=lambda line: self._handle_output(job, line, None, journaled),
+            cancelled=lambda: job.cancel_requested or self._closing, rate_limit=rate_limit)
+
+    def _handle_output(self, job, line, record, journaled):
+        """Applies one output line and/or ProgressRecord to a running job.
+
+        ``journaled`` holds the last journaled part path and time, for throttling.
+        """
+        timeline = job.timeline
+        if not timeline.instants:
+            timeline.instant("first-output")
+        if record is None and line is not None and (failure := classify_line(line)):
+            job.failure = worse_failure(job.failure, failure)
+        if record is not None:
+            timeline.observe(record)
+        if record is not None and record.phase == FILE_DONE:
+            stored = self.store is not None and job.options.get("store")
+            if self.sidecars is not None and self.sidecars.wants(job.options):
+                # A file linked from the store already carries its embeds.
+                held = stored and self.store.holds(record.info, job.options)
+                self._attach_sidecars(job, record.info, embed=not held)
+            if stored:
+                self._store_file(job, record.info)
+            job.files.append(record.info)
+            if self.on_file:
+                self.on_file(job, record.info)
+        elif record is not None:
+            job.progress = record
+            if record.percent is not None:
+                job.percent = record.percent
+            if self.journal is not None and record.phase == DOWNLOAD and record.filename:
+                # Throttled: progress ticks arrive many times a second.
+                part_path = record.filename + ".part"
+                if part_path != journaled[0] or time.monotonic() - journaled[1] >= PROGRESS_INTERVAL:
+                    self.journal.progress(job.journal_entry, part_path, record.downloaded_bytes)
+                    journaled[:] = part_path, time.monotonic()
+            if record.structured:
+                line = record.describe()
+        if self.on_output and line is not None:
+            self.on_output(job, line)
+        if record is not None:
+            self._notify(job)
+
+    def _attach_sidecars(self, job, info, embed=True):
+        job.timeline.begin("sidecars")
+        on_output = (lambda line: self.on_output(job, line)) if self.on_output else None
+        try:
+            self.sidecars.finish(job.url, job.options, info, self.engine, on_output=on_output,
+                                 cancelled=lambda: job.cancel_requested or self._closing, embed=embed)
+        except Exception as e:
+            # The file itself is fine; it just goes without its sidecars.
+            if on_output:
+                on_output(f"[sidecars] Failed to add subtitles or thumbnail: {e}")
+        finally:
+            job.timeline.end("sidecars")
+
+    def _store_file(self, job, info):
+        job.timeline.begin("store")
+        try:
+            kind = self.store.ingest(info, job.options)
+        except Exception as e:
+            # The file stays where it is, just not deduplicated.
+            if self.on_output:
+                self.on_output(job, f"[store] Failed to store {info.get('filepath')}: {e}")
+        else:
+            if kind and kind != "hardlink" and self.on_output:
+                self.on_output(job, f"[store] {os.path.basename(info['filepath'])} is a {kind} into the store")
+        finally:
+            job.timeline.end("store")
+
+    def _terminate(self, process):
+        """Stops yt-dlp together with any ffmpeg it has started."""
+        try:
+            kill_process_tree(process.pid)
+        except OSError:
+            pass
+
+    def _notify(self, job):
+        if self.on_update:
+            self.on_update(job)
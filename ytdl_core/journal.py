@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import sqlite3
+import secrets
+import threading
+
+from .processes import pid_alive, process_start_time, process_tree_alive, kill_process_tree
+
+# --- Constants ---
+JOURNAL_DB = "jobs-journal.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    entry      INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner      INTEGER NOT NULL,
+    url        TEXT NOT NULL,
+    options    TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    pid        INTEGER,
+    executable TEXT,
+    part_path  TEXT,
+    downloaded INTEGER,
+    created    REAL NOT NULL,
+    updated    REAL NOT NULL,
+    started    REAL,
+    session    TEXT
+);
+"""
+# Added after the first release; older journals get them on open.
+ADDED_COLUMNS = (("started", "REAL"), ("session", "TEXT"))
+
+
+# --- Journal ---
+class JournalEntry:
+    """An unfinished job found in the journal at startup."""
+
+    def __init__(self, row):
+        (self.entry, self.owner, self.url, options, self.status, self.pid, self.executable, self.part_path,
+         self.downloaded, self.created, self.updated, self.started, self.session) = row
+        self.options = json.loads(options)
+
+    @property
+    def part_bytes(self):
+        """Size of the partial download still on disk, or 0."""
+        try:
+            return os.path.getsize(self.part_path) if self.part_path else 0
+        except OSError:
+            return 0
+
+    def __repr__(self):
+        return f"<JournalEntry {self.entry} {self.status} {self.url}>"
+
+
+class JobJournal:
+    """Write-ahead record of queued and running jobs.
+
+    A row is written when a job is queued and updated when its process
+    starts, before the job can make progress, so a crash at any point
+    leaves enough behind to resume it. Rows are deleted once a job
+    finishes. Each row notes the owning process, so a second instance
+    never takes over jobs that are still being run, and the child's start
+    time, so recovery never kills a process that only reuses its PID.
+    Rows also carry a random id for this session, so ``unfinished()``
+    never returns jobs this session queued itself, while still finding
+    the rows of an earlier run that happened to have the same PID.
+    """
+
+    def __init__(self, path=JOURNAL_DB):
+        self.path = path
+        self.session = secrets.token_hex(8)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL keeps every commit durable without rewriting the whole file.
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for name, kind in ADDED_COLUMNS:
+            if name not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def record(self, url, options, status):
+        """Adds a queued job and returns its journal entry id."""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute("INSERT INTO jobs (owner, url, options, status, created, updated, session) "
+                                      "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                      (os.getpid(), url, json.dumps(options), status, now, now, self.session))
+            self._db.commit()
+            return cursor.lastrowid
+
+    def started(self, entry, status, pid, executable):
+        started = process_start_time(pid) if pid else None
+        self._execute("UPDATE jobs SET status = ?, pid = ?, executable = ?, started = ?, updated = ? WHERE entry = ?",
+                      (status, pid, executable, started, time.time(), entry))
+
+    def progress(self, entry, part_path, downloaded):
+        self._execute("UPDATE jobs SET part_path = ?, downloaded = ?, updated = ? WHERE entry = ?",
+                      (part_path, downloaded, time.time(), entry))
+
+    def remove(self, entry):
+        self._execute("DELETE FROM jobs WHERE entry = ?", (entry,))
+
+    def unfinished(self):
+        """Returns entries left behind by instances that are no longer running.
+
+        An owner with this process's PID but another session was an earlier
+        run that had the same PID, so its rows count as left behind.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM jobs WHERE session IS NULL OR session != ? ORDER BY entry",
+                                    (self.session,)).fetchall()
+        entries = [JournalEntry(row) for row in rows]
+        return [e for e in entries if e.owner == os.getpid() or not pid_alive(e.owner)]
+
+    def reap_orphans(self, entries):
+        """Kills the yt-dlp process trees of entries whose owner died mid-download; returns the count."""
+        killed = 0
+        for entry in entries:
+            if entry.session != self.session and entry.pid and process_tree_alive(entry.pid, entry.executable or "",
+                                                                                  entry.started):
+                kill_process_tree(entry.pid)
+                killed += 1
+        return killed
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _execute(self, sql, params):
+        with self._lock:
+            self._db.execute(sql, params)
+            self._db.commit()
@@ -0,0 +1,194 @@
+from bisect import bisect_left, insort
+
+
+# --- Model ---
+class ListModel:
+    """Keyed rows kept filtered and sorted for a virtual view (see listview.VirtualTreeview).
+
+    ``sort_keys`` maps column names to functions of a row giving its sort
+    value (None sorts last either way); ``facets`` maps names to functions
+    giving a value the rows are indexed by, such as a status or a codec;
+    ``search`` gives the text a filter query is matched against. The
+    visible rows are a sorted list of (missing, value, key) tuples, so a
+    changed row moves with one bisect instead of a re-sort, a facet filter
+    starts from the index instead of every row, and typing more of a
+    query only re-checks the rows the shorter query left. Keys must be
+    comparable with each other; listeners are called after every change.
+    """
+
+    def __init__(self, sort_keys, facets=None, search=None, sort=None, descending=False):
+        self.sort_keys = sort_keys
+        self.facets = facets or {}
+        self.search = search
+        self.sort_column = sort
+        self.descending = descending
+        self.rows = {}
+        self.listeners = []
+        self._order = {}
+        self._text = {}
+        self._values = {}
+        self._index = {name: {} for name in self.facets}
+        self._view = []
+        self._query = ()
+        self._query_text = ""
+        self._allowed = {}
+
+    # --- Rows ---
+    def put(self, key, row):
+        """Adds a row or replaces the one with this key, moving it to its place in the view."""
+        self._unlink(key)
+        self._link(key, row)
+        if self._matches(key):
+            insort(self._view, self._order[key])
+        self._changed()
+
+    def update(self, key):
+        """Re-reads a row that was changed in place."""
+        if key in self.rows:
+            self.put(key, self.rows[key])
+
+    def remove(self, key):
+        if key in self.rows:
+            self._unlink(key)
+            self._changed()
+
+    def load(self, items):
+        """Replaces every row with (key, row) pairs, sorting once."""
+        self.rows = {}
+        self._order = {}
+        self._text = {}
+        self._values = {}
+        self._index = {name: {} for name in self.facets}
+        for key, row in items:
+            self._link(key, row)
+        self._rebuild()
+
+    def clear(self):
+        self.load(())
+
+    # --- Filtering and Sorting ---
+    def set_filter(self, text="", **facets):
+        """Shows rows containing every word of ``text`` whose facets are among the given values.
+
+        A facet may be given one value, a collection of values, or None for
+        any. A query that extends the last one, with the same or narrower
+        facets, only re-checks the rows already shown.
+        """
+        text = (text or "").strip().lower()
+        allowed = {name: (set(value) if isinstance(value, (set, frozenset, list, tuple)) else {value})
+                   for name, value in facets.items() if value is not None}
+        unknown = set(allowed) - set(self.facets)
+        if unknown:
+            raise ValueError(f"Unknown facets: {', '.join(sorted(unknown))}")
+        narrower = self._query_text in text and all(name in allowed and allowed[name] <= values
+                                                    for name, values in self._allowed.items())
+        self._query_text = text
+        self._query = tuple(text.split())
+        self._allowed = allowed
+        if narrower:
+            self._view = [order for order in self._view if self._matches(order[-1])]
+            self._changed()
+        else:
+            self._rebuild()
+
+    def sort_by(self, column, descending=False):
+        if column not in self.sort_keys:
+            raise ValueError(f"Unknown sort column: {column}")
+        self.sort_column = column
+        self.descending = descending
+        self._order = {key: self._order_of(key, row) for key, row in self.rows.items()}
+        self._view = sorted(self._order[order[-1]] for order in self._view)
+        self._changed()
+
+    # --- Reading ---
+    def __len__(self):
+        return len(self._view)
+
+    def key_at(self, position):
+        """Key of the row shown at ``position`` (0 is the top)."""
+        if self.descending:
+            position = len(self._view) - 1 - position
+        return self._view[position][-1]
+
+    def keys(self, start=0, stop=None):
+        """Keys of the rows shown from ``start`` up to ``stop``, top first."""
+        size = len(self._view)
+        stop = size if stop is None else min(stop, size)
+        if start >= stop:
+            return []
+        if self.descending:
+            return [order[-1] for order in reversed(self._view[size - stop:size - start])]
+        return [order[-1] for order in self._view[start:stop]]
+
+    def position(self, key):
+        """Where the row with ``key`` is shown, or None when it is filtered out."""
+        order = self._order.get(key)
+        if order is None:
+            return None
+        index = bisect_left(self._view, order)
+        if index == len(self._view) or self._view[index] != order:
+            return None
+        return len(self._view) - 1 - index if self.descending else index
+
+    def counts(self, facet):
+        """{value: rows} over all rows, filtered or not."""
+        return {value: len(keys) for value, keys in self._index[facet].items()}
+
+    # --- Internals ---
+    def _order_of(self, key, row):
+        if self.sort_column is None:
+            return (0, 0, key)
+        value = self.sort_keys[self.sort_column](row)
+        missing = value is None
+        # Reading the view backwards for a descending sort would put missing values first otherwise.
+        return (int(missing != self.descending), 0 if missing else value, key)
+
+    def _link(self, key, row):
+        self.rows[key] = row
+        self._order[key] = self._order_of(key, row)
+        if self.search is not None:
+            self._text[key] = self.search(row).lower()
+        values = self._values[key] = {name: facet(row) for name, facet in self.facets.items()}
+        for name, value in values.items():
+            self._index[name].setdefault(value, set()).add(key)
+
+    def _unlink(self, key):
+        if key not in self.rows:
+            return
+        order = self._order[key]
+        index = bisect_left(self._view, order)
+        if index < len(self._view) and self._view[index] == order:
+            del self._view[index]
+        for name, value in self._values.pop(key).items():
+            keys = self._index[name][value]
+            keys.discard(key)
+            if not keys:
+                del self._index[name][value]
+        del self.rows[key]
+        del self._order[key]
+        self._text.pop(key, None)
+
+    def _matches(self, key):
+        values = self._values[key]
+        for name, allowed in self._allowed.items():
+            if values[name] not in allowed:
+                return False
+        if self._query:
+            text = self._text.get(key, "")
+            return all(word in text for word in self._query)
+        return True
+
+    def _rebuild(self):
+        candidates = None
+        for name, allowed in self._allowed.items():
+            index = self._index[name]
+            keys = set().union(*(index.get(value, ()) for value in allowed))
+            candidates = keys if candidates is None else candidates & keys
+        if candidates is None:
+            candidates = self.rows
+        self._view = sorted(self._order[key] for key in candidates if self._matches(key))
+        self._changed()
+
+    def _changed(self):
+        for listener in self.listeners:
+            listener()
@@ -0,0 +1,224 @@
+import tkinter as tk
+from tkinter import ttk
+
+# --- Constants ---
+SORT_ARROWS = {False: " ▲", True: " ▼"}
+WHEEL_ROWS = 3
+SHIFT_MASK = 0x0001
+CONTROL_MASK = 0x0004
+
+
+# --- Virtual Treeview ---
+class VirtualTreeview(ttk.Frame):
+    """A Treeview showing a ListModel through a fixed pool of ``height`` rows.
+
+    However many rows the model holds, the Treeview only ever has the
+    items on screen: scrolling rewrites their text, and a model change
+    redraws them once per idle round, leaving untouched rows alone.
+    ``row_values(key, row)`` returns an item's (text, values). Selection is
+    kept as model keys, so it survives scrolling, sorting and filtering;
+    click, Shift-click, Ctrl-click and the arrow, page, Home/End and
+    Ctrl+A keys work as in a Treeview. ``on_select`` is called when the
+    selection changes. Headings set up with ``heading(..., sort=column)``
+    sort the model when clicked.
+    """
+
+    def __init__(self, master, model, row_values, columns, height=10, selectmode="extended", on_select=None):
+        super().__init__(master)
+        self.model = model
+        self.row_values = row_values
+        self.height = height
+        self.selectmode = selectmode
+        self.on_select = on_select
+        self.tree = ttk.Treeview(self, columns=columns, height=height, selectmode="none")
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.top = 0
+        self.selected = set()
+        self.anchor = None
+        self.cursor = None
+        self.redraws = 0
+        self._shown = []
+        self._headings = {}
+        self._redraw_pending = False
+        model.listeners.append(self.refresh)
+
+        self.tree.bind("<Button-1>", self.on_click)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-WHEEL_ROWS if e.delta > 0 else WHEEL_ROWS))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(WHEEL_ROWS))
+        for keysym, step in (("Up", -1), ("Down", 1), ("Prior", -height), ("Next", height)):
+            self.tree.bind(f"<{keysym}>", lambda e, step=step: self.move_cursor(step, e.state & SHIFT_MASK))
+        self.tree.bind("<Home>", lambda e: self.move_cursor(-len(self.model), e.state & SHIFT_MASK))
+        self.tree.bind("<End>", lambda e: self.move_cursor(len(self.model), e.state & SHIFT_MASK))
+        self.tree.bind("<Control-a>", self.select_all)
+        self.refresh()
+
+    def destroy(self):
+        if self.refresh in self.model.listeners:
+            self.model.listeners.remove(self.refresh)
+        super().destroy()
+
+    # --- Columns ---
+    def heading(self, column, text, sort=None):
+        """Sets a heading; with ``sort``, clicking it sorts by that model column, again to reverse."""
+        self._headings[column] = (text, sort)
+        command = (lambda: self.toggle_sort(sort)) if sort is not None else ""
+        self.tree.heading(column, text=self._heading_text(column), command=command)
+
+    def column(self, column, **options):
+        self.tree.column(column, **options)
+
+    def toggle_sort(self, column):
+        descending = not self.model.descending if self.model.sort_column == column else False
+        self.model.sort_by(column, descending)
+        for name in self._headings:
+            self.tree.heading(name, text=self._heading_text(name))
+        if self.cursor is not None:
+            self.see(self.cursor)
+
+    def set_filter(self, text="", **facets):
+        """Filters the model (see ListModel.set_filter), keeping the cursor row in view if it still shows."""
+        self.model.set_filter(text, **facets)
+        self.top = 0
+        if self.cursor is not None:
+            self.see(self.cursor)
+
+    def _heading_text(self, column):
+        text, sort = self._headings[column]
+        if sort is not None and sort == self.model.sort_column:
+            return text + SORT_ARROWS[self.model.descending]
+        return text
+
+    # --- Selection ---
+    def selection(self):
+        """Selected keys in display order; rows filtered out of view are not included."""
+        positions = [(self.model.position(key), key) for key in self.selected]
+        return [key for position, key in sorted(p for p in positions if p[0] is not None)]
+
+    def selection_set(self, keys):
+        self.selected = set(keys)
+        self.anchor = self.cursor = next(iter(keys), None)
+        self.refresh()
+        self._notify()
+
+    def select_all(self, event=None):
+        if self.selectmode == "extended":
+            self.selected = set(self.model.keys())
+            self.refresh()
+            self._notify()
+        return "break"
+
+    def on_click(self, event):
+        if self.tree.identify_region(event.x, event.y) in ("heading", "separator"):
+            return None  # Let the Treeview sort or resize columns.
+        self.tree.focus_set()
+        iid = self.tree.identify_row(event.y)
+        if not iid:
+            return "break"
+        key = self._shown[self.tree.index(iid)][0]
+        if self.selectmode == "extended" and event.state & SHIFT_MASK and self.anchor in self.model.rows:
+            self._select_range(self.anchor, key)
+        elif self.selectmode == "extended" and event.state & CONTROL_MASK:
+            self.selected ^= {key}
+            self.anchor = key
+        else:
+            self.selected = {key}
+            self.anchor = key
+        self.cursor = key
+        self.refresh()
+        self._notify()
+        return "break"
+
+    def move_cursor(self, step, extend=False):
+        size = len(self.model)
+        if not size:
+            return "break"
+        position = self.model.position(self.cursor) if self.cursor is not None else None
+        position = 0 if position is None else max(0, min(size - 1, position + step))
+        self.cursor = self.model.key_at(position)
+        if extend and self.selectmode == "extended" and self.anchor in self.model.rows:
+            self._select_range(self.anchor, self.cursor)
+        else:
+            self.selected = {self.cursor}
+            self.anchor = self.cursor
+        self.see(self.cursor)
+        self._notify()
+        return "break"
+
+    def _select_range(self, start, end):
+        first, last = sorted((self.model.position(start), self.model.position(end)),
+                             key=lambda p: -1 if p is None else p)
+        self.selected = set(self.model.keys(first or 0, last + 1))
+
+    def _notify(self):
+        if self.on_select is not None:
+            self.on_select()
+
+    # --- Scrolling ---
+    def see(self, key):
+        """Scrolls the least needed to show the row with ``key``."""
+        position = self.model.position(key)
+        if position is not None:
+            if position < self.top:
+                self.top = position
+            elif position >= self.top + self.height:
+                self.top = position - self.height + 1
+        self.refresh()
+
+    def scroll(self, rows):
+        self.top += rows
+        self.refresh()
+        return "break"
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = round(float(amount) * len(self.model))
+        elif unit == "pages":
+            self.top += int(amount) * self.height
+        else:
+            self.top += int(amount)
+        self.redraw()
+
+    # --- Drawing ---
+    def refresh(self):
+        """Redraws once the current round of events is handled, however many changes arrive before then."""
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self.redraw)
+
+    def redraw(self):
+        """Shows the rows from ``self.top``, rewriting only items whose row, text or selection changed."""
+        self._redraw_pending = False
+        self.redraws += 1
+        model = self.model
+        size = len(model)
+        self.top = max(0, min(self.top, size - self.height))
+        keys = model.keys(self.top, self.top + self.height)
+        items = self.tree.get_children()
+        for iid in items[len(keys):]:
+            self.tree.delete(iid)
+        shown = []
+        selection = []
+        for index, key in enumerate(keys):
+            text, values = self.row_values(key, model.rows[key])
+            row = (key, text, tuple(values))
+            if index < len(items):
+                iid = items[index]
+                if index >= len(self._shown) or self._shown[index] != row:
+                    self.tree.item(iid, text=text, values=values)
+            else:
+                iid = self.tree.insert("", tk.END, text=text, values=values)
+            shown.append(row)
+            if key in self.selected:
+                selection.append(iid)
+        self._shown = shown
+        if tuple(selection) != self.tree.selection():
+            self.tree.selection_set(selection)
+        if size > self.height:
+            self.scrollbar.set(self.top / size, (self.top + self.height) / size)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        # Keys that left the model are dropped from the selection.
+        self.selected &= model.rows.keys()
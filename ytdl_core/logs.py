@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+from collections import deque
+
+# --- Constants ---
+LOGS_DIR = "logs"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+UI_LOG_LINES = 2000
+
+
+# --- Helper Functions ---
+def ensure_logs_dir(logs_dir=LOGS_DIR):
+    """Creates the logs directory if it doesn't exist."""
+    os.makedirs(logs_dir, exist_ok=True)
+
+def open_job_log(job_id, logs_dir=LOGS_DIR):
+    """Opens a new streaming log file for one job attempt."""
+    ensure_logs_dir(logs_dir)
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    return RotatingLogFile(os.path.join(logs_dir, f"log-{timestamp}-job{job_id}.txt"))
+
+
+# --- Log Files ---
+class RotatingLogFile:
+    """Line-buffered log file that rolls over to ``.1``, ``.2``... past max_bytes.
+
+    Lines reach the disk as they are written, so a crash loses at most the
+    line being written, and memory use does not depend on the log length.
+    """
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._size = self._file.tell()
+
+    def write_line(self, line):
+        data = line.rstrip("\n") + "\n"
+        size = len(data.encode("utf-8"))
+        with self._lock:
+            if self._file is None:
+                return
+            if self._size and self._size + size > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._size += size
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.backup_count:
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "w", encoding="utf-8", buffering=1)
+        self._size = 0
+
+
+# --- UI Log Buffer ---
+class LogBuffer:
+    """Fixed-size ring buffer of the most recent log lines for the log widget.
+
+    Producers append from any thread; the UI thread takes the lines added
+    since its last call. When producers outrun the UI, the oldest lines are
+    dropped from memory; they are still in the log files.
+    """
+
+    def __init__(self, max_lines=UI_LOG_LINES):
+        self.max_lines = max_lines
+        self._lines = deque(maxlen=max_lines)
+        self._new = 0
+        self._cleared = False
+        self._lock = threading.Lock()
+
+    def append(self, line):
+        with self._lock:
+            self._lines.append(line)
+            self._new = min(self._new + 1, self.max_lines)
+
+    def clear(self):
+        with self._lock:
+            self._lines.clear()
+            self._new = 0
+            self._cleared = True
+
+    def take(self):
+        """Returns (cleared, new_lines) since the previous call."""
+        with self._lock:
+            cleared, new = self._cleared, self._new
+            self._cleared = False
+            self._new = 0
+            if not new:
+                return cleared, []
+            lines = list(self._lines)[-new:]
+        return cleared, lines
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._lines)
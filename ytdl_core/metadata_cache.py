@@ -0,0 +1,205 @@
+import os
+import re
+import json
+import time
+import zlib
+import hashlib
+import sqlite3
+import threading
+from urllib.parse import urlparse, parse_qs
+
+# --- Constants ---
+DEFAULT_TTL = 4 * 3600  # Signed googlevideo URLs live ~6h; stay well inside that.
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+EXPIRY_MARGIN = 15 * 60
+YOUTUBE_ID_RE = re.compile(r'^[0-9A-Za-z_-]{11}$')
+# Fast path for the common spellings; anything else goes through urlparse.
+YOUTUBE_URL_RE = re.compile(r'^(?:https?://)?(?:www\.|m\.|music\.)?(?:youtube\.com/(?:watch\?(?:[^#]*&)?v=|shorts/|embed/|live/)'
+                            r'|youtu\.be/)([0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])')
+YOUTUBE_HOSTS = ("youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com",
+                 "www.youtube-nocookie.com")
+YOUTUBE_PATH_PREFIXES = ("/shorts/", "/embed/", "/live/", "/v/")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    key      TEXT PRIMARY KEY,
+    url      TEXT NOT NULL,
+    data     BLOB NOT NULL,
+    size     INTEGER NOT NULL,
+    created  REAL NOT NULL,
+    expires  REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed);
+"""
+
+
+# --- Helper Functions ---
+def canonical_video_id(url):
+    """Returns a stable cache key for a video URL.
+
+    YouTube URLs in any of their spellings map to ``youtube:<id>``; anything
+    else falls back to the URL without its fragment.
+    """
+    url = url.strip()
+    if YOUTUBE_ID_RE.match(url):
+        return f"youtube:{url}"
+    if m := YOUTUBE_URL_RE.match(url):
+        return f"youtube:{m.group(1)}"
+    parsed = urlparse(url if "://" in url else "https://" + url)
+    host = (parsed.hostname or "").lower()
+    video_id = None
+    if host in ("youtu.be", "www.youtu.be"):
+        video_id = parsed.path.lstrip("/").split("/")[0]
+    elif host in YOUTUBE_HOSTS:
+        if parsed.path == "/watch":
+            video_id = parse_qs(parsed.query).get("v", [None])[0]
+        else:
+            for prefix in YOUTUBE_PATH_PREFIXES:
+                if parsed.path.startswith(prefix):
+                    video_id = parsed.path[len(prefix):].split("/")[0]
+                    break
+    if video_id and YOUTUBE_ID_RE.match(video_id):
+        return f"youtube:{video_id}"
+    return "url:" + parsed._replace(fragment="").geturl()
+
+def info_expiry(info, default_ttl=DEFAULT_TTL, now=None):
+    """Returns when the format URLs in an info dict go stale.
+
+    Signed stream URLs carry an ``expire=`` timestamp; the earliest one (minus
+    a safety margin) wins over the default TTL.
+    """
+    now = time.time() if now is None else now
+    expires = now + default_ttl
+    for fmt in info.get("formats") or ():
+        stream_url = fmt.get("url") or ""
+        if "expire" not in stream_url:
+            continue
+        try:
+            stamp = int(parse_qs(urlparse(stream_url).query)["expire"][0])
+        except (KeyError, ValueError, IndexError):
+            continue
+        expires = min(expires, stamp - EXPIRY_MARGIN)
+    return expires
+
+
+# --- Cache ---
+class MetadataCache:
+    """On-disk LRU cache of yt-dlp extractor JSON keyed by canonical video ID."""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.cache_dir = cache_dir
+        self.info_dir = os.path.join(cache_dir, "info")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        os.makedirs(self.info_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(cache_dir, "metadata.sqlite3"), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def get(self, url):
+        """Returns the cached info dict for a URL, or None on a miss or expiry."""
+        key = canonical_video_id(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT data, expires FROM metadata WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] <= now:
+                self.expired += 1
+                self.misses += 1
+                self._delete(key)
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE metadata SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, url, info):
+        """Stores an info dict under the URL's canonical ID and trims to size."""
+        key = canonical_video_id(url)
+        now = time.time()
+        data = zlib.compress(json.dumps(info, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (key, url, data, len(data), now, info_expiry(info, self.ttl, now), now))
+            self._remove_info_file(key)
+            self._evict()
+            self._db.commit()
+
+    def info_json_path(self, url):
+        """Writes the cached info to a file for ``yt-dlp --load-info-json``.
+
+        Returns the file path, or None when the URL is not cached.
+        """
+        info = self.get(url)
+        if info is None:
+            return None
+        path = self._info_file(canonical_video_id(url))
+        if not os.path.exists(path):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            os.replace(tmp_path, path)
+        return path
+
+    def invalidate(self, url):
+        with self._lock:
+            self._delete(canonical_video_id(url))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            keys = [row[0] for row in self._db.execute("SELECT key FROM metadata")]
+            for key in keys:
+                self._delete(key)
+            self._db.commit()
+
+    def stats(self):
+        """Returns hit/miss counters and current cache usage."""
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM metadata").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- Internals (caller holds the lock) ---
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM metadata").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM metadata ORDER BY accessed").fetchall():
+            self._delete(key)
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _delete(self, key):
+        self._db.execute("DELETE FROM metadata WHERE key = ?", (key,))
+        self._remove_info_file(key)
+
+    def _info_file(self, key):
+        return os.path.join(self.info_dir, hashlib.sha1(key.encode('utf-8')).hexdigest()[:20] + ".info.json")
+
+    def _remove_info_file(self, key):
+        try:
+            os.remove(self._info_file(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,171 @@
+import os
+import time
+import shutil
+import threading
+from concurrent import futures
+
+from .archive import archive_key
+from .compress import CompressionEngine, COMPRESS_DIR
+from .commands import YTDLP_EXECUTABLE, CACHE_DIR, skips_archived
+from .sidecars import (DEFAULT_SIDECAR_WORKERS, SIDECAR_DIR, THUMBNAIL_FORMAT, SidecarFetcher, embed_sidecars,
+                       sidecar_langs, wants_sidecars)
+
+# --- Constants ---
+PENDING_PER_ENCODER = 2
+SIDECAR_WAIT = 120
+SIDECAR_POLL = 0.25
+
+
+class CompressStage:
+    """Post-download stage that hands finished files to a compression pool.
+
+    Downloads keep running while earlier files encode. At most
+    ``max_pending`` files may be queued or encoding; past that, ``offer()``
+    blocks the calling download worker until an encode finishes, so a fast
+    link cannot pile up unbounded encode work.
+    """
+
+    def __init__(self, output_dir=COMPRESS_DIR, encoder="cpu", max_jobs=None, max_pending=None, on_update=None):
+        self.engine = CompressionEngine(output_dir, encoder, max_jobs=max_jobs, on_update=on_update)
+        self.max_pending = max_pending or self.engine.max_jobs * PENDING_PER_ENCODER
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._futures = []
+        self._lock = threading.Lock()
+        self.blocked_time = 0.0
+
+    def offer(self, path):
+        """Queues one finished download for compression; blocks while the stage is full."""
+        if not self._slots.acquire(blocking=False):
+            start = time.perf_counter()
+            self._slots.acquire()
+            with self._lock:
+                self.blocked_time += time.perf_counter() - start
+        try:
+            future = self.engine.submit(path)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def pending(self):
+        with self._lock:
+            return sum(not future.done() for future in self._futures)
+
+    def wait(self):
+        """Blocks until every offered file is compressed; returns their tasks."""
+        with self._lock:
+            futures = list(self._futures)
+        return [future.result() for future in futures]
+
+    def cancel_all(self):
+        self.engine.cancel_all()
+
+    def shutdown(self, wait=True):
+        self.engine.shutdown(wait=wait)
+
+
+
+class SidecarStage:
+    """Fetches subtitles, thumbnails and info JSON beside the media download, then adds them to each file.
+
+    ``prefetch()`` starts a job's fetch when it is queued, on a pool shared
+    by every job and playlist. ``finish()`` runs on the download worker
+    once a file is done: it waits for that video's sidecars (usually
+    already there), copies the requested ones next to the file and remuxes
+    the embedded ones in, so the job completes with its final file.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_workers=DEFAULT_SIDECAR_WORKERS, executable=YTDLP_EXECUTABLE,
+                 metadata_cache=None, archive=None, wait_timeout=SIDECAR_WAIT):
+        self.fetcher = SidecarFetcher(os.path.join(cache_dir, SIDECAR_DIR), max_workers, executable, metadata_cache)
+        self.archive = archive
+        self.wait_timeout = wait_timeout
+        self.embedded = 0
+        self.wait_time = 0.0
+        self.remux_time = 0.0
+        self._lock = threading.Lock()
+
+    def wants(self, options):
+        return wants_sidecars(options)
+
+    def prefetch(self, url, options, engine=None):
+        """Starts fetching a queued job's sidecars; a playlist is expanded into one fetch per entry."""
+        if not wants_sidecars(options):
+            return None
+        if options["playlist"]:
+            # yt-dlp skips archived entries, so their sidecars are not needed either.
+            skip = self.archive.__contains__ if self.archive is not None and skips_archived(options) else None
+            return self.fetcher.fetch_playlist(url, sidecar_langs(options), engine, skip)
+        return self.fetcher.fetch(url, sidecar_langs(options), engine)
+
+    def finish(self, url, options, info, engine=None, on_output=None, cancelled=None, embed=True):
+        """Places one finished file's sidecars; blocks until they are fetched. Returns the embedded count.
+
+        Without ``embed`` only the side files are written, for a file that already has its embeds.
+        """
+        path = info.get("filepath")
+        if not wants_sidecars(options) or not path or not os.path.exists(path):
+            return 0
+        on_output = on_output or (lambda line: None)
+        langs = sidecar_langs(options)
+        key = archive_key(info["extractor_key"], info["id"]) if info.get("extractor_key") and info.get("id") else None
+        # A playlist entry is fetched by its own URL if the prefetch has not reached it.
+        task = self.fetcher.fetch(info.get("webpage_url") or url if options["playlist"] else url, langs, engine, key)
+
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.wait_timeout
+        while not futures.wait([task], SIDECAR_POLL).done:
+            if cancelled is not None and cancelled():
+                return 0
+            if time.monotonic() > deadline:
+                on_output(f"[sidecars] Subtitles and thumbnail not ready after {self.wait_timeout}s; "
+                          f"keeping {os.path.basename(path)} without them")
+                return 0
+        waited = time.perf_counter() - start
+        if task.exception() is not None:
+            on_output(f"[sidecars] Couldn't fetch subtitles and thumbnail: {task.exception()}")
+            return 0
+        sidecars = task.result()
+
+        stem = os.path.splitext(path)[0]
+        subtitles = sidecars.subtitle_files(langs) if options["subtitles"] else []
+        copies = [(source, f"{stem}.{lang}{os.path.splitext(source)[1]}") for lang, source in subtitles]
+        if options.get("thumbnail") and sidecars.thumbnail:
+            copies.append((sidecars.thumbnail, f"{stem}{os.path.splitext(sidecars.thumbnail)[1]}"))
+        if options.get("info_json") and sidecars.info_json:
+            copies.append((sidecars.info_json, stem + ".info.json"))
+        for source, target in copies:
+            shutil.copyfile(source, target)
+        if options["subtitles"] and not subtitles:
+            on_output(f"[sidecars] No subtitles in {', '.join(langs)}")
+        if not embed:
+            return 0
+
+        start = time.perf_counter()
+        thumbnail = sidecars.thumbnail if options.get("thumbnail") and options.get("embed_thumbnail") else None
+        added, cover = embed_sidecars(path, subtitles if options.get("embed_subtitles") else [], thumbnail)
+        remuxed = time.perf_counter() - start
+        if added or cover:
+            parts = [f"{added} subtitle track(s)"] if added else []
+            parts += ["the thumbnail"] if cover else []
+            on_output(f"[sidecars] Embedded {' and '.join(parts)} into {os.path.basename(path)}")
+        elif thumbnail and not thumbnail.endswith("." + THUMBNAIL_FORMAT):
+            on_output(f"[sidecars] Thumbnail was not converted to {THUMBNAIL_FORMAT}; not embedded")
+        with self._lock:
+            self.embedded += added + cover
+            self.wait_time += waited
+            self.remux_time += remuxed
+        return added + cover
+
+    def stats(self):
+        with self._lock:
+            stats = {"embedded": self.embedded, "download_wait": round(self.wait_time, 3),
+                     "remux": round(self.remux_time, 3)}
+        stats.update(self.fetcher.stats())
+        return stats
+
+    def shutdown(self, wait=True):
+        self.fetcher.shutdown(wait=wait)
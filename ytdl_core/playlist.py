@@ -0,0 +1,167 @@
+import json
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from .jobs import hidden_startupinfo
+from .thumbnails import pick_thumbnail
+
+# --- Constants ---
+DETAIL_BATCH_SIZE = 8
+DETAIL_PARALLEL_BATCHES = 3
+STDERR_TAIL_LINES = 20  # Kept for the error message when a flat extraction fails.
+
+
+class ExtractionError(Exception):
+    """yt-dlp exited with an error while extracting metadata."""
+
+
+# --- Entries ---
+class PlaylistEntry:
+    """One playlist item from a flat extraction; ``info`` is filled in lazily."""
+
+    def __init__(self, index, data):
+        self.index = index
+        self.id = data.get("id")
+        self.extractor_key = data.get("ie_key")
+        self.url = data.get("url") or data.get("webpage_url") or self.id
+        self.title = data.get("title") or self.id or "N/A"
+        self.duration = data.get("duration")
+        self.uploader = data.get("uploader") or data.get("channel")
+        self.thumbnail = pick_thumbnail(data)
+        self.info = None
+
+    @property
+    def loaded(self):
+        return self.info is not None
+
+    def __repr__(self):
+        return f"<PlaylistEntry {self.index} {self.id} {self.title!r}>"
+
+
+def iter_flat_playlist(url, executable):
+    """Yields PlaylistEntry objects as a single flat extraction prints them.
+
+    Entries are streamed line by line, so the first rows are available long
+    before yt-dlp has walked the whole playlist. stderr is drained on its own
+    thread so a chatty extractor cannot fill the pipe and stall stdout.
+    """
+    cmd = [executable, "--flat-playlist", "--dump-json", "--yes-playlist", "--no-warnings", url]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1,
+                               encoding='utf-8', errors='replace', startupinfo=hidden_startupinfo())
+    stderr_tail = []
+    reader = threading.Thread(target=_drain_stderr, args=(process.stderr, stderr_tail), daemon=True)
+    reader.start()
+    try:
+        index = 0
+        for line in process.stdout:
+            line = line.strip()
+            if not line.startswith("{"):
+                continue
+            index += 1
+            yield PlaylistEntry(index, json.loads(line))
+        process.wait()
+        reader.join()
+        if process.returncode != 0:
+            raise ExtractionError("\n".join(stderr_tail) or f"yt-dlp exited with code {process.returncode}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def _drain_stderr(stream, tail):
+    for line in stream:
+        line = line.strip()
+        if line:
+            tail.append(line)
+            del tail[:-STDERR_TAIL_LINES]
+
+
+# --- Lazy Detail Loading ---
+class PlaylistDetailLoader:
+    """Loads full per-entry format data in parallel batches on demand.
+
+    Each batch is one ``yt-dlp --dump-json`` process over several URLs, and
+    results are stored in the metadata cache so later downloads can reuse
+    them. Cache lookups happen on the pool too, so ``request()`` never
+    touches SQLite on the calling (Tk) thread. ``on_info(entry)`` and
+    ``on_error(entry)`` run on pool threads.
+    """
+
+    def __init__(self, executable, cache=None, batch_size=DETAIL_BATCH_SIZE,
+                 max_parallel=DETAIL_PARALLEL_BATCHES):
+        self.executable = executable
+        self.cache = cache
+        self.batch_size = batch_size
+        self._pool = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="playlist-details")
+        self._inflight = set()
+        self._lock = threading.Lock()
+
+    def request(self, entries, on_info, on_error=None):
+        """Schedules detail loading for entries that are not loaded or loading yet."""
+        todo = []
+        with self._lock:
+            for entry in entries:
+                if entry.loaded or not entry.url or entry.url in self._inflight:
+                    continue
+                self._inflight.add(entry.url)
+                todo.append(entry)
+        if todo:
+            self._submit(self._load_cached, todo, on_info, on_error)
+        return len(todo)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, entries, on_info, on_error):
+        try:
+            self._pool.submit(fn, entries, on_info, on_error)
+        except RuntimeError:  # Shut down; the entries stay unloaded.
+            for entry in entries:
+                self._done(entry)
+
+    def _load_cached(self, entries, on_info, on_error):
+        """Fills entries from the metadata cache and batches the rest for yt-dlp."""
+        pending = []
+        for entry in entries:
+            info = self.cache.get(entry.url) if self.cache else None
+            if info is None:
+                pending.append(entry)
+                continue
+            entry.info = info
+            self._done(entry)
+            on_info(entry)
+        for start in range(0, len(pending), self.batch_size):
+            self._submit(self._load_batch, pending[start:start + self.batch_size], on_info, on_error)
+
+    def _load_batch(self, batch, on_info, on_error):
+        # Matched on the URL yt-dlp was given: flat entries may have no ID, and IDs need not be unique.
+        by_url = {entry.url: entry for entry in batch}
+        cmd = [self.executable, "--dump-json", "--no-playlist", "--ignore-errors", "--no-warnings"]
+        cmd.extend(entry.url for entry in batch)
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1,
+                                       encoding='utf-8', errors='replace', startupinfo=hidden_startupinfo())
+            for line in process.stdout:
+                if not line.startswith("{"):
+                    continue
+                info = json.loads(line)
+                entry = by_url.pop(info.get("original_url"), None)
+                if entry is None:
+                    continue
+                entry.info = info
+                if self.cache:
+                    self.cache.put(entry.url, info)
+                self._done(entry)
+                on_info(entry)
+            process.wait()
+        finally:
+            for entry in by_url.values():
+                self._done(entry)
+                if on_error:
+                    on_error(entry)
+
+    def _done(self, entry):
+        with self._lock:
+            self._inflight.discard(entry.url)
@@ -0,0 +1,168 @@
+import os
+import signal
+import threading
+import subprocess
+
+# --- Constants ---
+KILL_GRACE = 3.0
+# Start times read back from procfs can differ from the journaled one by a clock tick and btime rounding.
+START_TIME_SLACK = 2.0
+# What yt-dlp leaves running in its group: an orphaned tree is only killed if it holds nothing else.
+TREE_EXECUTABLES = ("yt-dlp", "yt_dlp", "ffmpeg", "ffprobe")
+CREATE_NEW_PROCESS_GROUP = getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+# --- Helper Functions ---
+def process_group_kwargs():
+    """Popen keyword arguments that give the child its own process group.
+
+    yt-dlp starts ffmpeg for merging and post-processing; a separate group
+    lets kill_process_tree() take those down with it.
+    """
+    if os.name == 'nt':
+        return {"creationflags": CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+def pid_alive(pid):
+    if not pid or pid <= 0:
+        return False
+    if os.name == 'nt':
+        return str(pid) in _tasklist(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return _proc_state(pid) != "Z"
+
+def process_matches(pid, executable):
+    """True when pid is alive and looks like an instance of executable.
+
+    Guards recovery against killing an unrelated process that has since
+    been given a recycled PID.
+    """
+    name = os.path.basename(executable).lower()
+    if os.name == 'nt':
+        return name in _tasklist(pid).lower()
+    if not pid_alive(pid):
+        return False
+    cmdline = _cmdline(pid)
+    if cmdline is None:
+        return True  # No procfs (macOS): the PID check is all we have.
+    return os.path.splitext(name)[0] in cmdline
+
+def process_start_time(pid):
+    """When pid started, in seconds since the epoch, or None where procfs can't tell."""
+    stat = _proc_stat(pid)
+    boot = _boot_time()
+    if stat is None or boot is None:
+        return None
+    try:
+        return boot + int(stat[19]) / os.sysconf("SC_CLK_TCK")
+    except (IndexError, ValueError, OSError):
+        return None
+
+def process_tree_alive(pid, executable, started=None):
+    """True when pid is still the process that was started, or its group holds only what it left running.
+
+    ``started`` is the process_start_time() journaled at launch; a PID
+    reused since (after a reboot or wrap-around) doesn't match it. yt-dlp
+    dies on a broken stdout pipe when its parent crashes, leaving any
+    ffmpeg it started behind in the group; once the leader is gone, the
+    group counts only if every member is yt-dlp, ffmpeg or ffprobe started
+    after the journaled time, so an unrelated group that happens to share
+    the number is never reported. Without procfs only the leader is checked.
+    """
+    if pid_alive(pid):
+        return process_matches(pid, executable) and _started_at(pid, started)
+    if os.name == 'nt':
+        return False
+    members = _group_members(pid)
+    if not members:
+        return False
+    names = {os.path.splitext(os.path.basename(executable).lower())[0], *TREE_EXECUTABLES}
+    for member in members:
+        cmdline = _cmdline(member) or ""
+        if not any(name and name in cmdline for name in names):
+            return False
+        begun = process_start_time(member)
+        if started is not None and (begun is None or begun < started - START_TIME_SLACK):
+            return False
+    return True
+
+def kill_process_tree(pid, grace=KILL_GRACE):
+    """Terminates pid and every process it started; escalates to a hard kill after grace seconds."""
+    if os.name == 'nt':
+        subprocess.run(["taskkill", "/PID", str(pid), "/T", "/F"], capture_output=True,
+                       creationflags=CREATE_NO_WINDOW)
+        return
+    try:
+        os.killpg(pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        return
+    timer = threading.Timer(grace, _hard_kill_group, args=(pid,))
+    timer.daemon = True
+    timer.start()
+
+def _hard_kill_group(pgid):
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def _started_at(pid, started):
+    if started is None:
+        return True  # Journaled before start times were recorded.
+    begun = process_start_time(pid)
+    return begun is None or abs(begun - started) <= START_TIME_SLACK
+
+def _proc_stat(pid):
+    """Fields of /proc/<pid>/stat after the command name (state first), or None without procfs."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            return f.read().rsplit(b")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+
+def _proc_state(pid):
+    """Single-letter state from /proc/<pid>/stat ('Z' for zombies), or None without procfs."""
+    stat = _proc_stat(pid)
+    return stat[0].decode() if stat else None
+
+def _cmdline(pid):
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().decode("utf-8", "replace").lower()
+    except OSError:
+        return None
+
+def _boot_time():
+    try:
+        with open("/proc/stat", "rb") as f:
+            for line in f:
+                if line.startswith(b"btime "):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _group_members(pgid):
+    """PIDs in process group pgid (zombies excluded), or None without procfs."""
+    try:
+        names = os.listdir("/proc")
+    except OSError:
+        return None
+    members = []
+    for name in names:
+        if name.isdigit():
+            stat = _proc_stat(int(name))
+            if stat is not None and len(stat) > 2 and stat[0] != b"Z" and stat[2] == str(pgid).encode():
+                members.append(int(name))
+    return members
+
+def _tasklist(pid):
+    result = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/FO", "CSV", "/NH"], capture_output=True,
+                            text=True, creationflags=CREATE_NO_WINDOW)
+    return result.stdout
@@ -0,0 +1,178 @@
+import re
+import json
+
+# --- Progress Protocol ---
+# yt-dlp prints one JSON object per progress tick after this marker, so the
+# hot path is a startswith() check plus json.loads instead of a regex.
+PROGRESS_MARKER = "[ytdl-progress] "
+DOWNLOAD_FIELDS = "status,downloaded_bytes,total_bytes,total_bytes_estimate,speed,eta,fragment_index,fragment_count,filename"
+POSTPROCESS_FIELDS = "status,postprocessor"
+DOWNLOAD_TEMPLATE = f"download:{PROGRESS_MARKER}download %(progress.{{{DOWNLOAD_FIELDS}}})j"
+POSTPROCESS_TEMPLATE = f"postprocess:{PROGRESS_MARKER}postprocess %(progress.{{{POSTPROCESS_FIELDS}}})j"
+# Printed once per final file after yt-dlp has moved it into place.
+FILE_DONE_FIELDS = "id,extractor_key,format_id,filepath,webpage_url"
+FILE_DONE_TEMPLATE = f"after_move:{PROGRESS_MARKER}file %(.{{{FILE_DONE_FIELDS}}})j"
+
+# --- Phases ---
+DOWNLOAD = "download"
+MERGE = "merge"
+EXTRACT_AUDIO = "extract-audio"
+EMBED_SUBS = "embed-subs"
+POSTPROCESS = "postprocess"
+FILE_DONE = "file-done"
+
+# Matched against yt-dlp postprocessor keys ("FFmpegMerger", ...) and the
+# "[Merger]"-style prefixes of its plain-text output.
+POSTPROCESSOR_PHASES = (
+    ("Merger", MERGE),
+    ("ExtractAudio", EXTRACT_AUDIO),
+    ("EmbedSubtitle", EMBED_SUBS),
+)
+
+# Plain "[download]  42.0% of ..." lines from processes started without the template.
+LEGACY_PROGRESS_RE = re.compile(r'\[download\]\s+([\d\.]+)%')
+LEGACY_STAGE_RE = re.compile(r'^\[(Merger|ExtractAudio|EmbedSubtitle)\]')
+
+
+# --- Helper Functions ---
+def progress_args():
+    """Returns the yt-dlp arguments that switch on the JSON progress protocol."""
+    # --print implies --quiet; --no-quiet keeps the regular log lines coming.
+    return ["--newline", "--progress-template", DOWNLOAD_TEMPLATE, "--progress-template", POSTPROCESS_TEMPLATE,
+            "--print", FILE_DONE_TEMPLATE, "--no-quiet"]
+
+def postprocessor_phase(name):
+    for key, phase in POSTPROCESSOR_PHASES:
+        if key in name:
+            return phase
+    return POSTPROCESS
+
+def format_bytes(n):
+    if n is None:
+        return "?"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.2f}{unit}"
+        n /= 1024
+    return f"{n:.2f}TiB"
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    h, rem = divmod(int(seconds), 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+# --- Progress Record ---
+class ProgressRecord:
+    """One parsed progress tick from yt-dlp."""
+
+    __slots__ = ("phase", "status", "downloaded_bytes", "total_bytes", "speed", "eta",
+                 "fragment_index", "fragment_count", "filename", "info", "legacy_percent")
+
+    def __init__(self, phase, status, downloaded_bytes=None, total_bytes=None, speed=None, eta=None,
+                 fragment_index=None, fragment_count=None, filename=None, info=None, legacy_percent=None):
+        self.phase = phase
+        self.status = status
+        self.downloaded_bytes = downloaded_bytes
+        self.total_bytes = total_bytes
+        self.speed = speed
+        self.eta = eta
+        self.fragment_index = fragment_index
+        self.fragment_count = fragment_count
+        self.filename = filename
+        # id/extractor_key/format_id of a finished file (FILE_DONE records only).
+        self.info = info
+        # Set only for records scraped from plain-text output.
+        self.legacy_percent = legacy_percent
+
+    @property
+    def structured(self):
+        """True when the record came from the JSON progress protocol."""
+        return self.legacy_percent is None
+
+    @property
+    def percent(self):
+        """Download percentage, or None when yt-dlp does not know the total."""
+        if self.phase != DOWNLOAD:
+            return None
+        if self.legacy_percent is not None:
+            return self.legacy_percent
+        if self.status == "finished":
+            return 100.0
+        if self.downloaded_bytes is not None and self.total_bytes:
+            return min(100.0, self.downloaded_bytes * 100.0 / self.total_bytes)
+        return None
+
+    def describe(self):
+        """Human-readable log line in the spirit of yt-dlp's own output."""
+        if self.phase == FILE_DONE:
+            return f"[{self.phase}] {self.filename}"
+        if self.phase != DOWNLOAD:
+            return f"[{self.phase}] {self.status}"
+        percent = self.percent
+        text = f"[download] {percent:5.1f}%" if percent is not None else "[download]   ?.?%"
+        text += f" of {format_bytes(self.total_bytes)}"
+        if self.speed is not None:
+            text += f" at {format_bytes(self.speed)}/s"
+        text += f" ETA {format_eta(self.eta)}"
+        if self.fragment_count:
+            text += f" (frag {self.fragment_index}/{self.fragment_count})"
+        return text
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__ if name != "legacy_percent"}
+        data["percent"] = self.percent
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a record from to_dict(); a percent its byte counts don't give was scraped from text."""
+        record = cls(**{name: data.get(name) for name in cls.__slots__ if name != "legacy_percent"})
+        if data.get("percent") != record.percent:
+            record.legacy_percent = data["percent"]
+        return record
+
+    def __repr__(self):
+        return f"<ProgressRecord {self.describe()}>"
+
+
+def progress_record(kind, data):
+    """Builds a ProgressRecord from a progress-template payload or a YoutubeDL hook dict.
+
+    ``kind`` is "download", "postprocess" or "file", as after PROGRESS_MARKER.
+    """
+    if kind == "postprocess":
+        return ProgressRecord(postprocessor_phase(data.get("postprocessor") or ""), data.get("status"))
+    if kind == "file":
+        return ProgressRecord(FILE_DONE, "finished", filename=data.get("filepath"), info=data)
+    return ProgressRecord(
+        DOWNLOAD, data.get("status"),
+        downloaded_bytes=data.get("downloaded_bytes"),
+        total_bytes=data.get("total_bytes") or data.get("total_bytes_estimate"),
+        speed=data.get("speed"),
+        eta=data.get("eta"),
+        fragment_index=data.get("fragment_index"),
+        fragment_count=data.get("fragment_count"),
+        filename=data.get("filename"),
+    )
+
+def parse_progress_line(line):
+    """Parses one line of yt-dlp output into a ProgressRecord, or returns None."""
+    if line.startswith(PROGRESS_MARKER):
+        kind, _, payload = line[len(PROGRESS_MARKER):].partition(" ")
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return None
+        return progress_record(kind, data)
+
+    if not line.startswith("["):
+        return None
+    if m := LEGACY_PROGRESS_RE.match(line):
+        percent = float(m.group(1))
+        return ProgressRecord(DOWNLOAD, "finished" if percent >= 100 else "downloading", legacy_percent=percent)
+    if m := LEGACY_STAGE_RE.match(line):
+        return ProgressRecord(postprocessor_phase(m.group(1)), "started", legacy_percent=0.0)
+    return None
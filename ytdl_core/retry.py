@@ -0,0 +1,226 @@
+import re
+import time
+import random
+from urllib.parse import urlsplit
+
+# --- Failure Classes ---
+DISK_FULL = "disk-full"
+UNSUPPORTED = "unsupported"
+UNAVAILABLE = "unavailable"
+LOGIN_REQUIRED = "login-required"
+RATE_LIMITED = "rate-limited"
+FORBIDDEN = "forbidden"
+RESUME_FAILED = "resume-failed"
+POSTPROCESS = "postprocess"
+FRAGMENT = "fragment"
+NETWORK = "network"
+UNKNOWN = "unknown"
+
+# First match wins, so a line is filed under its most telling cause.
+FAILURE_PATTERNS = (
+    (DISK_FULL, r"No space left on device|Errno 28|Disk quota exceeded"),
+    (UNSUPPORTED, r"Unsupported URL|is not a valid URL"),
+    (UNAVAILABLE, r"Video unavailable|Private video|video is private|has been removed|is not available|"
+                  r"members-only|account .* terminated|HTTP Error 404|HTTP Error 410"),
+    (RATE_LIMITED, r"HTTP Error 429|Too Many Requests|confirm you.re not a bot|rate.?limit"),
+    (LOGIN_REQUIRED, r"Sign in to confirm|login required|requires authentication|--cookies"),
+    (FORBIDDEN, r"HTTP Error 403|Forbidden"),
+    (RESUME_FAILED, r"HTTP Error 416|Requested Range Not Satisfiable|Unable to resume"),
+    (POSTPROCESS, r"Postprocessing:|ffmpeg exited|Conversion failed|unable to merge"),
+    (FRAGMENT, r"fragment"),
+    (NETWORK, r"timed out|Connection (?:reset|refused|aborted)|Remote end closed|IncompleteRead|"
+              r"name resolution|Network is unreachable|HTTP Error 5\d\d|Unable to download (?:webpage|API page)"),
+)
+FAILURE_RES = tuple((name, re.compile(pattern, re.IGNORECASE)) for name, pattern in FAILURE_PATTERNS)
+FAILURE_RANK = {name: rank for rank, (name, _) in enumerate(FAILURE_PATTERNS + ((UNKNOWN, None),))}
+# yt-dlp reports failures as "ERROR: ..." and retried requests as "Got error: ..."; other lines are progress.
+ERROR_MARKERS = ("ERROR", "Got error")
+
+# --- Constants ---
+DEFAULT_RETRIES = 5
+MAX_DELAY = 15 * 60
+HOST_LIMIT_CEILING = 16
+HOST_ALIASES = {"youtu.be": "youtube.com", "youtube-nocookie.com": "youtube.com"}
+HOST_PREFIXES = ("www.", "m.", "music.")
+
+
+# --- Helper Functions ---
+def classify_line(line):
+    """Returns the failure class a yt-dlp output line reports, or None for anything else."""
+    if not line or not any(marker in line for marker in ERROR_MARKERS):
+        return None
+    for name, pattern in FAILURE_RES:
+        if pattern.search(line):
+            return name
+    return UNKNOWN if "ERROR" in line else None
+
+def worse_failure(a, b):
+    """The more telling of two failure classes (either may be None)."""
+    if a is None or b is None:
+        return a or b
+    return a if FAILURE_RANK[a] <= FAILURE_RANK[b] else b
+
+def host_key(url):
+    """The host a URL counts against for rate limiting, e.g. 'youtube.com' for youtu.be links."""
+    host = (urlsplit(url).hostname or "").lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return HOST_ALIASES.get(host, host)
+
+
+# --- Policy ---
+class RetryRule:
+    """How one failure class is retried.
+
+    ``base_delay`` doubles with each retry of the class. ``throttle_host``
+    also lowers the host's concurrency; ``overrides`` are option changes
+    for the retry (a fresh extraction, or a restart instead of resuming
+    the .part file).
+    """
+    __slots__ = ("retries", "base_delay", "throttle_host", "overrides")
+
+    def __init__(self, retries, base_delay=5.0, throttle_host=False, overrides=None):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.throttle_host = throttle_host
+        self.overrides = overrides or {}
+
+NO_RETRY = RetryRule(0)
+RETRY_RULES = {
+    RATE_LIMITED: RetryRule(5, 30.0, throttle_host=True),
+    # Signed media URLs in cached extractor output expire; extract again.
+    FORBIDDEN: RetryRule(2, 5.0, overrides={"reuse_metadata": False}),
+    NETWORK: RetryRule(5, 5.0),
+    FRAGMENT: RetryRule(3, 5.0),
+    # The server rejected the byte range of the .part file, so start it over.
+    RESUME_FAILED: RetryRule(1, 1.0, overrides={"resume_partial": False}),
+    # Downloaded streams are kept; the retry only repeats the merge or conversion.
+    POSTPROCESS: RetryRule(1, 1.0),
+    UNKNOWN: RetryRule(1, 10.0),
+}
+
+
+class RetryDecision:
+    __slots__ = ("failure", "delay", "overrides", "attempt")
+
+    def __init__(self, failure, delay, overrides, attempt):
+        self.failure = failure
+        self.delay = delay
+        self.overrides = overrides
+        self.attempt = attempt
+
+    def describe(self):
+        how = "restarting" if self.overrides.get("resume_partial") is False else "resuming"
+        return f"[retry] {self.failure}: retrying in {self.delay:.1f}s (retry {self.attempt}), {how}"
+
+
+class HostThrottle:
+    """Per-host concurrency limits, halved when a host rate-limits and raised one at a time as it recovers.
+
+    A rate-limited host is also paused until its retry delay has passed.
+    Not locked: JobQueue calls it under its own lock.
+    """
+
+    def __init__(self, ceiling=HOST_LIMIT_CEILING):
+        self.ceiling = ceiling
+        self._limits = {}
+        self._successes = {}
+        self._paused_until = {}
+
+    def admits(self, host, running, now=None):
+        """True when another job for host may start with ``running`` already running there."""
+        now = time.monotonic() if now is None else now
+        if self._paused_until.get(host, 0.0) > now:
+            return False
+        limit = self._limits.get(host)
+        return limit is None or running < limit
+
+    def rate_limited(self, host, running, until):
+        """Halves host's limit from the concurrency it was rate-limited at, and pauses it until ``until``."""
+        limit = min(self._limits.get(host, running), running)
+        self._limits[host] = max(1, limit // 2)
+        self._successes[host] = 0
+        self._paused_until[host] = max(until, self._paused_until.get(host, 0.0))
+
+    def succeeded(self, host):
+        """Raises a limited host's limit by one after as many successes as the limit."""
+        limit = self._limits.get(host)
+        if limit is None:
+            return
+        self._successes[host] = self._successes.get(host, 0) + 1
+        if self._successes[host] >= limit:
+            self._successes[host] = 0
+            if limit + 1 >= self.ceiling:
+                del self._limits[host]
+            else:
+                self._limits[host] = limit + 1
+
+    def limit(self, host):
+        return self._limits.get(host)
+
+    def next_resume(self, now=None):
+        """The earliest future time a paused host may start jobs again, or None."""
+        now = time.monotonic() if now is None else now
+        pending = [until for until in self._paused_until.values() if until > now]
+        return min(pending) if pending else None
+
+
+class RetryPolicy:
+    """Decides whether, when and how a failed job is retried, and keeps a histogram of failure classes.
+
+    A job's failure class comes from its output (see classify_line). The
+    delay is exponential per class with equal jitter: half of it fixed,
+    half random, so jobs that failed together do not retry together. At
+    most ``max_retries`` retries are made per job, and fewer for classes
+    whose rule allows fewer; permanent failures (unavailable, login
+    required, disk full) are never retried. Retries resume partial files
+    unless the rule says otherwise. Not locked: JobQueue calls it under
+    its own lock.
+    """
+
+    def __init__(self, max_retries=DEFAULT_RETRIES, rules=None, max_delay=MAX_DELAY, hosts=None, rng=None):
+        self.max_retries = max_retries
+        self.rules = RETRY_RULES if rules is None else rules
+        self.max_delay = max_delay
+        self.hosts = hosts or HostThrottle()
+        self.random = rng or random.Random()
+        self._histogram = {}
+
+    def decide(self, failure, history, host, running_on_host, now=None):
+        """Returns a RetryDecision for a job that just failed with ``failure``, or None to give up.
+
+        ``history`` lists the classes of the job's earlier failed attempts;
+        ``running_on_host`` counts the jobs on its host, including itself.
+        """
+        now = time.monotonic() if now is None else now
+        counts = self._count(failure)
+        counts["failed"] += 1
+        rule = self.rules.get(failure, NO_RETRY)
+        same = sum(1 for earlier in history if earlier == failure)
+        if len(history) >= self.max_retries or same >= rule.retries:
+            counts["gave_up"] += 1
+            return None
+        ceiling = min(self.max_delay, rule.base_delay * 2 ** same)
+        delay = ceiling / 2 + self.random.uniform(0, ceiling / 2)
+        if rule.throttle_host:
+            self.hosts.rate_limited(host, running_on_host, now + delay)
+        counts["retried"] += 1
+        return RetryDecision(failure, delay, dict(rule.overrides), len(history) + 1)
+
+    def succeeded(self, history, host):
+        """Notes a job that completed; ``history`` as for decide()."""
+        if history:
+            self._count(history[-1])["recovered"] += 1
+        self.hosts.succeeded(host)
+
+    def histogram(self):
+        """{failure class: {"failed", "retried", "recovered", "gave_up"}} over all jobs so far."""
+        return {name: dict(counts) for name, counts in sorted(self._histogram.items(), key=lambda i: FAILURE_RANK[i[0]])}
+
+    def _count(self, failure):
+        counts = self._histogram.get(failure)
+        if counts is None:
+            counts = self._histogram[failure] = {"failed": 0, "retried": 0, "recovered": 0, "gave_up": 0}
+        return counts
@@ -0,0 +1,573 @@
+"""Local HTTP/JSON API around the download queue.
+
+    python -m ytdl_core.server --port 8765 -o downloads
+
+Jobs are submitted, listed and cancelled with JSON requests and watched
+over Server-Sent Events. One asyncio loop serves every connection; the
+downloads themselves run on the JobQueue's worker threads as usual.
+
+    POST   /api/jobs              {"urls": [...], "options": {...}} or {"items": [{"url", "options"}]}
+    GET    /api/jobs[?status=S]   all jobs and per-status counts
+    GET    /api/jobs/ID           one job
+    DELETE /api/jobs/ID           cancel (also POST /api/jobs/ID/cancel)
+    POST   /api/jobs/ID/retry     re-queue a failed or cancelled job
+    POST   /api/jobs/clear        forget finished jobs
+    GET    /api/status            counts, throughput and the retry histogram
+    POST   /api/workers           {"count": N}
+    GET    /api/events[?job=1,2][&output=1]   SSE: a snapshot, then job updates (and output lines)
+
+Every request needs the server's token. POST and PUT bodies must be sent
+as application/json, and requests naming another Host or Origin are
+refused, so a web page cannot drive the server from the browser.
+"""
+import os
+import sys
+import re
+import json
+import hmac
+import time
+import shutil
+import asyncio
+import secrets
+import argparse
+import threading
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+from .archive import ARCHIVE_DB, DownloadArchive
+from .client import TOKEN_ENV
+from .commands import YTDLP_EXECUTABLE, CACHE_DIR, build_command, make_options, output_template
+from .engine import ENGINE_CHOICES, ENGINE_LIBRARY, ENGINE_SUBPROCESS, LibraryEngine, resolve_engine
+from .jobs import JobQueue, QUEUED
+from .journal import JOURNAL_DB, JobJournal
+from .metadata_cache import MetadataCache
+from .pipeline import CompressStage, SidecarStage
+from .progress import parse_progress_line
+from .retry import DEFAULT_RETRIES, RetryPolicy
+from .store import STORE_DIR, OutputStore
+
+# --- Constants ---
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+WILDCARD_HOSTS = ("", "0.0.0.0", "::")
+PUSH_INTERVAL = 0.1  # Job updates reaching the hub within this window go out as one batch.
+KEEPALIVE_INTERVAL = 15.0
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+MAX_PENDING_LINES = 1000  # Per subscriber; older output lines are dropped for a client that can't keep up.
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+           404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           415: "Unsupported Media Type", 500: "Internal Server Error"}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Helper Functions ---
+def job_to_dict(job):
+    """JSON-safe view of a Job, as the API returns and streams it."""
+    data = {"id": job.id, "url": job.url, "status": job.status, "percent": round(job.percent, 2),
+            "attempts": job.attempts, "returncode": job.returncode, "failure": job.failure,
+            "failures": list(job.failures), "options": job.options, "files": list(job.files),
+            "progress": job.progress.to_dict() if job.progress is not None else None}
+    if job.status == QUEUED and job.retry_at:
+        data["retry_in"] = round(max(0.0, job.retry_at - time.monotonic()), 3)
+    return data
+
+def encode_event(event, data):
+    """One Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+def is_inside(path, root):
+    try:
+        return os.path.commonpath([path, root]) == root
+    except ValueError:  # Another drive on Windows.
+        return False
+
+def resolve_output_dir(options, root, any_dir=False):
+    """Places a job's output_dir under the server's output root and checks its template stays there too.
+
+    Unless ``any_dir``, an output_dir outside the root is refused, and so
+    is a template that is absolute, has a ``..`` component or names an
+    environment variable (yt-dlp expands those in the output path).
+    """
+    path = os.path.abspath(os.path.join(root, options.get("output_dir") or "."))
+    if any_dir:
+        return path
+    if not is_inside(path, root):
+        raise ApiError(400, f"output_dir must be inside {root}")
+    template = options.get("template") or ""
+    if os.path.isabs(template) or os.path.splitdrive(template)[0] or ".." in re.split(r"[\\/]", template):
+        raise ApiError(400, "template must be a relative path without '..'")
+    target = output_template(dict(options, output_dir=path))
+    if os.path.expandvars(target) != target or not is_inside(os.path.abspath(target), root):
+        raise ApiError(400, f"template must keep files inside {root}")
+    return path
+
+
+# --- Event Hub ---
+class Subscriber:
+    """One event-stream client: the latest encoded event of each changed job, plus recent output lines."""
+
+    def __init__(self, job_ids=None, output=False):
+        self.job_ids = job_ids
+        self.output = output
+        self.jobs = {}
+        self.lines = deque(maxlen=MAX_PENDING_LINES)
+        self.dropped = 0
+        self.wake = asyncio.Event()
+
+    def offer(self, jobs, lines):
+        if self.job_ids is not None:
+            jobs = {job_id: event for job_id, event in jobs.items() if job_id in self.job_ids}
+        self.jobs.update(jobs)
+        if self.output:
+            for job_id, event in lines:
+                if self.job_ids is None or job_id in self.job_ids:
+                    if len(self.lines) == self.lines.maxlen:
+                        self.dropped += 1
+                    self.lines.append(event)
+        if self.jobs or self.lines:
+            self.wake.set()
+
+    def take(self):
+        jobs, self.jobs = self.jobs, {}
+        lines = list(self.lines)
+        self.lines.clear()
+        dropped, self.dropped = self.dropped, 0
+        self.wake.clear()
+        return jobs, lines, dropped
+
+
+class EventHub:
+    """Carries job updates from worker threads to the event loop, coalesced per job.
+
+    ``job_changed()`` and ``job_output()`` may be called from any thread.
+    Updates are gathered for PUSH_INTERVAL and handed to every subscriber
+    in one batch on the loop; a job that changed several times in that
+    window is sent once, in its latest state, and each event is encoded
+    once however many clients receive it. A subscriber that falls
+    behind keeps only the latest state per job, so memory is bounded by
+    the number of jobs rather than the number of updates.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.subscribers = set()
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._lines = deque(maxlen=MAX_PENDING_LINES)
+        self._scheduled = False
+
+    def job_changed(self, job):
+        data = job_to_dict(job)
+        with self._lock:
+            self._jobs[job.id] = data
+            self._schedule()
+
+    def job_output(self, job, line):
+        with self._lock:
+            self._lines.append((job.id, line))
+            self._schedule()
+
+    def _schedule(self):
+        # Caller holds the lock.
+        if not self._scheduled and not self.loop.is_closed():
+            self._scheduled = True
+            self.loop.call_soon_threadsafe(self.loop.call_later, PUSH_INTERVAL, self._flush)
+
+    def _flush(self):
+        with self._lock:
+            jobs, self._jobs = self._jobs, {}
+            lines = list(self._lines)
+            self._lines.clear()
+            self._scheduled = False
+        jobs = {job_id: encode_event("job", data) for job_id, data in jobs.items()}
+        lines = [(job_id, encode_event("output", {"job": job_id, "line": line})) for job_id, line in lines]
+        for subscriber in self.subscribers:
+            subscriber.offer(jobs, lines)
+
+
+# --- Server ---
+class ApiServer:
+    """Serves the JSON API and event streams for a JobQueue from one asyncio loop.
+
+    The queue's ``on_update`` and ``on_output`` must call this server's
+    methods of the same name (pass them when building the queue, then
+    attach it with ``server.queue = queue``). Calls that touch the queue
+    run on the loop's default executor, so a large submit never stalls
+    the streams. With ``token`` set, every request needs it as a bearer
+    token or a ``token`` query parameter (EventSource cannot send headers).
+    Whatever the token, requests must name this server in their Host
+    header (DNS rebinding), come from no other Origin, and send POST and
+    PUT bodies as application/json, which a cross-site form cannot.
+    """
+
+    def __init__(self, queue=None, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None, output_root=".",
+                 any_output_dir=False, retry=None):
+        self.queue = queue
+        self.host = host
+        self.port = port
+        self.token = token
+        self.output_root = os.path.abspath(output_root)
+        self.any_output_dir = any_output_dir
+        self.retry_policy = retry
+        self.hub = None
+        self.loop = None
+        self._server = None
+        self._stopped = None
+        self._started = threading.Event()
+
+    # --- Queue Callbacks (worker threads) ---
+    def on_update(self, job):
+        if self.hub is not None:
+            self.hub.job_changed(job)
+
+    def on_output(self, job, line):
+        if self.hub is not None:
+            self.hub.job_output(job, line)
+
+    # --- Lifecycle ---
+    def serve_forever(self):
+        asyncio.run(self._serve())
+
+    def start(self):
+        """Serves on a background thread; returns once the socket is listening."""
+        thread = threading.Thread(target=self.serve_forever, name="ytdl-api", daemon=True)
+        thread.start()
+        self._started.wait()
+        return thread
+
+    def stop(self):
+        if self.loop is not None and self._stopped is not None:
+            self.loop.call_soon_threadsafe(self._stopped.set)
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.hub = EventHub(self.loop)
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        # Port 0 picks a free port; report the real one.
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        async with self._server:
+            await self._stopped.wait()
+        for subscriber in self.hub.subscribers:
+            subscriber.wake.set()
+
+    # --- HTTP ---
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                try:
+                    self._check_origin(method, headers)
+                    self._authorize(headers, query)
+                    if method == "GET" and path == "/api/events":
+                        await self._stream_events(writer, query)
+                        break
+                    status, payload = await self._route(method, path, query, body)
+                except ApiError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_json(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise ValueError("malformed request line")
+        headers = {}
+        size = len(line)
+        while True:
+            line = await reader.readline()
+            size += len(line)
+            if size > MAX_HEADER_BYTES:
+                raise ValueError("headers too large")
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("body too large")
+        body = await reader.readexactly(length) if length else b""
+        parts = urlsplit(target)
+        return method.upper(), parts.path.rstrip("/") or "/", parse_qs(parts.query), headers, body
+
+    def allowed_hosts(self):
+        """Host header values this server answers to, or None when listening on every address."""
+        if self.host in WILDCARD_HOSTS:
+            return None
+        names = LOOPBACK_HOSTS if self.host in LOOPBACK_HOSTS else (self.host,)
+        names = [f"[{name}]" if ":" in name else name for name in names]
+        return {name.lower() for name in names} | {f"{name}:{self.port}".lower() for name in names}
+
+    def _check_origin(self, method, headers):
+        """Refuses requests a web page could make: another Host name, another Origin, or a non-JSON write."""
+        host = headers.get("host", "").lower()
+        allowed = self.allowed_hosts()
+        if allowed is not None and host not in allowed:
+            raise ApiError(403, f"unexpected Host header: {host or '(none)'}")
+        origin = headers.get("origin")
+        if origin is not None and urlsplit(origin).netloc.lower() != host:
+            raise ApiError(403, f"cross-origin requests are not allowed (Origin: {origin})")
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if method in ("POST", "PUT") and content_type != "application/json":
+            raise ApiError(415, "POST and PUT requests must be sent as application/json")
+
+    def _authorize(self, headers, query):
+        if not self.token:
+            return
+        supplied = headers.get("authorization", "").removeprefix("Bearer ").strip() or query.get("token", [""])[0]
+        if not hmac.compare_digest(supplied.encode(), self.token.encode()):
+            raise ApiError(401, "missing or wrong token")
+
+    def _write_json(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+
+    # --- Routes ---
+    async def _route(self, method, path, query, body):
+        queue = self.queue
+        parts = path.strip("/").split("/")
+        if parts[:1] != ["api"]:
+            raise ApiError(404, f"no such resource: {path}")
+        resource = parts[1:]
+        if resource == ["jobs"]:
+            if method == "GET":
+                statuses = set(",".join(query.get("status", [])).split(",")) - {""}
+                jobs = [job_to_dict(job) for job in list(queue.jobs.values())
+                        if not statuses or job.status in statuses]
+                return 200, {"jobs": jobs, "counts": queue.counts()}
+            if method == "POST":
+                items = self._parse_submit(self._json(body))
+                jobs = await self.loop.run_in_executor(None, self._submit, items)
+                return 201, {"jobs": [job_to_dict(job) for job in jobs]}
+        elif resource == ["jobs", "clear"] and method == "POST":
+            return 200, {"cleared": await self.loop.run_in_executor(None, queue.clear_finished)}
+        elif len(resource) >= 2 and resource[0] == "jobs":
+            job = self._job(resource[1])
+            action = resource[2:]
+            if method == "GET" and not action:
+                return 200, job_to_dict(job)
+            if (method == "DELETE" and not action) or (method == "POST" and action == ["cancel"]):
+                return 200, {"cancelled": await self.loop.run_in_executor(None, queue.cancel, job.id)}
+            if method == "POST" and action == ["retry"]:
+                if not await self.loop.run_in_executor(None, queue.retry, job.id):
+                    raise ApiError(409, f"job {job.id} is {job.status}; only failed or cancelled jobs can be retried")
+                return 200, job_to_dict(job)
+        elif resource == ["status"] and method == "GET":
+            achieved, allotted = queue.throughput()
+            return 200, {"counts": queue.counts(), "percent": round(queue.overall_percent(), 2),
+                         "speed": achieved, "rate_limit": allotted, "workers": queue.max_workers,
+                         "failures": self.retry_policy.histogram() if self.retry_policy is not None else {}}
+        elif resource == ["workers"] and method in ("POST", "PUT"):
+            count = self._json(body).get("count")
+            if not isinstance(count, int) or count < 1:
+                raise ApiError(400, "count must be a positive integer")
+            queue.set_max_workers(count)
+            return 200, {"workers": queue.max_workers}
+        else:
+            raise ApiError(404, f"no such resource: {path}")
+        raise ApiError(405, f"{method} not allowed on {path}")
+
+    def _json(self, body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError as e:
+            raise ApiError(400, f"invalid JSON: {e}")
+        if not isinstance(data, dict):
+            raise ApiError(400, "expected a JSON object")
+        return data
+
+    def _job(self, text):
+        try:
+            job = self.queue.jobs.get(int(text))
+        except ValueError:
+            job = None
+        if job is None:
+            raise ApiError(404, f"no job {text}")
+        return job
+
+    def _parse_submit(self, data):
+        """Returns [(url, full options)] from a submit request, validating every option."""
+        if "items" in data:
+            raw = [(item.get("url"), item.get("options") or {}) for item in data["items"] if isinstance(item, dict)]
+        else:
+            urls = data.get("urls") or ([data["url"]] if data.get("url") else [])
+            raw = [(url, data.get("options") or {}) for url in urls]
+        if not raw:
+            raise ApiError(400, "no URLs given")
+        items = []
+        for url, options in raw:
+            if not isinstance(url, str) or not url.strip():
+                raise ApiError(400, "every URL must be a non-empty string")
+            if not isinstance(options, dict):
+                raise ApiError(400, "options must be an object")
+            try:
+                options = make_options(**options)
+            except ValueError as e:
+                raise ApiError(400, str(e))
+            options["output_dir"] = resolve_output_dir(options, self.output_root, self.any_output_dir)
+            items.append((url.strip(), options))
+        return items
+
+    def _submit(self, items):
+        jobs = []
+        # One submit_many per distinct options dict keeps each batch starting together.
+        for url, options in items:
+            if jobs and jobs[-1][1] == options:
+                jobs[-1][0].append(url)
+            else:
+                jobs.append(([url], options))
+        return [job for urls, options in jobs for job in self.queue.submit_many(urls, options)]
+
+    # --- Event Stream ---
+    async def _stream_events(self, writer, query):
+        job_ids = {int(i) for i in ",".join(query.get("job", [])).split(",") if i.strip().isdigit()} or None
+        subscriber = Subscriber(job_ids, output=query.get("output", ["0"])[0] not in ("0", "", "false"))
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Connection: close\r\n\r\n")
+        snapshot = [job_to_dict(job) for job in list(self.queue.jobs.values())
+                    if job_ids is None or job.id in job_ids]
+        writer.write(encode_event("snapshot", {"jobs": snapshot, "workers": self.queue.max_workers}))
+        self.hub.subscribers.add(subscriber)
+        try:
+            await writer.drain()
+            # A client that went away is noticed when a write to it fails and closes the transport.
+            while not self._stopped.is_set() and not writer.is_closing():
+                try:
+                    await asyncio.wait_for(subscriber.wake.wait(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                    await writer.drain()
+                    continue
+                jobs, lines, dropped = subscriber.take()
+                if dropped:
+                    lines.insert(0, encode_event("dropped", {"lines": dropped}))
+                writer.write(b"".join(list(jobs.values()) + lines))
+                # While this client drains, new updates coalesce in its subscriber.
+                await writer.drain()
+        finally:
+            self.hub.subscribers.discard(subscriber)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ytdl_core.server", description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT}; 0 for any)")
+    parser.add_argument("--token", default=os.environ.get(TOKEN_ENV),
+                        help=f"bearer token every request must send (default: ${TOKEN_ENV}, else a new one is "
+                             f"generated and printed)")
+    parser.add_argument("-o", "--output-dir", default=".", help="folder jobs download into; a job's output_dir "
+                                                                "is taken relative to it (default: current folder)")
+    parser.add_argument("--any-output-dir", action="store_true", help="let jobs write outside --output-dir")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="parallel downloads (default: 2)")
+    parser.add_argument("--engine", choices=ENGINE_CHOICES, default=ENGINE_SUBPROCESS,
+                        help="run yt-dlp as a process per URL or in-process (default: subprocess)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help=f"retries per job after transient failures (default: {DEFAULT_RETRIES})")
+    parser.add_argument("--no-cache", action="store_true", help="don't reuse cached extractor JSON")
+    parser.add_argument("--archive", default=ARCHIVE_DB, help=f"download archive database (default: {ARCHIVE_DB})")
+    parser.add_argument("--no-archive", action="store_true", help="download even if already in the archive")
+    parser.add_argument("--journal", default=JOURNAL_DB, help=f"job journal database (default: {JOURNAL_DB})")
+    parser.add_argument("--no-journal", action="store_true", help="don't journal jobs for resuming")
+    parser.add_argument("--resume", action="store_true", help="resume jobs left unfinished by an earlier run")
+    parser.add_argument("--store-dir", default=STORE_DIR, help=f"output store for jobs with the store option "
+                                                               f"(default: {STORE_DIR})")
+    args = parser.parse_args(argv)
+    try:
+        engine_mode = resolve_engine(args.engine)
+    except ValueError as e:
+        parser.error(str(e))
+    if engine_mode == ENGINE_SUBPROCESS and not shutil.which(YTDLP_EXECUTABLE):
+        print(json.dumps({"event": "error", "message": f"{YTDLP_EXECUTABLE} not found in PATH."}), flush=True)
+        return 3
+    # Always required: any local process or browser tab can reach a loopback port.
+    token = args.token or secrets.token_urlsafe(24)
+
+    cache = None if args.no_cache else MetadataCache(CACHE_DIR)
+    archive = None if args.no_archive else DownloadArchive(args.archive)
+    journal = None if args.no_journal else JobJournal(args.journal)
+    store = OutputStore(args.store_dir)
+    engine = LibraryEngine(cache, archive, store=store) if engine_mode == ENGINE_LIBRARY else None
+    sidecars = SidecarStage(metadata_cache=cache, archive=archive)
+    retry = RetryPolicy(max_retries=max(0, args.retries))
+    compress = []
+    compress_lock = threading.Lock()
+
+    def on_file(job, info):
+        if not job.options["compress"] or job.options["audio_only"] or not info.get("filepath"):
+            return
+        with compress_lock:
+            if not compress:
+                compress.append(CompressStage())
+        compress[0].offer(info["filepath"])
+
+    server = ApiServer(host=args.host, port=args.port, token=token, output_root=args.output_dir,
+                       any_output_dir=args.any_output_dir, retry=retry)
+    server.queue = JobQueue(lambda url, opts: build_command(url, opts, cache, archive=archive, store=store),
+                            parse_progress_line, max_workers=args.jobs, on_update=server.on_update,
+                            on_output=server.on_output, archive=archive, on_file=on_file, journal=journal,
+                            engine=engine, sidecars=sidecars, store=store, retry=retry)
+    thread = server.start()
+    print(json.dumps({"event": "listening", "url": server.url, "token": token}), flush=True)
+    if journal is not None:
+        unfinished = journal.unfinished()
+        killed = journal.reap_orphans(unfinished)
+        if args.resume:
+            server.queue.resume(unfinished)
+        if unfinished or killed:
+            print(json.dumps({"event": "journal", "unfinished": len(unfinished), "resumed": bool(args.resume),
+                              "orphans_killed": killed}), flush=True)
+    try:
+        while thread.is_alive():
+            thread.join(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Unfinished jobs stay in the journal for --resume.
+        server.queue.shutdown()
+        server.stop()
+        server.queue.wait(timeout=10)
+        if compress:
+            compress[0].shutdown(wait=False)
+        sidecars.shutdown(wait=False)
+        if engine is not None:
+            engine.shutdown()
+        for resource in (cache, archive, journal, store):
+            if resource is not None:
+                resource.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
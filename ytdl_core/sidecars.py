@@ -0,0 +1,387 @@
+"""Subtitles, thumbnails and info JSON fetched beside the media download instead of inside it.
+
+With ``--write-sub``/``--write-thumbnail`` yt-dlp fetches sidecars in
+series with the media stream. Here a separate ``--skip-download`` run per
+video fetches them into a cache keyed by video ID while the media
+downloads. Playlists are expanded with a flat extraction so their entries
+are fetched in parallel. Embedding them afterwards is a stream-copy remux.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .archive import archive_key, archive_key_for_url
+from .commands import FFMPEG_EXECUTABLE, FFPROBE_EXECUTABLE, SUBTITLE_LANGS, THUMBNAIL_FORMAT, YTDLP_EXECUTABLE
+from .jobs import hidden_startupinfo
+from .playlist import iter_flat_playlist
+
+# --- Constants ---
+SIDECAR_DIR = "sidecars"
+MANIFEST_FILE = "manifest.json"
+SIDECAR_NAME = "sidecar"
+DEFAULT_SIDECAR_WORKERS = 4
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+STALE_STAGING_AGE = 3600
+IMAGE_EXTS = ("jpg", "jpeg", "png", "webp")
+# Container -> codec for added subtitle tracks; containers missing here can't hold text subtitles.
+SUBTITLE_CODECS = {".mp4": "mov_text", ".m4v": "mov_text", ".mov": "mov_text", ".mkv": "copy", ".webm": "webvtt"}
+# Container -> how a cover image goes in: an attached-picture stream, an ID3 picture or a Matroska attachment.
+THUMBNAIL_EMBEDS = {".mp4": "stream", ".m4v": "stream", ".mov": "stream", ".m4a": "stream", ".mp3": "id3",
+                    ".mkv": "attachment", ".mka": "attachment"}
+
+
+class SidecarError(Exception):
+    """Fetching or embedding sidecar files failed."""
+
+
+# --- Helper Functions ---
+def sidecar_langs(options):
+    """The subtitle languages an options dict asks for, as a list."""
+    langs = options.get("subtitle_langs") or SUBTITLE_LANGS
+    return [lang.strip() for lang in langs.split(",") if lang.strip()]
+
+def wants_sidecars(options):
+    """True when a job fetches its sidecars through the sidecar pipeline."""
+    return bool(options.get("sidecars") and (options["subtitles"] or options.get("thumbnail")
+                                             or options.get("info_json")))
+
+def build_sidecar_command(url, langs, template, info_json=None, executable=YTDLP_EXECUTABLE):
+    """The yt-dlp command that writes one video's info JSON, thumbnail and subtitles without the media."""
+    # --ignore-errors turns a subtitle language that fails to download into a warning.
+    cmd = [executable, "--skip-download", "--no-warnings", "--ignore-errors", "--no-playlist", "--write-info-json",
+           "--write-thumbnail", "--convert-thumbnails", THUMBNAIL_FORMAT]
+    if langs:
+        cmd.extend(["--write-sub", "--sub-lang", ",".join(langs)])
+    cmd.extend(["-o", template])
+    if info_json:
+        cmd.extend(["--load-info-json", info_json])
+    else:
+        cmd.append(url)
+    return cmd
+
+def sidecar_params(langs, template):
+    """YoutubeDL params matching build_sidecar_command, for the in-process engine."""
+    params = {
+        "outtmpl": template,
+        "skip_download": True,
+        "noplaylist": True,
+        "no_warnings": True,
+        "ignoreerrors": True,
+        "writeinfojson": True,
+        "writethumbnail": True,
+        "postprocessors": [{"key": "FFmpegThumbnailsConvertor", "format": THUMBNAIL_FORMAT, "when": "before_dl"}],
+    }
+    if langs:
+        params["writesubtitles"] = True
+        params["subtitleslangs"] = list(langs)
+    return params
+
+def probe_streams(path, executable=FFPROBE_EXECUTABLE):
+    """Returns [{'type', 'attached_pic', 'mimetype'}] for every stream in a file, in order."""
+    cmd = [executable, "-v", "error", "-show_entries", "stream=codec_type:stream_disposition=attached_pic"
+           ":stream_tags=mimetype", "-of", "json", path]
+    result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace",
+                            startupinfo=hidden_startupinfo())
+    if result.returncode != 0:
+        raise SidecarError(result.stderr.strip() or f"ffprobe exited with code {result.returncode}")
+    return [{"type": s.get("codec_type"), "attached_pic": bool(s.get("disposition", {}).get("attached_pic")),
+             "mimetype": s.get("tags", {}).get("mimetype")}
+            for s in json.loads(result.stdout or "{}").get("streams", [])]
+
+def remux_command(media, subtitles, thumbnail, output, streams=(), executable=FFMPEG_EXECUTABLE):
+    """The ffmpeg stream-copy command that adds subtitle tracks and/or a cover image to a media file.
+
+    ``subtitles`` is a list of (language, path); ``streams`` comes from
+    probe_streams and is only needed to place a cover in MP4 or Matroska.
+    Like yt-dlp's embedding, subtitles and covers added by an earlier run
+    are replaced rather than duplicated.
+    """
+    ext = os.path.splitext(media)[1].lower()
+    if SUBTITLE_CODECS.get(ext) is None:
+        subtitles = []
+    mode = THUMBNAIL_EMBEDS.get(ext) if thumbnail else None
+    inputs = [media] + [path for _, path in subtitles]
+
+    if mode == "id3":
+        opts = ["-map", "0:a", "-map", f"{len(inputs)}:0", "-c", "copy", "-write_id3v1", "1", "-id3v2_version", "3",
+                "-metadata:s:v", "title=Album cover", "-metadata:s:v", "comment=Cover (front)"]
+        return [executable, "-y", "-loglevel", "error", "-i", media, "-i", thumbnail, *opts, output]
+
+    # The kept input streams come first in the output, then the added subtitles, then the cover.
+    opts = ["-map", "0", "-dn", "-ignore_unknown", "-c", "copy"]
+    kept = 0
+    for index, stream in enumerate(streams):
+        if stream["type"] in ("data", "unknown", None) or (subtitles and stream["type"] == "subtitle"):
+            continue
+        if mode == "stream" and stream["attached_pic"] or mode == "attachment" and stream["mimetype"] == "image/jpeg":
+            opts.extend(["-map", f"-0:{index}"])
+            continue
+        kept += 1
+    if subtitles:
+        opts.extend(["-map", "-0:s"])
+        if SUBTITLE_CODECS[ext] != "copy":
+            opts.extend(["-c:s", SUBTITLE_CODECS[ext]])
+    for i, (lang, path) in enumerate(subtitles):
+        # MP4 only takes three-letter language codes; the handler name is what players list there.
+        opts.extend(["-map", f"{i + 1}:0", f"-metadata:s:s:{i}", f"language={lang}", f"-metadata:s:s:{i}",
+                     f"handler_name={lang}", f"-metadata:s:s:{i}", f"title={lang}"])
+    cover = kept + len(subtitles)
+    if mode == "stream":
+        opts.extend(["-map", f"{len(inputs)}:0", f"-disposition:{cover}", "attached_pic"])
+        inputs.append(thumbnail)
+    elif mode == "attachment":
+        opts.extend(["-attach", thumbnail, f"-metadata:s:{cover}", "mimetype=image/jpeg",
+                     f"-metadata:s:{cover}", f"filename=cover.{THUMBNAIL_FORMAT}"])
+    cmd = [executable, "-y", "-loglevel", "error"]
+    for path in inputs:
+        cmd.extend(["-i", path])
+    return cmd + opts + [output]
+
+def embed_sidecars(media, subtitles=(), thumbnail=None):
+    """Remuxes subtitles and a cover image into a media file in place.
+
+    Returns (subtitle tracks added, whether the cover was added); a
+    container that takes neither is left untouched.
+    """
+    stem, ext = os.path.splitext(media)
+    # Live-chat "subtitles" are JSON, and only the converted JPEG is embedded as a cover.
+    subtitles = [(lang, path) for lang, path in subtitles if not path.endswith(".json")]
+    if not SUBTITLE_CODECS.get(ext.lower()):
+        subtitles = []
+    if not THUMBNAIL_EMBEDS.get(ext.lower()) or thumbnail and not thumbnail.endswith("." + THUMBNAIL_FORMAT):
+        thumbnail = None
+    if not subtitles and not thumbnail:
+        return 0, False
+    streams = probe_streams(media) if thumbnail and THUMBNAIL_EMBEDS[ext.lower()] != "id3" else ()
+    tmp_path = f"{stem}.temp{ext}"
+    mtime = os.stat(media).st_mtime
+    result = subprocess.run(remux_command(media, subtitles, thumbnail, tmp_path, streams), capture_output=True,
+                            text=True, encoding="utf-8", errors="replace", startupinfo=hidden_startupinfo())
+    if result.returncode != 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise SidecarError(result.stderr.strip() or f"ffmpeg exited with code {result.returncode}")
+    os.replace(tmp_path, media)
+    # yt-dlp dates files by upload time; keep that.
+    os.utime(media, (time.time(), mtime))
+    return len(subtitles), bool(thumbnail)
+
+
+class SidecarSet:
+    """The cached sidecar files of one video; paths are absolute, missing ones None."""
+
+    __slots__ = ("key", "folder", "langs", "subtitles", "thumbnail", "info_json")
+
+    def __init__(self, key, folder, langs=(), subtitles=None, thumbnail=None, info_json=None):
+        self.key = key
+        self.folder = folder
+        self.langs = list(langs)
+        self.subtitles = subtitles or {}
+        self.thumbnail = thumbnail
+        self.info_json = info_json
+
+    @classmethod
+    def scan(cls, key, folder, langs):
+        """Builds a set from the files yt-dlp wrote as ``sidecar.*`` into folder."""
+        sidecars = cls(key, folder, langs)
+        prefix = SIDECAR_NAME + "."
+        for name in os.listdir(folder):
+            if not name.startswith(prefix) or name.endswith((".part", ".tmp")):
+                continue
+            rest = name[len(prefix):]
+            path = os.path.join(folder, name)
+            if rest == "info.json":
+                sidecars.info_json = path
+            elif rest.lower() in IMAGE_EXTS:
+                sidecars.thumbnail = path
+            elif "." in rest:
+                sidecars.subtitles[rest.rsplit(".", 1)[0]] = path
+        return sidecars
+
+    def covers(self, langs):
+        return set(langs) <= set(self.langs)
+
+    def subtitle_files(self, langs):
+        """[(lang, path)] for the requested languages that exist, in the requested order."""
+        return [(lang, self.subtitles[lang]) for lang in langs if lang in self.subtitles]
+
+    def to_dict(self):
+        return {"key": self.key, "langs": self.langs,
+                "subtitles": {lang: os.path.basename(path) for lang, path in self.subtitles.items()},
+                "thumbnail": self.thumbnail and os.path.basename(self.thumbnail),
+                "info_json": self.info_json and os.path.basename(self.info_json)}
+
+    def __repr__(self):
+        return f"<SidecarSet {self.key} subs={sorted(self.subtitles)} thumbnail={bool(self.thumbnail)}>"
+
+
+# --- Fetcher ---
+class SidecarFetcher:
+    """Fetches sidecar sets into an on-disk cache on a pool shared by every job.
+
+    Sets are stored per video under their archive key (``youtube <id>``)
+    with a manifest of the languages that were asked for; a video whose
+    key is known up front (YouTube URLs, flat playlist entries) is served
+    from disk without running yt-dlp. Concurrent requests for the same
+    video share one fetch.
+    """
+
+    def __init__(self, cache_dir, max_workers=DEFAULT_SIDECAR_WORKERS, executable=YTDLP_EXECUTABLE,
+                 metadata_cache=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.executable = executable
+        self.metadata_cache = metadata_cache
+        self.max_bytes = max_bytes
+        self.fetched = 0
+        self.cache_hits = 0
+        self.failed = 0
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sidecars")
+        os.makedirs(cache_dir, exist_ok=True)
+        self._pool.submit(self.prune)
+
+    def fetch(self, url, langs, engine=None, key=None):
+        """Returns a Future of the video's SidecarSet, starting a fetch unless one is cached or running.
+
+        ``key`` is the video's archive key when the caller knows it.
+        """
+        key = key or archive_key_for_url(url)
+        with self._lock:
+            task = self._tasks.get(key) or self._tasks.get("url:" + url)
+            if task is not None and (not task.done() or self._succeeded(task) and task.result().covers(langs)):
+                return task
+            sidecars = self._load(key, langs) if key else None
+            if sidecars is not None:
+                self.cache_hits += 1
+                task = Future()
+                task.set_result(sidecars)
+            else:
+                task = self._pool.submit(self._fetch, url, langs, engine)
+            for name in filter(None, (key, "url:" + url)):
+                self._tasks[name] = task
+        return task
+
+    def fetch_playlist(self, url, langs, engine=None, skip=None):
+        """Lists a playlist and starts a fetch per entry; returns a Future of the number started.
+
+        Entries whose archive key ``skip(key)`` accepts are left out.
+        """
+        return self._pool.submit(self._fetch_playlist, url, langs, engine, skip)
+
+    def stats(self):
+        with self._lock:
+            return {"fetched": self.fetched, "cache_hits": self.cache_hits, "failed": self.failed}
+
+    def prune(self):
+        """Drops the least recently fetched sets until the cache fits in max_bytes."""
+        folders = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir():
+                continue
+            if entry.name.startswith(".tmp-"):
+                if time.time() - entry.stat().st_mtime > STALE_STAGING_AGE:
+                    shutil.rmtree(entry.path, ignore_errors=True)  # Left by an interrupted fetch.
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+            folders.append((entry.stat().st_mtime, size, entry.path))
+            total += size
+        for _, size, path in sorted(folders):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    # --- Pool Threads ---
+    def _fetch_playlist(self, url, langs, engine, skip):
+        if engine is not None:
+            info = engine.extract_info(url, playlist=True, flat=True)
+            entries = [(entry.get("url") or entry.get("webpage_url"), entry.get("ie_key"), entry.get("id"))
+                       for entry in info.get("entries") or ()]
+        else:
+            entries = [(entry.url, entry.extractor_key, entry.id) for entry in iter_flat_playlist(url, self.executable)]
+        started = 0
+        for entry_url, extractor, video_id in entries:
+            key = archive_key(extractor, video_id) if extractor and video_id else None
+            if entry_url and not (skip is not None and key and skip(key)):
+                self.fetch(entry_url, langs, engine, key)
+                started += 1
+        return started
+
+    def _fetch(self, url, langs, engine):
+        staging = tempfile.mkdtemp(prefix=".tmp-", dir=self.cache_dir)
+        try:
+            template = os.path.join(staging, SIDECAR_NAME + ".%(ext)s")
+            info_json = self.metadata_cache.info_json_path(url) if self.metadata_cache is not None else None
+            output = []
+            if engine is not None:
+                engine.run(url, sidecar_params(langs, template), on_output=output.append, info_json=info_json)
+            else:
+                result = subprocess.run(build_sidecar_command(url, langs, template, info_json, self.executable),
+                                        capture_output=True, text=True, encoding="utf-8", errors="replace",
+                                        startupinfo=hidden_startupinfo())
+                output = (result.stderr or result.stdout).splitlines()
+            info_path = os.path.join(staging, SIDECAR_NAME + ".info.json")
+            if not os.path.exists(info_path):
+                errors = [line for line in output if "ERROR" in line]
+                raise SidecarError((errors or output or ["yt-dlp wrote no info JSON"])[-1].strip())
+            with open(info_path, encoding="utf-8") as f:
+                info = json.load(f)
+            key = archive_key(info.get("extractor_key") or info.get("extractor") or "generic", info["id"])
+            with self._lock:
+                sidecars = self._store(key, staging, langs)
+                self.fetched += 1
+                # Later lookups by the file's ID (playlist entries) find this fetch.
+                self._tasks.setdefault(key, self._tasks.get("url:" + url))
+            return sidecars
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @staticmethod
+    def _succeeded(task):
+        return not task.cancelled() and task.exception() is None
+
+    # --- Cache (caller holds the lock) ---
+    def _folder(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest()[:20])
+
+    def _load(self, key, langs):
+        folder = self._folder(key)
+        try:
+            with open(os.path.join(folder, MANIFEST_FILE), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not set(langs) <= set(manifest.get("langs", ())):
+            return None
+        sidecars = SidecarSet.scan(key, folder, manifest["langs"])
+        return sidecars if sidecars.info_json else None
+
+    def _store(self, key, staging, langs):
+        """Moves a fetch's files into the video's folder, over older copies, and rewrites its manifest."""
+        folder = self._folder(key)
+        previous = self._load(key, ())
+        os.makedirs(folder, exist_ok=True)
+        for name in os.listdir(staging):
+            os.replace(os.path.join(staging, name), os.path.join(folder, name))
+        all_langs = list(dict.fromkeys([*(previous.langs if previous else ()), *langs]))
+        sidecars = SidecarSet.scan(key, folder, all_langs)
+        tmp_path = os.path.join(folder, MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(sidecars.to_dict(), f)
+        os.replace(tmp_path, os.path.join(folder, MANIFEST_FILE))
+        return sidecars
@@ -0,0 +1,388 @@
+"""Content-addressed output store: one copy of each downloaded file, linked into every place it was asked for.
+
+Finished files move into ``store/objects`` under a name built from the
+extractor, video ID, format and the post-processing that shaped them, and
+the requested path becomes a link to that object (a hardlink, else a
+reflink, else a symlink, else a copy). A later request for the same video
+and format is linked into place before yt-dlp looks for its file, so
+yt-dlp reports it as already downloaded and moves no media bytes.
+
+    python -m ytdl_core.store stats
+    python -m ytdl_core.store gc [--dry-run]
+"""
+import os
+import re
+import sys
+import json
+import time
+import errno
+import shlex
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import threading
+import subprocess
+
+from .archive import archive_key, sample_checksum
+
+# --- Constants ---
+STORE_DIR = "store"
+OBJECTS_DIR = "objects"
+INDEX_DB = "index.sqlite3"
+LINK_HARD = "hardlink"
+LINK_REFLINK = "reflink"
+LINK_SYMLINK = "symlink"
+LINK_COPY = "copy"
+FICLONE = 0x40049409  # Linux ioctl behind `cp --reflink`.
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The --exec hook runs from yt-dlp's working folder, which need not be able to import ytdl_core.
+HOOK_CODE = "import sys; sys.path.insert(0, sys.argv.pop(1)); from ytdl_core.store import main; sys.exit(main())"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    name      TEXT PRIMARY KEY,
+    key       TEXT NOT NULL,
+    format_id TEXT,
+    variant   TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    checksum  TEXT NOT NULL,
+    created   REAL NOT NULL,
+    used      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_checksum ON objects (checksum);
+CREATE TABLE IF NOT EXISTS links (
+    path    TEXT PRIMARY KEY,
+    name    TEXT NOT NULL,
+    kind    TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS links_name ON links (name);
+"""
+
+
+# --- Helper Functions ---
+def store_variant(options):
+    """Short tag for the options that change a file's bytes beyond its format, or '' if none do.
+
+    Embedded subtitles and cover art end up inside the stored object, so a
+    request with different embeds must not be handed the same file.
+    """
+    shaping = {}
+    if options.get("audio_only"):
+        shaping["audio"] = "mp3"
+    if options.get("subtitles") and options.get("embed_subtitles"):
+        shaping["subs"] = options.get("subtitle_langs")
+    if options.get("thumbnail") and options.get("embed_thumbnail"):
+        shaping["cover"] = True
+    if not shaping:
+        return ""
+    return hashlib.sha1(json.dumps(shaping, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+
+def object_name(extractor, video_id, format_id, variant, ext):
+    """'<extractor>-<id>-<format>[-<variant>].<ext>', with anything unsafe in a filename replaced."""
+    parts = [extractor.lower(), video_id, format_id or "default"] + ([variant] if variant else [])
+    return re.sub(r"[^\w.+-]", "_", "-".join(parts)) + "." + ext
+
+def reflink(source, target):
+    """Clones source into a new file sharing its blocks (Btrfs, XFS); raises OSError elsewhere."""
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflinks are only attempted on Linux")
+    import fcntl
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(target)
+            raise
+
+def place(source, target):
+    """Puts a link to source at target, replacing whatever is there; returns the link kind used.
+
+    The link is made beside the target and renamed over it, so the target
+    is never missing or half-written.
+    """
+    tmp_path = f"{target}.store-{os.getpid()}-{threading.get_ident()}.tmp"
+    makers = ((LINK_HARD, os.link), (LINK_REFLINK, reflink),
+              (LINK_SYMLINK, lambda src, dst: os.symlink(os.path.abspath(src), dst)), (LINK_COPY, shutil.copy2))
+    error = None
+    for kind, make in makers:
+        try:
+            make(source, tmp_path)
+        except (OSError, NotImplementedError) as e:
+            error = e
+            continue
+        try:
+            os.replace(tmp_path, target)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+        return kind
+    raise error
+
+def same_file(a, b):
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+def shell_join(args):
+    """Quotes args for the shell yt-dlp runs --exec commands in."""
+    if os.name == 'nt':
+        return subprocess.list2cmdline(args)
+    return " ".join(shlex.quote(arg) for arg in args)
+
+
+# --- Store ---
+class OutputStore:
+    """Deduplicating home for finished downloads, indexed in SQLite.
+
+    ``ingest(info, options)`` takes a FILE_DONE file into the store and
+    leaves a link in its place; a file whose bytes are already stored
+    under another name (same size and sample checksum) shares that copy.
+    ``link_existing()`` runs before a download and links a stored object
+    to the path yt-dlp is about to write, if there is one. Every link is
+    recorded; ``gc()`` drops links whose path is gone or now holds another
+    file, then deletes objects that nothing links to any more.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = os.path.abspath(root)
+        self.objects_dir = os.path.join(self.root, OBJECTS_DIR)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # The before-download hook writes from its own process, hence the busy timeout.
+        self._db = sqlite3.connect(os.path.join(self.root, INDEX_DB), timeout=30, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self.reused = 0
+        self.ingested = 0
+        self.deduplicated = 0
+        self.saved_bytes = 0
+
+    def object_path(self, name):
+        return os.path.join(self.objects_dir, name)
+
+    def hook_command(self, options):
+        """The ``--exec before_dl:`` command that links a stored copy into place for a subprocess download."""
+        args = [sys.executable, "-c", HOOK_CODE, PACKAGE_ROOT, "--store", self.root, "link"]
+        if variant := store_variant(options):
+            args.extend(["--variant", variant])
+        if options.get("audio_only"):
+            args.extend(["--final-ext", "mp3"])
+        # yt-dlp expands output-template fields in the whole command, so literal '%' is doubled.
+        fixed = shell_join(args).replace("%", "%%")
+        return f"before_dl:{fixed} %(extractor_key)q %(id)q %(format_id)q %(_filename)q"
+
+    def link_existing(self, extractor, video_id, format_id, variant, target, final_ext=None):
+        """Links the stored object for a download to its target path before yt-dlp checks for it.
+
+        ``final_ext`` is the extension after post-processing (mp3 for audio
+        extraction), as yt-dlp also looks for the converted file. Returns the
+        link kind, or None when nothing is stored or the target exists.
+        """
+        if final_ext:
+            target = os.path.splitext(target)[0] + "." + final_ext
+        target = os.path.abspath(target)
+        name = object_name(extractor or "generic", video_id, format_id, variant,
+                           os.path.splitext(target)[1].lstrip("."))
+        source = self.object_path(name)
+        if not os.path.isfile(source) or os.path.lexists(target):
+            return None
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        kind = place(source, target)
+        with self._lock:
+            self._record_link(target, name, kind)
+            self._db.execute("UPDATE objects SET used = ? WHERE name = ?", (time.time(), name))
+            self._db.commit()
+        return kind
+
+    def holds(self, info, options):
+        """True when a FILE_DONE file already is a link to its stored object."""
+        path = info.get("filepath")
+        if not path or not info.get("id"):
+            return False
+        name = object_name(info.get("extractor_key") or "generic", info["id"], info.get("format_id"),
+                           store_variant(options), os.path.splitext(path)[1].lstrip("."))
+        return same_file(path, self.object_path(name))
+
+    def ingest(self, info, options):
+        """Moves a FILE_DONE file into the store and links it back; returns the link kind, or None.
+
+        The file keeps its path and contents; only what backs it changes.
+        """
+        path = info.get("filepath")
+        if not path or not info.get("id") or not os.path.isfile(path):
+            return None
+        path = os.path.abspath(path)
+        extractor = info.get("extractor_key") or "generic"
+        variant = store_variant(options)
+        name = object_name(extractor, info["id"], info.get("format_id"), variant, os.path.splitext(path)[1].lstrip("."))
+        target = self.object_path(name)
+        with self._lock:
+            if same_file(path, target):
+                # Linked before the download, so yt-dlp had nothing to fetch.
+                kind = LINK_SYMLINK if os.path.islink(path) else LINK_HARD
+                self._record_link(path, name, kind)
+                self._db.commit()
+                self.reused += 1
+                return kind
+            size = os.path.getsize(path)
+            checksum = sample_checksum(path)
+            stored = self._db.execute("SELECT size, checksum FROM objects WHERE name = ?", (name,)).fetchone()
+            if stored == (size, checksum) and os.path.isfile(target):
+                linked = self._db.execute("SELECT kind FROM links WHERE path = ? AND name = ?", (path, name)).fetchone()
+                if linked is not None and linked[0] in (LINK_REFLINK, LINK_COPY):
+                    # A reflink or copy placed before the download.
+                    self.reused += 1
+                    return linked[0]
+                # Downloaded again although the bytes were already here.
+                kind = place(target, path)
+                self.deduplicated += 1
+                self.saved_bytes += size
+            else:
+                twin = self._twin(name, size, checksum)
+                if twin is not None and self._share(twin, target):
+                    kind = place(target, path)
+                    self.deduplicated += 1
+                    self.saved_bytes += size
+                else:
+                    kind = self._adopt(path, target)
+                self._db.execute("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 (name, archive_key(extractor, info["id"]), info.get("format_id"), variant, size,
+                                  checksum, time.time(), time.time()))
+            self._record_link(path, name, kind)
+            self._db.commit()
+            self.ingested += 1
+        return kind
+
+    def gc(self, dry_run=False):
+        """Forgets dead links and deletes unreferenced objects; returns counts and freed bytes."""
+        with self._lock:
+            links = self._db.execute("SELECT path, name, kind FROM links").fetchall()
+            dead = set()
+            live_names = set()
+            for path, name, kind in links:
+                if self._alive(path, name, kind):
+                    live_names.add(name)
+                else:
+                    dead.add(path)
+            objects = self._db.execute("SELECT name FROM objects").fetchall()
+            orphans = [name for (name,) in objects if name not in live_names]
+            freed = 0
+            for name in orphans:
+                source = self.object_path(name)
+                try:
+                    st = os.stat(source)
+                except OSError:
+                    continue
+                # Bytes still reachable through another name (a twin object, a hardlink made by hand) stay.
+                if st.st_nlink == 1:
+                    freed += st.st_size
+                if not dry_run:
+                    try:
+                        os.remove(source)
+                    except FileNotFoundError:
+                        pass
+            if not dry_run:
+                self._db.executemany("DELETE FROM links WHERE path = ?", [(path,) for path in dead])
+                self._db.executemany("DELETE FROM objects WHERE name = ?", [(name,) for name in orphans])
+                self._db.commit()
+        return {"dead_links": len(dead), "objects_removed": len(orphans), "freed_bytes": freed,
+                "objects_kept": len(objects) - len(orphans), "dry_run": dry_run}
+
+    def stats(self):
+        with self._lock:
+            objects, stored_bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+            kinds = dict(self._db.execute("SELECT kind, COUNT(*) FROM links GROUP BY kind").fetchall())
+            return {"objects": objects, "stored_bytes": stored_bytes, "links": kinds, "ingested": self.ingested,
+                    "reused": self.reused, "deduplicated": self.deduplicated,
+                    "saved_bytes": self.saved_bytes}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- Internals (caller holds the lock) ---
+    def _record_link(self, path, name, kind):
+        self._db.execute("INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?)", (path, name, kind, time.time()))
+
+    def _twin(self, name, size, checksum):
+        """Another stored object with the same bytes, if any."""
+        for (other,) in self._db.execute("SELECT name FROM objects WHERE checksum = ? AND size = ? AND name != ?",
+                                         (checksum, size, name)):
+            if os.path.isfile(self.object_path(other)):
+                return self.object_path(other)
+        return None
+
+    def _share(self, twin, target):
+        """Makes target a second name for an identical stored object; False if that isn't possible."""
+        try:
+            if os.path.lexists(target):
+                os.remove(target)
+            os.link(twin, target)
+        except OSError:
+            return False
+        return True
+
+    def _adopt(self, path, target):
+        """Moves a downloaded file into the store and links it back; returns the link kind."""
+        try:
+            os.replace(path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Another drive: one copy now, then a symlink back.
+            shutil.move(path, target)
+        try:
+            return place(target, path)
+        except OSError:
+            os.replace(target, path)
+            raise
+
+    def _alive(self, path, name, kind):
+        source = self.object_path(name)
+        if kind in (LINK_HARD, LINK_SYMLINK):
+            return same_file(path, source)
+        # Reflinks and copies are independent files; they count while they exist.
+        return os.path.isfile(path) and not os.path.islink(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ytdl_core.store", description=__doc__.splitlines()[0])
+    parser.add_argument("--store", default=STORE_DIR, help=f"store folder (default: {STORE_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="print object and link counts")
+    gc_parser = commands.add_parser("gc", help="delete stored files no output path links to any more")
+    gc_parser.add_argument("--dry-run", action="store_true", help="only report what would be deleted")
+    link_parser = commands.add_parser("link", help="link a stored file into place (run by yt-dlp before a download)")
+    link_parser.add_argument("--variant", default="")
+    link_parser.add_argument("--final-ext")
+    link_parser.add_argument("extractor")
+    link_parser.add_argument("video_id")
+    link_parser.add_argument("format_id")
+    link_parser.add_argument("target")
+    args = parser.parse_args(argv)
+
+    store = OutputStore(args.store)
+    try:
+        if args.command == "link":
+            # A failing --exec command would fail the download, so nothing here may.
+            try:
+                kind = store.link_existing(args.extractor, args.video_id, args.format_id, args.variant, args.target,
+                                           args.final_ext)
+            except (OSError, sqlite3.Error) as e:
+                print(f"[store] Couldn't link a stored copy: {e}")
+                return 0
+            if kind:
+                print(f"[store] Linked stored copy ({kind}) to {args.target}")
+            return 0
+        result = store.gc(args.dry_run) if args.command == "gc" else store.stats()
+        print(json.dumps(result, indent=2))
+        return 0
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
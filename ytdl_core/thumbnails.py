@@ -0,0 +1,263 @@
+import os
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from urllib.parse import urlsplit, urljoin
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Constants ---
+THUMB_SIZE = (160, 90)
+FETCH_TIMEOUT = 8
+FETCH_WORKERS = 4
+DECODE_WORKERS = 2
+MEMORY_ITEMS = 256
+DISK_MAX_BYTES = 64 * 1024 * 1024
+MAX_REDIRECTS = 3
+USER_AGENT = "Mozilla/5.0 (ytdl_core thumbnail fetcher)"
+
+
+def thumbnail_key(video_id, url):
+    return hashlib.sha1(f"{video_id}|{url}".encode("utf-8")).hexdigest()
+
+def pick_thumbnail(info, width=THUMB_SIZE[0]):
+    """Returns the smallest thumbnail URL at least ``width`` wide, else the default one."""
+    sized = [t for t in info.get("thumbnails") or () if t.get("url") and t.get("width")]
+    large_enough = [t for t in sized if t["width"] >= width]
+    if large_enough:
+        return min(large_enough, key=lambda t: t["width"])["url"]
+    return info.get("thumbnail") or (sized[-1]["url"] if sized else None)
+
+
+# --- Fetching ---
+class ConnectionPoolFetcher:
+    """Small HTTP(S) GET client that keeps one keep-alive connection per host per thread."""
+
+    def __init__(self, timeout=FETCH_TIMEOUT):
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def fetch(self, url):
+        for _ in range(MAX_REDIRECTS + 1):
+            status, location, body = self._get(url)
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            if status != 200:
+                raise OSError(f"HTTP {status} for {url}")
+            return body
+        raise OSError(f"Too many redirects for {url}")
+
+    def _get(self, url):
+        # Imported on first use: http.client pulls in ssl and email, which the GUI should not pay for at startup.
+        import http.client
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        # A pooled connection may have been closed by the server; retry once on a fresh one.
+        for attempt in range(2):
+            conn = self._connection(parts.scheme, parts.netloc, fresh=attempt > 0)
+            try:
+                conn.request("GET", path, headers={"User-Agent": USER_AGENT})
+                response = conn.getresponse()
+                body = response.read()
+                if response.will_close:
+                    self._drop(parts.scheme, parts.netloc)
+                return response.status, response.getheader("Location"), body
+            except (http.client.HTTPException, ConnectionError):
+                self._drop(parts.scheme, parts.netloc)
+                if attempt:
+                    raise
+            except OSError:
+                self._drop(parts.scheme, parts.netloc)
+                raise
+
+    def _connection(self, scheme, netloc, fresh=False):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        key = (scheme, netloc)
+        if fresh or key not in conns:
+            self._drop(scheme, netloc)
+            import http.client
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conns[key] = cls(netloc, timeout=self.timeout)
+        return conns[key]
+
+    def _drop(self, scheme, netloc):
+        conns = getattr(self._local, "conns", {})
+        conn = conns.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+
+# --- Caches ---
+class DiskCache:
+    """Directory of raw thumbnail bytes trimmed oldest-first to max_bytes."""
+
+    def __init__(self, directory, max_bytes=DISK_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".img")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # mtime doubles as the LRU timestamp
+        return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        with self._lock:
+            if os.path.exists(path):
+                self._size -= os.path.getsize(path)
+            os.replace(tmp_path, path)
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted((e for e in os.scandir(self.directory) if e.name.endswith(".img")),
+                         key=lambda e: e.stat().st_mtime)
+        for entry in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self._size -= size
+
+
+class MemoryCache:
+    """Thread-safe LRU of decoded, resized images."""
+
+    def __init__(self, max_items=MEMORY_ITEMS):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._items.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        with self._lock:
+            self._items[key] = image
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+
+# --- Loader ---
+class ThumbnailLoader:
+    """Fetches, caches and resizes thumbnails off the UI thread.
+
+    ``request()`` calls ``callback(image)`` with a resized PIL image, either
+    straight away on a memory hit or later from the decode pool. Creating
+    the Tk PhotoImage is left to the caller on its main thread. ``preload()``
+    only warms the disk cache, on the fetch pool.
+    """
+
+    def __init__(self, cache_dir, size=THUMB_SIZE, fetcher=None, disk_max_bytes=DISK_MAX_BYTES,
+                 memory_items=MEMORY_ITEMS):
+        self.size = size
+        self.fetcher = fetcher or ConnectionPoolFetcher()
+        self.disk = DiskCache(cache_dir, disk_max_bytes)
+        self.memory = MemoryCache(memory_items)
+        self.hits = {"memory": 0, "disk": 0, "network": 0}
+        self._fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="thumb-fetch")
+        self._decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="thumb-decode")
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def request(self, video_id, url, callback, on_error=None):
+        key = thumbnail_key(video_id, url)
+        image = self.memory.get(key)
+        if image is not None:
+            self.hits["memory"] += 1
+            callback(image)
+            return None
+        future = self._raw(key, url)
+        future.add_done_callback(lambda f: self._decode_later(key, f, callback, on_error))
+        return future
+
+    def preload(self, items):
+        """Warms the disk cache for (video_id, url) pairs; returns how many were scheduled."""
+        count = 0
+        for video_id, url in items:
+            if url:
+                self._raw(thumbnail_key(video_id, url), url)
+                count += 1
+        return count
+
+    def shutdown(self):
+        self._fetch_pool.shutdown(wait=False, cancel_futures=True)
+        self._decode_pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- Internals ---
+    def _raw(self, key, url):
+        """Returns a Future of the raw bytes, sharing in-flight fetches of the same key."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self._inflight[key] = self._fetch_pool.submit(self._load_bytes, key, url)
+        # Outside the lock: a fetch that already finished runs the callback right here.
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _load_bytes(self, key, url):
+        data = self.disk.get(key)
+        if data is not None:
+            self.hits["disk"] += 1
+            return data
+        data = self.fetcher.fetch(url)
+        self.hits["network"] += 1
+        self.disk.put(key, data)
+        return data
+
+    def _decode_later(self, key, future, callback, on_error):
+        if future.cancelled() or future.exception() is not None:
+            if on_error:
+                on_error(future.exception() if not future.cancelled() else None)
+            return
+        try:
+            self._decode_pool.submit(self._decode, key, future.result(), callback, on_error)
+        except RuntimeError:
+            pass  # Shut down while the fetch was in flight.
+
+    def _decode(self, key, data, callback, on_error):
+        try:
+            from PIL import Image
+            image = Image.open(BytesIO(data))
+            image.draft("RGB", self.size)  # Lets JPEG decode at a reduced scale first.
+            image = image.convert("RGB").resize(self.size, Image.Resampling.LANCZOS)
+        except Exception as e:
+            if on_error:
+                on_error(e)
+            return
+        self.memory.put(key, image)
+        callback(image)
@@ -0,0 +1,311 @@
+"""Per-job timing spans, Chrome trace export and an aggregate report over the logs directory.
+
+    python -m ytdl_core.timeline [logs_dir] [--trace merged-trace.json]
+
+Open the trace file in chrome://tracing or https://ui.perfetto.dev.
+"""
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import threading
+
+from .logs import LOGS_DIR, ensure_logs_dir
+from .progress import DOWNLOAD, FILE_DONE, format_bytes
+
+# --- Constants ---
+SAMPLE_INTERVAL = 0.5
+UI_STALL_THRESHOLD = 0.1
+TIMELINE_GLOB = "timeline-*.json"
+# Spans the summary and the report break out, in pipeline order.
+PHASES = ("spawn", "startup", "download", "merge", "extract-audio", "embed-subs", "postprocess", "sidecars", "store")
+
+# time.time() and perf_counter() at import, so spans from every job share one precise clock.
+_WALL_EPOCH = time.time()
+_PERF_EPOCH = time.perf_counter()
+
+
+def now():
+    """Wall-clock seconds with perf_counter resolution."""
+    return _WALL_EPOCH + (time.perf_counter() - _PERF_EPOCH)
+
+
+# --- Timelines ---
+class Timeline:
+    """Spans, instants and counter samples of one job or of the UI thread.
+
+    A span is open from ``begin(name)`` until ``end(name)``; ``close()``
+    ends whatever is still open. Thread-safe, since progress arrives on
+    worker threads while the UI may read a summary.
+    """
+
+    def __init__(self, name, **info):
+        self.name = name
+        self.info = info
+        self.start = now()
+        self.end_time = None
+        self.spans = []
+        self.instants = []
+        self.samples = []
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def begin(self, name, **args):
+        with self._lock:
+            self._open.setdefault(name, (now(), args))
+
+    def end(self, name, **args):
+        with self._lock:
+            self._end(name, now(), args)
+
+    def is_open(self, name):
+        return name in self._open
+
+    def instant(self, name, **args):
+        with self._lock:
+            self.instants.append({"name": name, "time": now(), "args": args})
+
+    def sample(self, name, value):
+        with self._lock:
+            self.samples.append({"name": name, "time": now(), "value": value})
+
+    def add_span(self, name, start, end, **args):
+        with self._lock:
+            self.spans.append({"name": name, "start": start, "end": end, "args": args})
+
+    def close(self, **info):
+        with self._lock:
+            end = now()
+            for name in list(self._open):
+                self._end(name, end, {"unfinished": True})
+            self.end_time = end
+            self.info.update(info)
+
+    def _end(self, name, end, args):
+        opened = self._open.pop(name, None)
+        if opened is not None:
+            start, begin_args = opened
+            self.spans.append({"name": name, "start": start, "end": end, "args": dict(begin_args, **args)})
+
+    # --- Summaries ---
+    def durations(self):
+        """Total seconds per span name."""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span["name"]] = totals.get(span["name"], 0.0) + span["end"] - span["start"]
+        return totals
+
+    def to_dict(self):
+        with self._lock:
+            return {"name": self.name, "info": dict(self.info), "start": self.start,
+                    "end": self.end_time, "spans": list(self.spans), "instants": list(self.instants),
+                    "samples": list(self.samples)}
+
+
+class JobTimeline(Timeline):
+    """Timeline of one job attempt, fed from its ProgressRecords.
+
+    Besides the ``spawn`` span the queue records around Popen, it derives
+    ``startup`` (process start to the first download tick: extractor and
+    metadata work), one ``download`` span per file, ``first-byte`` instants,
+    throughput samples, and a span per post-processing phase.
+    """
+
+    def __init__(self, job_id, url):
+        super().__init__(f"job {job_id}", job=job_id, url=url)
+        self.first_byte = None
+        self._last_sample = 0.0
+
+    def observe(self, record):
+        if record.phase == DOWNLOAD:
+            self.end("startup")
+            if not self.is_open("download"):
+                self.begin("download", filename=record.filename)
+            if self.first_byte is None and record.downloaded_bytes:
+                self.first_byte = now()
+                self.instant("first-byte")
+            if record.speed is not None and now() - self._last_sample >= SAMPLE_INTERVAL:
+                self._last_sample = now()
+                self.sample("speed", record.speed)
+            if record.status == "finished":
+                self.end("download", bytes=record.total_bytes or record.downloaded_bytes)
+        elif record.phase == FILE_DONE:
+            self.instant("file", path=record.filename)
+        else:
+            self.end("startup")
+            self.end("download")
+            if record.status == "finished":
+                self.end(record.phase)
+            else:
+                for phase in PHASES[3:]:
+                    if phase != record.phase:
+                        self.end(phase)
+                self.begin(record.phase)
+
+    def summary(self):
+        """Phase durations plus time-to-first-byte and average download speed."""
+        durations = self.durations()
+        result = {phase: round(durations[phase], 3) for phase in PHASES if phase in durations}
+        if self.first_byte is not None:
+            result["ttfb"] = round(self.first_byte - self.start, 3)
+        downloaded = sum(s["args"].get("bytes") or 0 for s in self.spans if s["name"] == "download")
+        if downloaded and durations.get("download"):
+            result["speed"] = downloaded / durations["download"]
+        if self.end_time is not None:
+            result["total"] = round(self.end_time - self.start, 3)
+        return result
+
+    def describe(self):
+        s = self.summary()
+        parts = [f"{name} {s[name]:.2f}s" for name in ("spawn", "startup", "ttfb", "download") if name in s]
+        if "speed" in s:
+            parts[-1] += f" @ {format_bytes(s['speed'])}/s"
+        parts += [f"{name} {s[name]:.2f}s" for name in PHASES[3:] if name in s]
+        if "total" in s:
+            parts.append(f"total {s['total']:.2f}s")
+        return ", ".join(parts)
+
+
+class UIStallMonitor:
+    """Records UI-thread stalls: periodic ticks that arrive late by more than ``threshold``."""
+
+    def __init__(self, interval, threshold=UI_STALL_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.timeline = Timeline("ui")
+        self.stall_time = 0.0
+        self.max_stall = 0.0
+        self._last = None
+
+    def tick(self):
+        current = now()
+        if self._last is not None:
+            expected = self._last + self.interval
+            late = current - expected
+            if late > self.threshold:
+                self.timeline.add_span("stall", expected, current)
+                self.stall_time += late
+                self.max_stall = max(self.max_stall, late)
+        self._last = current
+
+
+# --- Export ---
+def write_timeline(timeline, logs_dir=LOGS_DIR):
+    """Writes a timeline as JSON next to the job logs and returns the path."""
+    ensure_logs_dir(logs_dir)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(timeline.start))
+    base = os.path.join(logs_dir, f"timeline-{stamp}-{timeline.name.replace(' ', '')}")
+    path, counter = base + ".json", 1
+    while os.path.exists(path):  # Retries of a job within the same second.
+        counter += 1
+        path = f"{base}-{counter}.json"
+    data = timeline.to_dict()
+    if isinstance(timeline, JobTimeline):
+        data["summary"] = timeline.summary()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return path
+
+def chrome_trace(timelines):
+    """Converts timeline dicts into a Chrome trace-event document (one thread per timeline).
+
+    Job ids restart every session, so threads are numbered by position.
+    """
+    origin = min((t["start"] for t in timelines), default=0.0)
+
+    def us(seconds):
+        return round((seconds - origin) * 1e6)
+
+    events = []
+    for tid, t in enumerate(timelines, 1):
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": t["name"]}})
+        for span in t["spans"]:
+            events.append({"name": span["name"], "cat": t["name"], "ph": "X", "pid": 1, "tid": tid,
+                           "ts": us(span["start"]), "dur": us(span["end"]) - us(span["start"]), "args": span["args"]})
+        for mark in t["instants"]:
+            events.append({"name": mark["name"], "cat": t["name"], "ph": "i", "s": "t", "pid": 1, "tid": tid,
+                           "ts": us(mark["time"]), "args": mark["args"]})
+        for sample in t["samples"]:
+            events.append({"name": f"{t['name']} {sample['name']}", "ph": "C", "pid": 1, "ts": us(sample["time"]),
+                           "args": {sample["name"]: sample["value"]}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def load_timelines(logs_dir=LOGS_DIR):
+    timelines = []
+    for path in sorted(glob.glob(os.path.join(logs_dir, TIMELINE_GLOB))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                timelines.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return timelines
+
+
+# --- Aggregate Report ---
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def aggregate(timelines):
+    """Returns {metric: {count, mean, median, p90, max}} over job summaries, GUI startups and UI stalls."""
+    from statistics import mean, median
+    metrics = {}
+    stalls = []
+    for t in timelines:
+        if t["name"] == "ui":
+            stalls.extend(s["end"] - s["start"] for s in t["spans"] if s["name"] == "stall")
+            continue
+        if t["name"] == "startup":
+            if t["info"].get("first_frame") is not None:
+                metrics.setdefault("first-frame", []).append(t["info"]["first_frame"])
+            continue
+        for name, value in (t.get("summary") or {}).items():
+            metrics.setdefault(name, []).append(value)
+    report = {}
+    for name, values in metrics.items():
+        report[name] = {"count": len(values), "mean": mean(values), "median": median(values),
+                        "p90": _percentile(values, 0.9), "max": max(values)}
+    if stalls:
+        report["ui-stall"] = {"count": len(stalls), "mean": mean(stalls), "median": median(stalls),
+                              "p90": _percentile(stalls, 0.9), "max": max(stalls), "total": sum(stalls)}
+    return report
+
+def format_report(report, job_count):
+    lines = [f"{job_count} job timeline(s)", f"{'metric':<14}{'count':>7}{'mean':>12}{'median':>12}{'p90':>12}{'max':>12}"]
+    order = ["spawn", "startup", "ttfb", "download", "speed", *PHASES[3:], "total", "first-frame", "ui-stall"]
+    for name in order:
+        if name not in report:
+            continue
+        r = report[name]
+        fmt = (lambda v: f"{format_bytes(v)}/s") if name == "speed" else (lambda v: f"{v:.3f}s")
+        lines.append(f"{name:<14}{r['count']:>7}" + "".join(f"{fmt(r[k]):>12}" for k in ("mean", "median", "p90", "max")))
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ytdl_core.timeline", description=__doc__.splitlines()[0])
+    parser.add_argument("logs_dir", nargs="?", default=LOGS_DIR, help=f"folder with timeline files (default: {LOGS_DIR})")
+    parser.add_argument("--trace", metavar="FILE", help="also write all timelines as one Chrome trace file")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    timelines = load_timelines(args.logs_dir)
+    if not timelines:
+        print(f"No {TIMELINE_GLOB} files in {args.logs_dir}", file=sys.stderr)
+        return 1
+    report = aggregate(timelines)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report, sum(t["name"].startswith("job ") for t in timelines)))
+    if args.trace:
+        with open(args.trace, "w", encoding="utf-8") as f:
+            json.dump(chrome_trace(timelines), f)
+        print(f"Trace written to {args.trace}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
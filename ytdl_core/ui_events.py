@@ -0,0 +1,108 @@
+import time
+import queue
+
+from .logs import LogBuffer, UI_LOG_LINES
+
+# --- Constants ---
+UI_FPS = 30
+UI_FRAME_MS = 1000 // UI_FPS
+MAX_EVENTS_PER_FRAME = 2000  # Leftovers wait for the next frame so one frame never stalls.
+
+# --- Event Kinds ---
+CALL = "call"
+LATEST = "latest"
+
+
+class UIFrame:
+    """Everything a single drain collected, ready to be applied in one go."""
+
+    def __init__(self):
+        self.cleared = False
+        self.log_lines = []
+        self.calls = []
+        self.latest = {}
+        self.events = 0
+
+    def __bool__(self):
+        return bool(self.events)
+
+
+class UIEventPump:
+    """Thread-safe event queue drained by the UI thread once per frame.
+
+    Worker threads never touch widgets. They post log lines, ordered calls,
+    or keyed "latest value" calls. Only the last call per key survives a
+    frame, so a flood of progress updates costs one widget update per frame.
+    Log lines go through a bounded LogBuffer rather than the queue, so
+    memory stays flat however fast the workers log.
+    """
+
+    def __init__(self, log_lines=UI_LOG_LINES):
+        self._queue = queue.SimpleQueue()
+        self.log_buffer = LogBuffer(log_lines)
+        self.frames = 0
+        self.ui_time = 0.0
+        self.max_frame_time = 0.0
+
+    # --- Producer side (any thread) ---
+    def log(self, text):
+        self.log_buffer.append(text)
+
+    def clear_log(self):
+        self.log_buffer.clear()
+
+    def call(self, fn, *args):
+        """Runs fn(*args) on the UI thread, in posting order."""
+        self._queue.put((CALL, (fn, args)))
+
+    def latest(self, key, fn, *args):
+        """Runs fn(*args) on the UI thread, keeping only the newest call per key."""
+        self._queue.put((LATEST, (key, fn, args)))
+
+    # --- Consumer side (UI thread) ---
+    def drain(self, max_events=None):
+        """Collects pending events into a UIFrame without blocking.
+
+        The log buffer is bounded on its own, so ``max_events`` only caps
+        the queued calls.
+        """
+        frame = UIFrame()
+        frame.cleared, frame.log_lines = self.log_buffer.take()
+        get = self._queue.get_nowait
+        calls = 0
+        while max_events is None or calls < max_events:
+            try:
+                kind, payload = get()
+            except queue.Empty:
+                break
+            calls += 1
+            if kind == LATEST:
+                key, fn, args = payload
+                frame.latest.pop(key, None)
+                frame.latest[key] = (fn, args)
+            elif kind == CALL:
+                frame.calls.append(payload)
+        frame.events = calls + len(frame.log_lines) + frame.cleared
+        return frame
+
+    def pump(self, apply_log, clear_log=None, max_events=MAX_EVENTS_PER_FRAME):
+        """Drains and applies one frame; returns the number of events handled.
+
+        ``apply_log(text)`` receives all new log lines joined into one string.
+        """
+        start = time.perf_counter()
+        frame = self.drain(max_events)
+        if frame:
+            if frame.cleared and clear_log:
+                clear_log()
+            for fn, args in frame.calls:
+                fn(*args)
+            for fn, args in frame.latest.values():
+                fn(*args)
+            if frame.log_lines:
+                apply_log("\n".join(frame.log_lines) + "\n")
+        elapsed = time.perf_counter() - start
+        self.frames += 1
+        self.ui_time += elapsed
+        self.max_frame_time = max(self.max_frame_time, elapsed)
+        return frame.events